@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Catalog Listing Benchmark
+=========================
+
+Compares list_books paging and recent_books lookups served from the
+catalog's sorted indexes with the per-call scan, filter, sort and
+timestamp parsing they replace, on a synthetic book_index.json. Reports
+p50 latency for each query, whether both return the same books, the cost
+of building the indexes, and of bringing them up to date after the indexer
+rewrites book_index.json.
+
+Usage:
+    python scripts/benchmark_catalog_views.py [--books 100000] [--repeat 50]
+
+Options:
+    --books N     Synthetic catalog size (default: 100000)
+    --repeat N    Calls per query (default: 50)
+    --seed N      Random seed (default: 0)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from personal_doc_library.core.catalog import LibraryCatalog
+
+AUTHORS = ["Yogananda", "Vivekananda", "Aurobindo", "Krishnamurti", "Tolle", "Watts", "Ram Dass",
+           "Suzuki", "Chodron", "Hanh", "Feynman", "Sagan", "Darwin", "Curie"]
+WORDS = ("light way path mind heart yoga breath silence river mountain teachings notes journal practice "
+         "energy healing awakening presence inner spirit body wisdom meditation guide complete").split()
+
+
+def make_book_index(count, rng):
+    now = datetime.now()
+    book_index = {}
+    while len(book_index) < count:
+        title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 5)))
+        path = f"{rng.choice(AUTHORS)}/{title} {rng.randint(1, 99999)}.pdf"
+        indexed_at = now - timedelta(days=rng.random() * 730)
+        book_index[path] = {"chunks": rng.randint(10, 2000), "indexed_at": indexed_at.isoformat()}
+    return book_index
+
+
+def scan_list_books(book_index, pattern, author, offset, limit):
+    """The per-call scan list_books used before"""
+    matching = []
+    for book_path in book_index:
+        if pattern and pattern.lower() not in book_path.lower():
+            continue
+        if author and author.lower() not in os.path.dirname(book_path).lower():
+            continue
+        matching.append((book_path, os.path.basename(book_path), book_index[book_path]))
+    matching.sort(key=lambda x: x[1])
+    return matching[offset:offset + limit], len(matching)
+
+
+def scan_recent_books(book_index, days):
+    """The per-call scan recent_books used before"""
+    cutoff = datetime.now() - timedelta(days=days)
+    recent = []
+    for book_path, book_info in book_index.items():
+        if 'indexed_at' in book_info:
+            indexed_time = datetime.fromisoformat(book_info['indexed_at'])
+            if indexed_time > cutoff:
+                recent.append((book_path, book_info, indexed_time))
+    recent.sort(key=lambda x: x[2], reverse=True)
+    return recent
+
+
+def p50_ms(function, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog sorted indexes for list_books and recent_books")
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="ragdex_catalog_")
+    try:
+        book_index = make_book_index(args.books, random.Random(args.seed))
+        with open(os.path.join(work_dir, "book_index.json"), "w") as f:
+            json.dump(book_index, f)
+        catalog = LibraryCatalog(work_dir)
+        book_index = catalog.book_index
+
+        start = time.perf_counter()
+        catalog.list_books(limit=1)
+        build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        catalog.list_books("meditation", limit=1)
+        title_ms = (time.perf_counter() - start) * 1000
+        print(f"{len(book_index)} books; sorted indexes built in {build_ms:.0f}ms, "
+              f"title index (first pattern query) in {title_ms:.0f}ms")
+
+        # The indexer adds a book: sorted indexes are rebuilt, the title index only adds the new path
+        updated = dict(book_index)
+        updated["Watts/New Arrival 1.pdf"] = {"chunks": 1, "indexed_at": datetime.now().isoformat()}
+        with open(os.path.join(work_dir, "book_index.json"), "w") as f:
+            json.dump(updated, f)
+        start = time.perf_counter()
+        catalog.list_books("meditation", limit=1)
+        print(f"After book_index.json changes: first pattern query {(time.perf_counter() - start) * 1000:.0f}ms "
+              f"(including re-reading the file)\n")
+        book_index = catalog.book_index
+
+        listings = [
+            ("list page 1", ("", "", 0, 50)),
+            ("list page 1000", ("", "", 49950, 50)),
+            ("list pattern", ("silence river", "", 0, 50)),
+            ("list author", ("", "krishnamurti", 100, 50)),
+            ("list both", ("yoga", "watts", 0, 50)),
+        ]
+        print(f"{'Query':<18} {'scan p50 ms':>12} {'index p50 ms':>13} {'matches':>8} {'same':>5}")
+        for name, query in listings:
+            scan_ms, expected = p50_ms(lambda: scan_list_books(book_index, *query), args.repeat)
+            index_ms, found = p50_ms(lambda: catalog.list_books(*query), args.repeat)
+            same = [p for p, _, _ in expected[0]] == [p for p, _, _ in found[0]] and expected[1] == found[1]
+            print(f"{name:<18} {scan_ms:>12.2f} {index_ms:>13.3f} {found[1]:>8} {'yes' if same else 'NO':>5}")
+
+        for days in (1, 7, 30):
+            scan_ms, expected = p50_ms(lambda: scan_recent_books(book_index, days), args.repeat)
+            index_ms, found = p50_ms(lambda: catalog.recent_books(days), args.repeat)
+            same = [p for p, _, _ in expected] == [p for p, _, _ in found]
+            print(f"{f'recent {days} days':<18} {scan_ms:>12.2f} {index_ms:>13.3f} {len(found):>8} "
+                  f"{'yes' if same else 'NO':>5}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
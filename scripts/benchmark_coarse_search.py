@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Coarse-to-Fine Search Benchmark
+===============================
+
+Compares flat chunk search with two-stage search (pick the top-B books by
+centroid, then search only their chunks): latency, recall@k against flat
+search, and how many distinct books the results come from.
+
+Runs on the library's own vectors (query vectors are stored chunk
+embeddings with a little noise, so no embedding model is needed), or on a
+synthetic library of clustered vectors to measure large libraries.
+
+Usage:
+    python scripts/benchmark_coarse_search.py [--rebuild] [--books-per-query 5,10,20,50]
+    python scripts/benchmark_coarse_search.py --synthetic 5000 --chunks-per-book 200
+
+Options:
+    --rebuild              Recompute book vectors from stored embeddings first
+    --books-per-query LIST Values of B to compare (default: 5,10,20,50)
+    --queries N            Number of queries (default: 200)
+    --k N                  Results per query (default: 10)
+    --backend NAME         Vector backend: chroma or numpy (default: configured)
+    --synthetic N          Generate a synthetic library of N books instead
+    --chunks-per-book N    Chunks per synthetic book (default: 100)
+    --db-dir PATH          Database directory (default: configured database directory)
+"""
+
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from personal_doc_library.core.config import config
+from personal_doc_library.core.book_vectors import BookVectorIndex
+from personal_doc_library.core.vector_backends import BACKEND_NUMPY, open_vector_backend
+
+
+def build_synthetic(db_dir, books, chunks_per_book, dim=768, topics=50, seed=0):
+    """Books drawn from shared topics; each book's chunks scatter around the book's own direction"""
+    rng = np.random.default_rng(seed)
+    store = open_vector_backend(db_dir, BACKEND_NUMPY)
+    book_vectors = BookVectorIndex(db_dir)
+    topic_vectors = rng.normal(size=(topics, dim)).astype(np.float32)
+    book_index = {}
+    for b in range(books):
+        name = f"book{b:06d}.pdf"
+        direction = topic_vectors[b % topics] + 0.7 * rng.normal(size=dim).astype(np.float32)
+        chunks = direction + 1.2 * rng.normal(size=(chunks_per_book, dim)).astype(np.float32)
+        chunks /= np.linalg.norm(chunks, axis=1, keepdims=True)
+        store.add([f"{name} chunk {i}" for i in range(chunks_per_book)],
+                  [{"book": name, "page": i} for i in range(chunks_per_book)], chunks)
+        book_index[name] = {"chunks": chunks_per_book}
+    book_vectors.rebuild(store, book_index)
+    return store, book_vectors, topic_vectors
+
+
+def broad_queries(topic_vectors, count, seed=2):
+    """Topic-level queries that many books answer, unlike near-copies of one chunk"""
+    rng = np.random.default_rng(seed)
+    topics = topic_vectors[rng.integers(len(topic_vectors), size=count)]
+    queries = topics + 0.7 * rng.normal(size=topics.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def sample_queries(store, count, seed=1):
+    ids = store.get(include=[])["ids"]
+    rng = np.random.default_rng(seed)
+    chosen = [ids[i] for i in rng.choice(len(ids), size=min(count, len(ids)), replace=False)]
+    vectors = np.asarray(store.get(ids=chosen, include=["embeddings"])["embeddings"], dtype=np.float32)
+    vectors = vectors + rng.normal(scale=0.02, size=vectors.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run(store, book_vectors, queries, k, books_per_query):
+    def key(hits):
+        return [(metadata.get("book"), metadata.get("page"), text) for text, metadata, _ in hits]
+
+    rows = []
+    flat_latencies, flat_results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        flat_results.append(key(store.query(query, k)))
+        flat_latencies.append((time.perf_counter() - start) * 1000)
+    rows.append(("flat", flat_latencies, [1.0] * len(queries), flat_results))
+
+    for books in books_per_query:
+        latencies, recalls, results = [], [], []
+        for query, expected in zip(queries, flat_results):
+            start = time.perf_counter()
+            names = sorted({name for _, name, _ in book_vectors.top_books(query, books)})
+            found = key(store.query(query, k, where={"book": {"$in": names}}))
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(set(found) & set(expected)) / max(1, len(expected)))
+            results.append(found)
+        rows.append((f"top-{books} books", latencies, recalls, results))
+
+    print(f"{'Mode':<16} {'p50 ms':>8} {'p95 ms':>8} {f'recall@{k}':>10} {'books/query':>12}")
+    for name, latencies, recalls, results in rows:
+        distinct = np.mean([len({book for book, _, _ in found}) for found in results])
+        print(f"{name:<16} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} "
+              f"{np.mean(recalls):>10.3f} {distinct:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark two-stage book-then-chunk search")
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--books-per-query", default="5,10,20,50")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--chunks-per-book", type=int, default=100)
+    parser.add_argument("--db-dir", default=None)
+    args = parser.parse_args()
+    books_per_query = [int(b) for b in args.books_per_query.split(",") if b.strip()]
+
+    if args.synthetic:
+        work_dir = tempfile.mkdtemp(prefix="ragdex_coarse_")
+        try:
+            start = time.perf_counter()
+            store, book_vectors, topics = build_synthetic(work_dir, args.synthetic, args.chunks_per_book)
+            print(f"Synthetic library: {args.synthetic} books, {store.count()} chunks "
+                  f"(built in {time.perf_counter() - start:.0f}s)\n")
+            print("Chunk-level queries:")
+            run(store, book_vectors, sample_queries(store, args.queries), args.k, books_per_query)
+            print("\nBroad (topic-level) queries:")
+            run(store, book_vectors, broad_queries(topics, args.queries), args.k, books_per_query)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return 0
+
+    db_dir = str(args.db_dir or config.db_directory)
+    store = open_vector_backend(db_dir, args.backend)
+    book_vectors = BookVectorIndex(db_dir)
+    if args.rebuild or not len(book_vectors):
+        with open(os.path.join(db_dir, "book_index.json")) as f:
+            book_index = json.load(f)
+        start = time.perf_counter()
+        built = book_vectors.rebuild(store, book_index)
+        print(f"Built vectors for {built} books in {time.perf_counter() - start:.1f}s")
+    if store.count() == 0:
+        print(f"No vectors found in {db_dir}; index some documents first.")
+        return 1
+    print(f"{len(book_vectors)} books, {store.count()} chunks\n")
+    run(store, book_vectors, sample_queries(store, args.queries), args.k, books_per_query)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
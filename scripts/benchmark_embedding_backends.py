@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Embedding Backend Benchmark
+===========================
+
+Compares the fp32 HuggingFace backend with the int8 and ONNX backends on a
+sample of chunks already stored in the library's vector database. Reports
+throughput (chunks/sec) and cosine agreement with fp32 embeddings, which
+tells whether a backend can search the existing index without re-indexing.
+
+Usage:
+    python scripts/benchmark_embedding_backends.py [--sample 500] [--backends int8,onnx]
+
+Options:
+    --sample N        Number of stored chunks to embed (default: 500)
+    --batch-size N    Chunks per embed_documents call (default: 64)
+    --backends LIST   Comma-separated backends to compare with fp32 (default: int8,onnx)
+    --db-dir PATH     ChromaDB directory (default: configured database directory)
+
+A mean cosine agreement above ~0.99 means query vectors from the backend
+rank stored fp32 vectors almost identically to the fp32 model.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from personal_doc_library.core.config import config
+from personal_doc_library.core.embedding_backends import (
+    BACKEND_HUGGINGFACE, DEFAULT_MODEL, create_embeddings
+)
+
+
+def sample_chunks(db_dir, sample_size):
+    """Read up to sample_size stored chunk texts from the Chroma collection"""
+    import chromadb
+    client = chromadb.PersistentClient(path=str(db_dir))
+    collection = client.get_collection("langchain")
+    total = collection.count()
+    if total == 0:
+        return []
+    # Spread the sample over the collection rather than taking the first book only
+    step = max(1, total // sample_size)
+    texts = []
+    for offset in range(0, total, step):
+        batch = collection.get(offset=offset, limit=1, include=["documents"])
+        texts.extend(doc for doc in batch["documents"] if doc)
+        if len(texts) >= sample_size:
+            break
+    return texts
+
+
+def embed_all(embeddings, texts, batch_size):
+    vectors = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+    elapsed = time.perf_counter() - start
+    return np.asarray(vectors, dtype=np.float32), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends against fp32")
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--backends", default="int8,onnx")
+    parser.add_argument("--db-dir", default=None)
+    args = parser.parse_args()
+
+    db_dir = args.db_dir or config.db_directory
+    texts = sample_chunks(db_dir, args.sample)
+    if not texts:
+        print(f"No chunks found in {db_dir}; index some documents first.")
+        return 1
+    print(f"Sampled {len(texts)} chunks from {db_dir}\n")
+
+    reference = create_embeddings(DEFAULT_MODEL, device="cpu", backend=BACKEND_HUGGINGFACE)
+    embed_all(reference, texts[:args.batch_size], args.batch_size)  # Warm up
+    fp32_vectors, fp32_time = embed_all(reference, texts, args.batch_size)
+
+    print(f"{'Backend':<12} {'chunks/sec':>12} {'speedup':>9} {'cos mean':>10} {'cos min':>10} {'cos p1':>10}")
+    fp32_rate = len(texts) / fp32_time
+    print(f"{'fp32':<12} {fp32_rate:>12.1f} {1.0:>9.2f} {1.0:>10.4f} {1.0:>10.4f} {1.0:>10.4f}")
+
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        try:
+            embeddings = create_embeddings(DEFAULT_MODEL, device="cpu", backend=backend, fallback=False)
+        except Exception as e:
+            print(f"{backend:<12} failed to load: {e}")
+            continue
+        embed_all(embeddings, texts[:args.batch_size], args.batch_size)  # Warm up
+        vectors, elapsed = embed_all(embeddings, texts, args.batch_size)
+        # Both sides are L2-normalized, so the row-wise dot product is the cosine
+        cosines = np.sum(fp32_vectors * vectors, axis=1)
+        rate = len(texts) / elapsed
+        print(f"{backend:<12} {rate:>12.1f} {rate / fp32_rate:>9.2f} {cosines.mean():>10.4f} "
+              f"{cosines.min():>10.4f} {np.percentile(cosines, 1):>10.4f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
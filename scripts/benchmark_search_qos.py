@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Search Latency Under Indexing Load
+==================================
+
+Measures query latency (p50/p95/max) while a separate process embeds
+document batches the way the indexer does, once with interactive QoS
+disabled and once with it enabled.
+
+The load process runs IndexingThrottle before every batch, exactly like
+SharedRAG.process_document; the query side marks the InteractiveSignal
+around every query, exactly like the MCP server does for tools/call.
+
+Usage:
+    python scripts/benchmark_search_qos.py [--queries 50] [--batch-size 100]
+    python scripts/benchmark_search_qos.py --library   # query the real library via SharedRAG.search
+
+Options:
+    --queries N      Number of queries per phase (default: 50)
+    --interval S     Seconds between queries (default: 0.5)
+    --batch-size N   Chunks per embedding batch in the load process (default: 100)
+    --library        Run SharedRAG.search against the configured library
+                     instead of embedding the query only
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from personal_doc_library.core.interactive_qos import IndexingThrottle, InteractiveSignal
+
+MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+QUERIES = [
+    "How can I quiet the mind during meditation?",
+    "What is the nature of the self?",
+    "breathing practices for concentration",
+    "the relationship between love and devotion",
+    "how to deal with anger",
+]
+CHUNK_TEXT = ("The practice begins with attention to the breath, returning again and again "
+              "to the present moment whenever the mind wanders. ") * 8
+
+
+def load_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=MODEL_NAME,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def run_load_worker(signal_dir, batch_size, qos):
+    """Embed batches forever, throttled like the indexer"""
+    embeddings = load_embeddings()
+    throttle = IndexingThrottle(signal_dir, enabled=qos)
+    batch = [f"{i} {CHUNK_TEXT}" for i in range(batch_size)]
+    print("ready", flush=True)
+    while True:
+        throttle.before_batch()
+        embeddings.embed_documents(batch)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure_phase(query_fn, signal, args, signal_dir, qos):
+    load = subprocess.Popen(
+        [sys.executable, __file__, "--load-worker", "--signal-dir", signal_dir,
+         "--batch-size", str(args.batch_size)] + (["--qos"] if qos else []),
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        load.stdout.readline()  # Wait for the model to load
+        time.sleep(2)           # Let the load reach steady state
+        latencies = []
+        for i in range(args.queries):
+            query = QUERIES[i % len(QUERIES)]
+            signal.mark()
+            start = time.perf_counter()
+            query_fn(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            signal.mark()
+            time.sleep(args.interval)
+        return latencies
+    finally:
+        load.terminate()
+        load.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark search latency under indexing load")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--library", action="store_true")
+    parser.add_argument("--load-worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--signal-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--qos", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load_worker:
+        run_load_worker(args.signal_dir, args.batch_size, args.qos)
+        return
+
+    if args.library:
+        from personal_doc_library.core.shared_rag import SharedRAG
+        rag = SharedRAG()
+        signal_dir = rag.db_directory
+
+        def query_fn(query):
+            rag._search_cache.clear()
+            rag.search(query, k=10)
+    else:
+        embeddings = load_embeddings()
+        signal_dir = tempfile.mkdtemp(prefix="ragdex_qos_")
+        query_fn = embeddings.embed_query
+
+    signal = InteractiveSignal(signal_dir)
+    signal.MIN_MARK_INTERVAL = 0  # Mark on every query
+
+    for query in QUERIES:
+        query_fn(query)  # Warm up without load
+
+    print(f"{'Mode':<12} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for qos in (False, True):
+        latencies = measure_phase(query_fn, signal, args, signal_dir, qos)
+        label = "qos on" if qos else "qos off"
+        print(f"{label:<12} {statistics.median(latencies):>10.1f} "
+              f"{percentile(latencies, 95):>10.1f} {max(latencies):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
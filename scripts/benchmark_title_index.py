@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Title Index Benchmark
+=====================
+
+Compares book name lookups through the trigram title index with the linear
+scan find_book_by_fuzzy_match used before (substring checks on every path,
+then difflib over every file name), on a synthetic catalog. Reports p50/p95
+latency per kind of lookup, how often both return the same best match and
+the same list of books, the index build time and the cost of an incremental
+update.
+
+Usage:
+    python scripts/benchmark_title_index.py [--titles 50000] [--queries 100]
+
+Options:
+    --titles N     Synthetic catalog size (default: 50000)
+    --queries N    Lookups per kind (default: 100)
+    --seed N       Random seed (default: 0)
+"""
+
+import os
+import sys
+import time
+import random
+import difflib
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from personal_doc_library.core.title_index import TitleIndex
+
+WORDS = ("light way path mind heart yoga breath silence river mountain teachings notes journal practice "
+         "energy healing awakening presence inner spirit body wisdom meditation guide complete modern "
+         "ancient letters essays lectures introduction history science art nature sacred secret book "
+         "volume collected selected talks dialogues sutra gita tao zen kriya prana chakra").split()
+FOLDERS = ["", "Spiritual", "Spiritual/Yoga", "Science", "Letters/Archive", "Courses/2021", "Misc"]
+EXTENSIONS = [".pdf", ".pdf", ".pdf", ".epub", ".docx", ".mobi"]
+
+
+def linear_find(book_index, book_pattern, cutoff=0.6):
+    """The linear-scan lookup the title index replaces"""
+    book_pattern_lower = book_pattern.lower()
+    all_books = list(book_index.keys())
+    exact_matches = []
+    for book_path in all_books:
+        book_path_lower = book_path.lower()
+        book_name_lower = os.path.basename(book_path).lower()
+        if book_pattern_lower == book_path_lower or book_pattern_lower == book_name_lower:
+            return ([book_path], True, {book_path: 1.0})
+        if any(book_pattern_lower + extension == book_name_lower for extension in (".pdf", ".docx", ".doc", ".epub")):
+            return ([book_path], True, {book_path: 1.0})
+        if book_pattern_lower in book_path_lower or book_pattern_lower in book_name_lower:
+            exact_matches.append(book_path)
+    if exact_matches:
+        if len(exact_matches) == 1:
+            return (exact_matches, True, {exact_matches[0]: 0.9})
+        return (exact_matches, False, {path: 0.9 for path in exact_matches})
+
+    book_names = [os.path.basename(path) for path in all_books]
+    close_matches = difflib.get_close_matches(book_pattern, book_names, n=5, cutoff=cutoff)
+    if not close_matches:
+        lowered = difflib.get_close_matches(book_pattern_lower, [name.lower() for name in book_names],
+                                            n=5, cutoff=cutoff)
+        close_matches = [name for name in book_names if name.lower() in lowered]
+    matched_books, similarity_scores = [], {}
+    for matched_name in close_matches:
+        for book_path in all_books:
+            if os.path.basename(book_path).lower() == matched_name.lower():
+                matched_books.append(book_path)
+                similarity_scores[book_path] = difflib.SequenceMatcher(
+                    None, book_pattern_lower, os.path.basename(book_path).lower()).ratio()
+                break
+    matched_books.sort(key=lambda x: similarity_scores.get(x, 0), reverse=True)
+    return (matched_books, False, similarity_scores)
+
+
+def make_catalog(count, rng):
+    book_index = {}
+    while len(book_index) < count:
+        title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 6)))
+        title += f" {rng.randint(1, 999)}" if rng.random() < 0.5 else ""
+        path = os.path.join(rng.choice(FOLDERS), title + rng.choice(EXTENSIONS))
+        book_index[path] = {"chunks": rng.randint(10, 2000)}
+    return book_index
+
+
+def typo(text, rng, edits=2):
+    chars = list(text)
+    for _ in range(edits):
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.4:
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif op < 0.7 and len(chars) > 1:
+            del chars[i]
+        else:
+            chars.insert(i, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+    return "".join(chars)
+
+
+def make_queries(book_index, count, rng):
+    paths = list(book_index)
+    names = [os.path.basename(p) for p in rng.sample(paths, count * 4)]
+    stems = [os.path.splitext(name)[0] for name in names]
+    return {
+        "exact name": names[:count],
+        "name, no extension": stems[count:2 * count],
+        "substring": [s[len(s) // 4: len(s) // 4 + 12] for s in stems[2 * count:3 * count]],
+        "misspelled title": [typo(s.lower(), rng) for s in stems[3 * count:]],
+    }
+
+
+def timed(function, queries):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(function(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trigram title index against a linear scan")
+    parser.add_argument("--titles", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    book_index = make_catalog(args.titles, rng)
+    index = TitleIndex()
+    start = time.perf_counter()
+    index.sync(book_index)
+    print(f"{len(book_index)} titles; index built in {time.perf_counter() - start:.2f}s")
+
+    # Incremental update: one book added and one removed in place
+    added = "Incoming/New Arrival 1.pdf"
+    book_index[added] = {"chunks": 1}
+    del book_index[next(iter(book_index))]
+    index.mark_changed()
+    start = time.perf_counter()
+    index.sync(book_index)
+    print(f"Incremental update (+1 -1): {(time.perf_counter() - start) * 1000:.1f}ms")
+    start = time.perf_counter()
+    index.sync(book_index)
+    print(f"Unchanged sync: {(time.perf_counter() - start) * 1000:.3f}ms\n")
+
+    print(f"{'Lookup':<20} {'linear p50':>11} {'p95':>8} {'index p50':>10} {'p95':>8} "
+          f"{'same best':>10} {'same list':>10}")
+    for kind, queries in make_queries(book_index, args.queries, rng).items():
+        linear_ms, expected = timed(lambda q: linear_find(book_index, q), queries)
+        index_ms, found = timed(lambda q: index.find(q), queries)
+        same_best = np.mean([a[0][:1] == b[0][:1] for a, b in zip(expected, found)])
+        same_list = np.mean([a[0] == b[0] and a[1] == b[1] for a, b in zip(expected, found)])
+        print(f"{kind:<20} {np.percentile(linear_ms, 50):>11.2f} {np.percentile(linear_ms, 95):>8.2f} "
+              f"{np.percentile(index_ms, 50):>10.2f} {np.percentile(index_ms, 95):>8.2f} "
+              f"{same_best:>10.0%} {same_list:>10.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Vector Backend Benchmark
+========================
+
+Compares ChromaDB (HNSW) with the NumPy flat store (exact search) on the
+library's own vectors. Query vectors are stored chunk embeddings with a
+little noise added, so no embedding model is needed. Each backend runs in
+its own process so resident memory can be compared.
+
+Reports per backend: p50/p95 latency for unfiltered and book-filtered
+queries, resident memory after the queries, on-disk size, and Chroma's
+recall@k against the exact NumPy results.
+
+Usage:
+    python scripts/benchmark_vector_backends.py [--migrate] [--queries 200] [--k 10]
+
+Options:
+    --migrate         Copy the Chroma collection into the NumPy store first
+                      (also the way to switch PERSONAL_LIBRARY_VECTOR_BACKEND=numpy)
+    --dtype TYPE      float32 or float16 for a newly created NumPy store (default: float32)
+    --queries N       Number of queries per mode (default: 200)
+    --k N             Results per query (default: 10)
+    --db-dir PATH     Database directory (default: configured database directory)
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from personal_doc_library.core.config import config
+from personal_doc_library.core.vector_backends import (
+    BACKEND_CHROMA, BACKEND_NUMPY, NumpyFlatBackend, copy_vectors, open_vector_backend
+)
+
+
+def directory_size_mb(path, skip=()):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if d not in skip]
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def sample_queries(db_dir, count, seed=0):
+    """Noisy copies of stored embeddings, plus the book of each source chunk"""
+    store = open_vector_backend(db_dir, BACKEND_CHROMA)
+    total = store.count()
+    rng = np.random.default_rng(seed)
+    queries, books = [], []
+    for offset in rng.choice(total, size=min(count, total), replace=False):
+        chunk = store.get(include=["metadatas", "embeddings"], limit=1, offset=int(offset))
+        vector = np.asarray(chunk["embeddings"][0], dtype=np.float32)
+        vector = vector + rng.normal(scale=0.02, size=vector.shape).astype(np.float32)
+        queries.append(vector / np.linalg.norm(vector))
+        books.append(chunk["metadatas"][0].get("book"))
+    return queries, books
+
+
+def run_backend(backend, db_dir, queries, books, k):
+    """Run in a child process: time every query and report RSS"""
+    import psutil
+    store = open_vector_backend(db_dir, backend)
+    store.query(queries[0], k)  # Open files and build caches
+
+    report = {"results": {}}
+    for mode in ("all", "book"):
+        latencies, results = [], []
+        for query, book in zip(queries, books):
+            where = {"book": book} if mode == "book" else None
+            start = time.perf_counter()
+            hits = store.query(query, k, where=where)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([(m.get("book"), m.get("page"), text) for text, m, _ in hits])
+        report[mode] = (np.percentile(latencies, 50), np.percentile(latencies, 95))
+        report["results"][mode] = results
+    report["rss_mb"] = psutil.Process().memory_info().rss / (1024 * 1024)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Chroma against the NumPy flat vector store")
+    parser.add_argument("--migrate", action="store_true")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--db-dir", default=None)
+    args = parser.parse_args()
+
+    db_dir = str(args.db_dir or config.db_directory)
+    numpy_dir = os.path.join(db_dir, NumpyFlatBackend.DIRNAME)
+
+    if args.migrate:
+        source = open_vector_backend(db_dir, BACKEND_CHROMA)
+        target = NumpyFlatBackend(numpy_dir, dtype=args.dtype)
+        if target.count():
+            print(f"NumPy store already holds {target.count()} chunks; delete {numpy_dir} to rebuild")
+        else:
+            start = time.perf_counter()
+            copied = copy_vectors(source, target)
+            print(f"Copied {copied} chunks into {numpy_dir} in {time.perf_counter() - start:.1f}s")
+        target.close()
+
+    queries, books = sample_queries(db_dir, args.queries)
+    if not queries:
+        print(f"No vectors found in {db_dir}; index some documents first.")
+        return 1
+    if not os.path.exists(os.path.join(numpy_dir, "metadata.sqlite3")):
+        print("No NumPy store yet; run with --migrate to create one.")
+        return 1
+
+    context = multiprocessing.get_context("spawn")
+    reports = {}
+    for backend in (BACKEND_NUMPY, BACKEND_CHROMA):
+        with context.Pool(1) as pool:
+            reports[backend] = pool.apply(run_backend, (backend, db_dir, queries, books, args.k))
+
+    sizes = {BACKEND_NUMPY: directory_size_mb(numpy_dir),
+             BACKEND_CHROMA: directory_size_mb(db_dir, skip=(NumpyFlatBackend.DIRNAME,))}
+    print(f"{len(queries)} queries, k={args.k}\n")
+    print(f"{'Backend':<8} {'p50 ms':>8} {'p95 ms':>8} {'book p50':>9} {'book p95':>9} {'RSS MB':>8} {'disk MB':>8}")
+    for backend, report in reports.items():
+        print(f"{backend:<8} {report['all'][0]:>8.2f} {report['all'][1]:>8.2f} {report['book'][0]:>9.2f} "
+              f"{report['book'][1]:>9.2f} {report['rss_mb']:>8.0f} {sizes[backend]:>8.1f}")
+
+    # The flat store is exact, so it is the ground truth for Chroma's approximate search
+    for mode in ("all", "book"):
+        recalls = [
+            len(set(approx) & set(exact)) / max(1, len(exact))
+            for approx, exact in zip(reports[BACKEND_CHROMA]["results"][mode],
+                                     reports[BACKEND_NUMPY]["results"][mode])
+        ]
+        print(f"\nChroma recall@{args.k} ({mode}): {np.mean(recalls):.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Compact Vector Storage Recall Report
+====================================
+
+Builds compact copies of the library's vectors (float16 and/or PCA-reduced
+dimensions, fitted on the existing collection) and reports, for each
+configuration, the in-memory search matrix size and recall@k against exact
+search on the full float32 vectors, with and without rescoring the top
+candidates on the full vectors.
+
+Usage:
+    python scripts/report_compact_recall.py [--configs fp16,pca256,pca128-fp16] [--k 10]
+    python scripts/report_compact_recall.py --install pca128-fp16
+
+Options:
+    --configs LIST    Comma-separated configurations: fp16, pcaN or pcaN-fp16
+                      (default: fp16,pca384-fp16,pca256-fp16,pca128-fp16)
+    --queries N       Number of queries (default: 200)
+    --k N             Results per query (default: 10)
+    --rescore N       Candidates rescored per result (default: 4)
+    --fit-sample N    Vectors used to fit the PCA projection (default: 20000)
+    --source NAME     Backend holding the full vectors: chroma or numpy (default: chroma)
+    --install CONFIG  Build CONFIG into the library's NumPy store (which must be empty)
+                      instead of reporting; then set PERSONAL_LIBRARY_VECTOR_BACKEND=numpy
+    --db-dir PATH     Database directory (default: configured database directory)
+
+Queries are stored chunk embeddings with a little noise added, so no
+embedding model is needed.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from personal_doc_library.core.config import config
+from personal_doc_library.core.vector_backends import (
+    NumpyFlatBackend, copy_vectors, fit_projection, open_vector_backend
+)
+
+
+def parse_config(name):
+    """'pca128-fp16' -> (128, 'float16'); 'fp16' -> (None, 'float16')"""
+    dims, dtype = None, "float32"
+    for part in name.lower().split("-"):
+        if part == "fp16":
+            dtype = "float16"
+        elif part == "fp32":
+            dtype = "float32"
+        elif part.startswith("pca") and part[3:].isdigit():
+            dims = int(part[3:])
+        else:
+            raise ValueError(f"Unknown configuration '{name}'")
+    return dims, dtype
+
+
+def sample_vectors(store, count, seed):
+    ids = store.get(include=[])["ids"]
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(len(ids), size=min(count, len(ids)), replace=False)
+    return np.asarray(store.get(ids=[ids[i] for i in chosen], include=["embeddings"])["embeddings"])
+
+
+def build_compact(source, directory, name, fit_sample):
+    """Copy source into a new compact store; returns (store, retained PCA energy)"""
+    dims, dtype = parse_config(name)
+    sample = sample_vectors(source, fit_sample, seed=1)
+    full_dim = sample.shape[1]
+    projection, retained = (fit_projection(sample, dims) if dims else (None, 1.0))
+    store = NumpyFlatBackend(directory, dtype=dtype)
+    store.configure_compact(full_dim, projection)
+    copy_vectors(source, store)
+    return store, retained
+
+
+def result_keys(hits):
+    return [(metadata.get("book"), metadata.get("page"), text) for text, metadata, _ in hits]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report recall of compact vector storage")
+    parser.add_argument("--configs", default="fp16,pca384-fp16,pca256-fp16,pca128-fp16")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=NumpyFlatBackend.DEFAULT_RESCORE)
+    parser.add_argument("--fit-sample", type=int, default=20000)
+    parser.add_argument("--source", default="chroma", choices=["chroma", "numpy"])
+    parser.add_argument("--install", default=None)
+    parser.add_argument("--db-dir", default=None)
+    args = parser.parse_args()
+
+    db_dir = str(args.db_dir or config.db_directory)
+    source = open_vector_backend(db_dir, args.source)
+    if source.count() == 0:
+        print(f"No vectors found in {db_dir}; index some documents first.")
+        return 1
+
+    if args.install:
+        target_dir = os.path.join(db_dir, NumpyFlatBackend.DIRNAME)
+        if args.source == "numpy" or (os.path.exists(target_dir) and NumpyFlatBackend(target_dir).count()):
+            print(f"{target_dir} is not empty; move it aside before installing a compact store")
+            return 1
+        start = time.perf_counter()
+        store, retained = build_compact(source, target_dir, args.install, args.fit_sample)
+        print(f"Installed {args.install} store ({store.describe()}, PCA energy {retained:.3f}) "
+              f"with {store.count()} chunks in {time.perf_counter() - start:.1f}s")
+        print("Set PERSONAL_LIBRARY_VECTOR_BACKEND=numpy to use it.")
+        return 0
+
+    work_dir = tempfile.mkdtemp(prefix="ragdex_compact_")
+    try:
+        # Exact float32 reference, also the source every compact copy is built from
+        reference = NumpyFlatBackend(os.path.join(work_dir, "reference"), dtype="float32")
+        copy_vectors(source, reference)
+        total = reference.count()
+
+        rng = np.random.default_rng(0)
+        queries = sample_vectors(reference, args.queries, seed=0)
+        queries = queries + rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        truth = [set(result_keys(reference.query(q, args.k))) for q in queries]
+        full_mb = total * queries.shape[1] * 4 / (1024 * 1024)
+
+        print(f"{total} chunks, {len(queries)} queries, k={args.k}; full float32 matrix {full_mb:.0f} MB\n")
+        print(f"{'Config':<14} {'matrix MB':>10} {'bytes/chunk':>12} {'PCA energy':>11} "
+              f"{'recall':>8} {f'+rescore x{args.rescore}':>14} {'p50 ms':>8}")
+        for name in [c.strip() for c in args.configs.split(",") if c.strip()]:
+            store, retained = build_compact(reference, os.path.join(work_dir, name), name, args.fit_sample)
+            store.count()
+            matrix_mb = store._vectors.nbytes / (1024 * 1024)
+            recalls = {}
+            for rescore in (0, args.rescore):
+                store.rescore = rescore
+                latencies, hits = [], []
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    found = result_keys(store.query(query, args.k))
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    hits.append(len(expected & set(found)) / max(1, len(expected)))
+                recalls[rescore] = (np.mean(hits), np.percentile(latencies, 50))
+            print(f"{name:<14} {matrix_mb:>10.1f} {store._vectors.itemsize * store._vectors.shape[1]:>12} "
+                  f"{retained:>11.3f} {recalls[0][0]:>8.3f} {recalls[args.rescore][0]:>14.3f} "
+                  f"{recalls[args.rescore][1]:>8.2f}")
+            store.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
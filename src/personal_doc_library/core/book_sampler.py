@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Representative passages of a book
+Picks chunks that cover a book's content from its stored embeddings, so
+summaries see the whole book rather than whatever a search query hits
+"""
+
+import numpy as np
+
+
+def representative_sample(embeddings, count):
+    """Row positions of count representative embeddings, in selection order
+
+    Greedy farthest-point selection on cosine distance: the first pick is
+    the chunk closest to the book's centroid (its most typical passage),
+    then each pick is the chunk least similar to everything picked so far,
+    so the selection spreads across the book's topics. O(n * count).
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    total = len(vectors)
+    if total == 0 or count <= 0:
+        return []
+    if count >= total:
+        return list(range(total))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1)
+
+    first = int(np.argmax(vectors @ vectors.mean(axis=0)))
+    chosen = [first]
+    # Highest similarity of every chunk to any chosen chunk
+    closest = vectors @ vectors[first]
+    closest[first] = np.inf
+    for _ in range(count - 1):
+        pick = int(np.argmin(closest))
+        chosen.append(pick)
+        np.maximum(closest, vectors @ vectors[pick], out=closest)
+        closest[pick] = np.inf
+    return chosen
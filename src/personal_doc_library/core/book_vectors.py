@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Book-level vector index
+One normalized mean chunk embedding (centroid) per book, used to pick the
+books most relevant to a query before searching their chunks, and to find
+books similar to a given book
+"""
+
+import fcntl
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENV_COARSE_BOOKS = "PERSONAL_LIBRARY_COARSE_BOOKS"
+
+
+def coarse_books_from_env():
+    """Default number of books for two-stage search (0 = flat search)"""
+    value = os.getenv(ENV_COARSE_BOOKS)
+    if value:
+        try:
+            return max(0, int(value))
+        except ValueError:
+            logger.warning(f"Invalid {ENV_COARSE_BOOKS} value '{value}', using flat search")
+    return 0
+
+
+class BookVectorIndex:
+    """Centroid per book, stored in book_vectors.npz in the database directory
+
+    The indexer updates a book's centroid after embedding its chunks and
+    removes it with the book, and the MCP server may rebuild it. The file is
+    small (one vector per book) and is rewritten atomically on every change,
+    each load-modify-replace under a file lock so writers in different
+    processes never drop each other's centroids; readers reload it when it
+    has been replaced. Books are keyed by their path relative
+    to the books directory, with the file name kept alongside because chunk
+    metadata filters on it.
+    """
+
+    FILENAME = "book_vectors.npz"
+
+    def __init__(self, db_directory):
+        self.path = os.path.join(str(db_directory), self.FILENAME)
+        self._lock_path = self.path + ".lock"
+        self._lock = threading.Lock()
+        self._signature = None
+        self._paths = []
+        self._names = []
+        self._chunks = []
+        self._vectors = None
+        self._positions = {}
+
+    def _load(self):
+        """Re-read the file if another process changed it (call with the lock held)"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            if self._signature is not None:
+                self._set([], [], [], None)
+                self._signature = None
+            return
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                self._set(data["paths"].tolist(), data["names"].tolist(),
+                          data["chunks"].tolist(), data["vectors"])
+            self._signature = signature
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read book vectors from {self.path}: {e}")
+
+    def _set(self, paths, names, chunks, vectors):
+        self._paths, self._names, self._chunks, self._vectors = paths, names, chunks, vectors
+        self._positions = {path: i for i, path in enumerate(paths)}
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across threads and processes, held from load to save"""
+        with self._lock:
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        """Write to a temp file of our own and rename it into place (call under _write_lock)"""
+        dim = self._vectors.shape[1] if self._vectors is not None else 0
+        fd, temp_path = tempfile.mkstemp(prefix=self.FILENAME + ".", suffix=".tmp",
+                                         dir=os.path.dirname(self.path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    paths=np.array(self._paths, dtype=str),
+                    names=np.array(self._names, dtype=str),
+                    chunks=np.array(self._chunks, dtype=np.int64),
+                    vectors=self._vectors if self._vectors is not None else np.zeros((0, dim), dtype=np.float32)
+                )
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        stat = os.stat(self.path)
+        self._signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._paths)
+
+    def __contains__(self, rel_path):
+        with self._lock:
+            self._load()
+            return rel_path in self._positions
+
+    def update(self, rel_path, book_name, mean_embedding, chunks):
+        """Store a book's centroid (the mean of its chunk embeddings)"""
+        vector = self._normalize(mean_embedding)
+        with self._write_lock():
+            self._load()
+            position = self._positions.get(rel_path)
+            if position is not None:
+                self._vectors = self._vectors.copy()
+                self._vectors[position] = vector
+                self._names[position] = book_name
+                self._chunks[position] = int(chunks)
+            else:
+                vectors = vector[None, :] if self._vectors is None or not len(self._vectors) \
+                    else np.vstack([self._vectors, vector])
+                self._set(self._paths + [rel_path], self._names + [book_name],
+                          self._chunks + [int(chunks)], vectors)
+            self._save()
+
+    def remove(self, rel_path):
+        with self._write_lock():
+            self._load()
+            position = self._positions.get(rel_path)
+            if position is None:
+                return
+            keep = [i for i in range(len(self._paths)) if i != position]
+            self._set([self._paths[i] for i in keep], [self._names[i] for i in keep],
+                      [self._chunks[i] for i in keep], self._vectors[keep])
+            self._save()
+
+    def _ranked(self, vector, count, exclude=None):
+        scores = self._vectors @ vector
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        count = min(count, len(scores) - (1 if exclude is not None else 0))
+        if count <= 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count] if count < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self._paths[i], self._names[i], float(scores[i])) for i in top]
+
+    def top_books(self, query_embedding, count):
+        """(rel_path, book name, cosine) of the count books closest to the query"""
+        with self._lock:
+            self._load()
+            if not self._paths:
+                return []
+            return self._ranked(self._normalize(query_embedding), count)
+
+    def similar(self, rel_path, count=10):
+        """(rel_path, book name, cosine) of the count books closest to rel_path, or None if unknown"""
+        with self._lock:
+            self._load()
+            position = self._positions.get(rel_path)
+            if position is None:
+                return None
+            return self._ranked(self._vectors[position], count, exclude=position)
+
+    def rebuild(self, vectorstore, book_index, rel_paths=None):
+        """Recompute centroids from the embeddings already in the vector store
+
+        Rebuilds every book in book_index, or only rel_paths (keeping the rest).
+        """
+        paths, names, chunks, vectors = [], [], [], []
+        for rel_path in (book_index if rel_paths is None else rel_paths):
+            book_name = os.path.basename(rel_path)
+            stored = vectorstore.get(where={"book": book_name}, include=["metadatas", "embeddings"])
+            embeddings = np.asarray(stored["embeddings"], dtype=np.float32)
+            # Books with the same file name in different folders share the "book" value
+            owned = [i for i, metadata in enumerate(stored["metadatas"] or [])
+                     if metadata.get("rel_path", rel_path) == rel_path]
+            if not owned:
+                continue
+            paths.append(rel_path)
+            names.append(book_name)
+            chunks.append(len(owned))
+            vectors.append(self._normalize(embeddings[owned].mean(axis=0)))
+        rebuilt = len(paths)
+        with self._write_lock():
+            self._load()
+            if rel_paths is not None:
+                # Keep the books that were not rebuilt
+                done = set(paths)
+                for i, rel_path in enumerate(self._paths):
+                    if rel_path not in done:
+                        paths.append(rel_path)
+                        names.append(self._names[i])
+                        chunks.append(self._chunks[i])
+                        vectors.append(self._vectors[i])
+            self._set(paths, names, chunks, np.vstack(vectors) if vectors else None)
+            self._save()
+        logger.info(f"Rebuilt book vectors for {rebuilt} books")
+        return rebuilt
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Lightweight library catalog
+Answers metadata questions (books, indexing status, failed documents) from
+the JSON files in the database directory without loading torch, the
+embedding model or ChromaDB
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogViews:
+    """Sorted secondary indexes over one loaded book_index
+
+    by_name orders paths by file name (ties keep book_index order), with
+    each path's rank for re-sorting filtered subsets; by_time orders the
+    books that have an indexed_at timestamp, oldest first, with the
+    timestamps alongside for bisecting. Built once per book_index.json
+    change, so paging and "last N days" queries do not rescan or re-parse
+    the catalog.
+    """
+
+    def __init__(self, book_index):
+        self.by_name = sorted(book_index, key=os.path.basename)
+        self.rank = {path: position for position, path in enumerate(self.by_name)}
+        self.by_directory = {}
+        for path in self.by_name:
+            self.by_directory.setdefault(os.path.dirname(path), []).append(path)
+
+        timed = []
+        for path, info in book_index.items():
+            indexed_at = info.get('indexed_at') if isinstance(info, dict) else None
+            if not indexed_at:
+                continue
+            try:
+                moment = datetime.fromisoformat(indexed_at)
+            except (TypeError, ValueError):
+                logger.debug(f"Skipping unparseable indexed_at for {path}: {indexed_at!r}")
+                continue
+            timed.append((moment.timestamp(), path, moment))
+        timed.sort(key=lambda entry: entry[0])
+        self.timestamps = [timestamp for timestamp, _, _ in timed]
+        self.by_time = [(path, moment) for _, path, moment in timed]
+
+
+class LibraryCatalog:
+    """Read-only, mtime-cached view of book_index.json, index_status.json and failed_pdfs.json
+
+    Each file is re-parsed only when its mtime or size changes, so the
+    catalog follows the indexer's writes while repeated reads cost a stat
+    call. If a file is caught mid-write the last good copy is returned.
+    """
+
+    def __init__(self, db_directory, books_directory=None):
+        self.db_directory = str(db_directory)
+        self.books_directory = str(books_directory) if books_directory else None
+        self.index_file = os.path.join(self.db_directory, "book_index.json")
+        self.status_file = os.path.join(self.db_directory, "index_status.json")
+        self.failed_pdfs_file = os.path.join(self.db_directory, "failed_pdfs.json")
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._views_lock = threading.Lock()
+        self._views = (None, None)  # (book_index the views were built from, CatalogViews)
+        self._title_index = None
+
+    def _load(self, path, default):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return default
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not read {path}: {e}")
+            return cached[1] if cached else default
+        with self._lock:
+            self._cache[path] = (signature, data)
+        return data
+
+    @property
+    def book_index(self):
+        """Indexed documents keyed by path relative to the books directory"""
+        return self._load(self.index_file, {})
+
+    def _book_views(self):
+        """(book_index, CatalogViews), rebuilt when book_index.json has changed"""
+        book_index = self.book_index
+        with self._views_lock:
+            source, views = self._views
+            if source is not book_index:
+                start = time.perf_counter()
+                views = CatalogViews(book_index)
+                self._views = (book_index, views)
+                logger.debug(f"Built catalog views for {len(book_index)} books "
+                             f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return book_index, views
+
+    def list_books(self, pattern="", author="", offset=0, limit=50):
+        """One page of books sorted by file name, filtered by path pattern and/or directory
+
+        Returns (page, total_matching), where page holds (path, name, info)
+        tuples. Unfiltered pages are slices of the name-sorted index; an
+        author is narrowed with the per-directory lists and a pattern alone
+        with the trigram title index, and only the matches are re-sorted.
+        """
+        book_index, views = self._book_views()
+        if not pattern and not author:
+            matching = views.by_name
+        else:
+            if author:
+                # Few directories to test; the pattern then only checks their books
+                author_lower = author.lower()
+                candidates = [path for directory, paths in views.by_directory.items()
+                              if author_lower in directory.lower() for path in paths]
+                if pattern:
+                    pattern_lower = pattern.lower()
+                    candidates = [path for path in candidates if pattern_lower in path.lower()]
+            else:
+                candidates = self._titles(book_index).containing(pattern)
+            matching = sorted(candidates, key=views.rank.__getitem__)
+        page = [(path, os.path.basename(path), book_index[path]) for path in matching[offset:offset + limit]]
+        return page, len(matching)
+
+    def _titles(self, book_index):
+        """The trigram title index, synced with book_index"""
+        with self._views_lock:
+            if self._title_index is None:
+                from .title_index import TitleIndex
+                self._title_index = TitleIndex()
+            title_index = self._title_index
+        title_index.sync(book_index)
+        return title_index
+
+    def find_book(self, book_pattern, cutoff=0.6):
+        """(matched_books, exact_match_found, similarity_scores), as SharedRAG.find_book_by_fuzzy_match"""
+        return self._titles(self.book_index).find(book_pattern, cutoff)
+
+    def recent_books(self, days):
+        """(path, info, indexed_at datetime) of books indexed in the last days, most recent first"""
+        book_index, views = self._book_views()
+        start = bisect.bisect_right(views.timestamps, time.time() - days * 86400)
+        return [(path, book_index[path], moment) for path, moment in reversed(views.by_time[start:])]
+
+    def get_status(self):
+        """Current indexing status as published by the indexer"""
+        return self._load(self.status_file, None) or {
+            "status": "idle", "timestamp": datetime.now().isoformat()
+        }
+
+    def get_failed(self):
+        """Documents that failed to index, keyed by relative path"""
+        return self._load(self.failed_pdfs_file, {})
+
+    def get_stats(self):
+        """Library statistics that do not need the vector store"""
+        book_index = self.book_index
+        failed = self.get_failed()
+        return {
+            "total_books": len(book_index),
+            "total_chunks": sum(info.get("chunks", 0) for info in book_index.values()),
+            "failed_books": len(failed),
+            "cleaned_books": len([f for f in failed.values() if isinstance(f, dict) and f.get("cleaned", False)]),
+            "indexing_status": self.get_status()
+        }
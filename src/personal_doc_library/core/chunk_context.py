@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Chunk ordinals and context windows
+Chunks are stored under deterministic ids derived from the book's path and
+the chunk's position in the book, so the chunks around a search hit can be
+fetched by id and stitched back into continuous text
+"""
+
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Longest overlap looked for when chunks carry no start_index (the splitter overlaps by 150)
+MAX_OVERLAP_SCAN = 400
+
+
+def chunk_id(rel_path, chunk_index):
+    """Stable vector store id of a book's chunk_index-th chunk"""
+    return f"{hashlib.md5(rel_path.encode('utf-8')).hexdigest()[:16]}-{chunk_index}"
+
+
+def context_ids(metadata, radius):
+    """Ids of the chunks within radius of a hit, in book order (empty for legacy chunks)"""
+    rel_path = metadata.get('rel_path')
+    index = metadata.get('chunk_index')
+    if not rel_path or not isinstance(index, int) or radius <= 0:
+        return []
+    return [chunk_id(rel_path, i) for i in range(max(0, index - radius), index + radius + 1)]
+
+
+def _same_source(previous, current):
+    """Whether two chunks were split from the same loaded document (page or section)"""
+    return (previous.get('page') == current.get('page')
+            and previous.get('source') == current.get('source'))
+
+
+def _suffix_overlap(previous_text, text):
+    """Length of the longest suffix of previous_text that text starts with"""
+    for length in range(min(len(previous_text), len(text), MAX_OVERLAP_SCAN), 0, -1):
+        if previous_text.endswith(text[:length]):
+            return length
+    return 0
+
+
+def stitch_chunks(chunks):
+    """Join (text, metadata) chunks in book order without repeating their overlap
+
+    Chunks split from the same page overlap by up to the splitter's
+    chunk_overlap; start_index gives the exact overlap, with a text match as
+    the fallback. Chunks from different pages do not overlap and are joined
+    with a blank line.
+    """
+    stitched = ""
+    previous_text, previous_metadata = None, None
+    for text, metadata in chunks:
+        if previous_text is None:
+            stitched = text
+        elif _same_source(previous_metadata, metadata):
+            start = metadata.get('start_index')
+            previous_start = previous_metadata.get('start_index')
+            if isinstance(start, int) and isinstance(previous_start, int):
+                overlap = previous_start + len(previous_text) - start
+            else:
+                overlap = _suffix_overlap(previous_text, text)
+            if overlap > 0:
+                stitched += text[overlap:]
+            else:
+                stitched += "\n" + text
+        else:
+            stitched += "\n\n" + text
+        previous_text, previous_metadata = text, metadata
+    return stitched
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Request deadlines
+A tool call's time budget, handed down from the MCP server into search, so
+slow requests drop optional work and answer with partial results instead of
+running past the client's timeout
+"""
+
+import threading
+import time
+
+
+class Deadline:
+    """The time by which a request has to answer, and the work skipped to meet it
+
+    Deadline(None) never expires. Stages call allows() with their expected
+    duration before doing optional work and skip() when they leave it out, so
+    the caller can flag the response as partial.
+    """
+
+    def __init__(self, seconds=None, start=None):
+        start = time.monotonic() if start is None else start
+        self.expires_at = None if seconds is None else start + seconds
+        self._skipped = []
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Seconds left (inf without a deadline, never below 0)"""
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, seconds):
+        """Whether work expected to take this long still finishes in time"""
+        return self.remaining() > seconds
+
+    def skip(self, stage):
+        """Record an optional stage left out to meet the deadline"""
+        with self._lock:
+            if stage not in self._skipped:
+                self._skipped.append(stage)
+
+    @property
+    def skipped(self):
+        with self._lock:
+            return list(self._skipped)
+
+    @property
+    def partial(self):
+        """Whether anything was left out"""
+        return bool(self._skipped)
+
+
+class StageTimes:
+    """Running estimate of how long each search stage takes (exponential moving average)"""
+
+    SMOOTHING = 0.2  # Weight of the newest measurement
+
+    def __init__(self):
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            previous = self._seconds.get(stage)
+            self._seconds[stage] = seconds if previous is None else (
+                previous + self.SMOOTHING * (seconds - previous))
+
+    def estimate(self, stage):
+        """Expected seconds for stage (0 until it has been measured)"""
+        with self._lock:
+            return self._seconds.get(stage, 0.0)
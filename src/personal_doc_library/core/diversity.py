@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Diversity-aware re-ranking
+Maximal marginal relevance with a per-source cap over a search's candidate
+pool, using the candidates' stored embeddings, so a result list is not
+filled with near-identical passages from one book
+"""
+
+import math
+
+import numpy as np
+
+POOL_FACTOR = 4  # Candidates fetched per requested result when re-ranking
+MAX_POOL = 200   # Upper bound on the candidate pool
+
+
+def candidate_pool(k):
+    """Candidates to fetch for k diversified results"""
+    return max(k, min(k * POOL_FACTOR, MAX_POOL))
+
+
+def source_cap(k, diversity):
+    """Most results one source may contribute: k / 2 at low diversity, down to 1 at diversity 1"""
+    return max(1, math.ceil(k * (1.0 - diversity) / 2))
+
+
+def mmr_rank(query_embedding, embeddings, sources, k, diversity, max_per_source=None):
+    """Positions of up to k candidates in maximal-marginal-relevance order
+
+    Each pick maximizes (1 - diversity) * similarity to the query minus
+    diversity * the highest similarity to anything already picked (cosine).
+    Candidates whose source already has max_per_source picks are passed over
+    while other sources remain; once every remaining candidate comes from a
+    capped source the cap is lifted, so k positions come back whenever the
+    pool has k candidates. O(len(embeddings) * k).
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    total = len(vectors)
+    if total == 0 or k <= 0:
+        return []
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms > 0, norms, 1)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1)
+
+    relevance = (1.0 - diversity) * (vectors @ query)
+    redundancy = np.full(total, -np.inf, dtype=np.float32)  # Highest similarity to any pick
+    available = np.ones(total, dtype=bool)
+    under_cap = np.ones(total, dtype=bool)
+    _, source_ids = np.unique(np.asarray(sources, dtype=object).astype(str), return_inverse=True)
+    picked_per_source = np.zeros(source_ids.max() + 1, dtype=np.int64)
+    chosen = []
+    while len(chosen) < k and available.any():
+        scores = relevance - diversity * np.maximum(redundancy, 0) if chosen else relevance.copy()
+        eligible = available & under_cap
+        scores[~(eligible if eligible.any() else available)] = -np.inf
+        pick = int(np.argmax(scores))
+        chosen.append(pick)
+        available[pick] = False
+        np.maximum(redundancy, vectors @ vectors[pick], out=redundancy)
+
+        source = source_ids[pick]
+        picked_per_source[source] += 1
+        if max_per_source is not None and picked_per_source[source] >= max_per_source:
+            under_cap &= source_ids != source
+    return chosen
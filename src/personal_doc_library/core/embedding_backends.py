@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Embedding backends for the Personal Document Library
+Builds the LangChain embeddings object used for indexing and search:
+fp32 PyTorch (default), dynamic int8 quantized PyTorch, or ONNX Runtime,
+all running the same all-mpnet-base-v2 weights
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ENV_EMBEDDING_BACKEND = "PERSONAL_LIBRARY_EMBEDDING_BACKEND"
+
+DEFAULT_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+BACKEND_HUGGINGFACE = "huggingface"
+BACKEND_INT8 = "int8"
+BACKEND_ONNX = "onnx"
+BACKENDS = (BACKEND_HUGGINGFACE, BACKEND_INT8, BACKEND_ONNX)
+
+
+def configured_backend():
+    """Backend named by PERSONAL_LIBRARY_EMBEDDING_BACKEND (default: huggingface)"""
+    backend = os.getenv(ENV_EMBEDDING_BACKEND, BACKEND_HUGGINGFACE).strip().lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown {ENV_EMBEDDING_BACKEND} '{backend}', using {BACKEND_HUGGINGFACE}. "
+                       f"Choices: {', '.join(BACKENDS)}")
+        return BACKEND_HUGGINGFACE
+    return backend
+
+
+def select_device():
+    """Apple MPS when available, otherwise CPU"""
+    import torch
+    if hasattr(torch, 'backends') and hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+        return 'mps'
+    return 'cpu'
+
+
+def _huggingface(model_name, device, **model_kwargs):
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': device, **model_kwargs},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+
+def _int8(model_name):
+    """fp32 weights with every Linear layer dynamically quantized to int8 (CPU only)"""
+    import torch
+    embeddings = _huggingface(model_name, 'cpu')
+    # Swaps the Linear layers inside the SentenceTransformer in place
+    torch.quantization.quantize_dynamic(
+        embeddings.client, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    return embeddings
+
+
+def _onnx(model_name):
+    """ONNX Runtime export of the same model (needs the 'onnx' extra)"""
+    return _huggingface(model_name, 'cpu', backend='onnx')
+
+
+def create_embeddings(model_name=DEFAULT_MODEL, device=None, backend=None, fallback=True):
+    """Build embeddings for the configured backend
+
+    int8 and onnx always run on CPU; both produce vectors close enough to
+    fp32 to search an index built with fp32 (see
+    scripts/benchmark_embedding_backends.py). If the backend cannot be
+    loaded, fp32 is used instead unless fallback is False.
+    """
+    backend = backend or configured_backend()
+    if backend != BACKEND_HUGGINGFACE:
+        try:
+            embeddings = _int8(model_name) if backend == BACKEND_INT8 else _onnx(model_name)
+            logger.info(f"Using {backend} embedding backend for {model_name} on cpu")
+            return embeddings
+        except Exception as e:
+            if not fallback:
+                raise
+            logger.warning(f"Could not load {backend} embedding backend ({e}); using fp32 {BACKEND_HUGGINGFACE}")
+
+    return _huggingface(model_name, device or select_device())
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Shared embedding service for the MCP server and the indexer
+Runs one copy of the embedding model behind a Unix socket so that
+ragdex-mcp and ragdex-index do not each load their own. The service is
+started on demand by the first process that needs it, batches concurrent
+requests together and serves interactive queries ahead of indexing batches.
+"""
+
+import base64
+import fcntl
+import json
+import logging
+import os
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .config import config
+from .embedding_backends import DEFAULT_MODEL
+from .resource_plan import ResourcePlan
+
+logger = logging.getLogger(__name__)
+
+ENV_EMBEDDING_SERVICE = "PERSONAL_LIBRARY_EMBEDDING_SERVICE"
+ENV_EMBEDDING_SOCKET = "PERSONAL_LIBRARY_EMBEDDING_SOCKET"
+ENV_EMBEDDING_IDLE_TIMEOUT = "PERSONAL_LIBRARY_EMBEDDING_IDLE_TIMEOUT"
+
+DEFAULT_IDLE_TIMEOUT = 900   # Seconds without requests before the service exits
+START_TIMEOUT = 180          # Seconds to wait for a freshly spawned service (model load)
+MAX_SOCKET_PATH = 100        # AF_UNIX paths are limited to ~104 bytes on macOS
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+
+def service_enabled():
+    """Whether PERSONAL_LIBRARY_EMBEDDING_SERVICE opts into the shared service"""
+    return os.getenv(ENV_EMBEDDING_SERVICE, "").lower() in ("1", "true", "yes", "on")
+
+
+def default_socket_path(db_directory=None):
+    """Socket path: env override, else next to the database, else the temp dir"""
+    path = os.getenv(ENV_EMBEDDING_SOCKET)
+    if path:
+        return os.path.expanduser(path)
+    path = os.path.join(str(db_directory or config.db_directory), "embedding.sock")
+    if len(path) > MAX_SOCKET_PATH:
+        path = os.path.join(tempfile.gettempdir(), f"ragdex-embedding-{os.getuid()}.sock")
+    return path
+
+
+# Wire format: 4-byte big-endian length followed by a JSON message.
+# Embeddings travel as base64-encoded float32 arrays.
+
+def _send_message(sock, message):
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    sock.sendall(struct.pack('>I', len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _recv_message(sock):
+    (size,) = struct.unpack('>I', _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, size).decode('utf-8'))
+
+
+def _encode_array(vectors):
+    array = np.asarray(vectors, dtype=np.float32)
+    return {"shape": list(array.shape), "data": base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def _decode_array(payload):
+    array = np.frombuffer(base64.b64decode(payload["data"]), dtype=np.float32)
+    return array.reshape(payload["shape"])
+
+
+class _EmbedJob:
+    """One client request, possibly split into several batch slices"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = [None] * len(texts)
+        self.pending = len(texts)
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingServer:
+    """Serves embedding requests on a Unix socket with priority-aware batching
+
+    Requests are split into slices of at most max_batch texts and queued by
+    priority. A single batcher thread drains interactive slices first and
+    tops each model call up with bulk slices, so a search never waits behind
+    more than one in-flight indexing batch.
+    """
+
+    def __init__(self, socket_path, model_name=DEFAULT_MODEL, device=None,
+                 max_batch=64, batch_window=0.005, idle_timeout=None):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.device = device
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.idle_timeout = idle_timeout if idle_timeout is not None else self._idle_timeout_from_env()
+
+        self._cond = threading.Condition()
+        self._queues = {PRIORITY_INTERACTIVE: deque(), PRIORITY_BULK: deque()}
+        self._last_activity = time.monotonic()
+        self._running = False
+        self._sock = None
+        self.embeddings = None
+        self.stats = {"requests": 0, "texts": 0, "batches": 0}
+
+    def _idle_timeout_from_env(self):
+        value = os.getenv(ENV_EMBEDDING_IDLE_TIMEOUT)
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                logger.warning(f"Invalid {ENV_EMBEDDING_IDLE_TIMEOUT} value '{value}', using {DEFAULT_IDLE_TIMEOUT}s")
+        return DEFAULT_IDLE_TIMEOUT
+
+    def load_model(self):
+        from .embedding_backends import create_embeddings
+        logger.info(f"Loading embedding model {self.model_name}")
+        self.embeddings = create_embeddings(self.model_name, device=self.device)
+        # The service is the only embedding stage in this process: give it the whole machine
+        # unless PERSONAL_LIBRARY_TORCH_THREADS says otherwise
+        ResourcePlan().apply()
+
+    def submit(self, texts, priority):
+        """Queue texts for embedding and block until their vectors are ready"""
+        job = _EmbedJob(texts)
+        if not texts:
+            return []
+        queue = self._queues.get(priority, self._queues[PRIORITY_BULK])
+        with self._cond:
+            for start in range(0, len(texts), self.max_batch):
+                queue.append((job, start, texts[start:start + self.max_batch]))
+            self._last_activity = time.monotonic()
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+            self._cond.notify()
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.vectors
+
+    def _take_batch(self):
+        """Pop slices for the next model call, interactive first"""
+        batch = []
+        size = 0
+        for priority in (PRIORITY_INTERACTIVE, PRIORITY_BULK):
+            queue = self._queues[priority]
+            while queue and (not batch or size + len(queue[0][2]) <= self.max_batch):
+                item = queue.popleft()
+                batch.append(item)
+                size += len(item[2])
+        return batch
+
+    def _batch_loop(self):
+        while self._running:
+            with self._cond:
+                while self._running and not any(self._queues.values()):
+                    self._cond.wait(timeout=5)
+                    if self.idle_timeout and time.monotonic() - self._last_activity > self.idle_timeout:
+                        logger.info(f"Embedding service idle for {self.idle_timeout:.0f}s, shutting down")
+                        self.shutdown()
+                        return
+                if not self._running:
+                    return
+            # Give concurrent requests a moment to arrive so they share a model call
+            time.sleep(self.batch_window)
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                continue
+
+            texts = [text for _, _, slice_texts in batch for text in slice_texts]
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                error = None
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} texts failed: {e}")
+                vectors, error = None, e
+            self.stats["batches"] += 1
+
+            offset = 0
+            for job, start, slice_texts in batch:
+                if error is not None:
+                    job.error = error
+                    job.done.set()
+                    continue
+                job.vectors[start:start + len(slice_texts)] = vectors[offset:offset + len(slice_texts)]
+                offset += len(slice_texts)
+                job.pending -= len(slice_texts)
+                if job.pending <= 0:
+                    job.done.set()
+
+    def _handle_connection(self, conn):
+        with conn:
+            while self._running:
+                try:
+                    request = _recv_message(conn)
+                except (ConnectionError, OSError, ValueError):
+                    return
+                op = request.get("op")
+                try:
+                    if op == "ping":
+                        response = {"ok": True, "model": self.model_name, "pid": os.getpid(), "stats": dict(self.stats)}
+                    elif op == "embed":
+                        vectors = self.submit(request.get("texts", []), request.get("priority", PRIORITY_BULK))
+                        response = {"ok": True, "embeddings": _encode_array(vectors)}
+                    else:
+                        response = {"ok": False, "error": f"Unknown op: {op}"}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                try:
+                    _send_message(conn, response)
+                except OSError:
+                    return
+
+    def _bind(self):
+        # Remove a stale socket left behind by a crashed service
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                probe.close()
+                raise RuntimeError(f"Embedding service already running on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self._sock.listen(16)
+        # Wake up periodically so an idle shutdown is noticed
+        self._sock.settimeout(1.0)
+
+    def serve_forever(self):
+        if self.embeddings is None:
+            self.load_model()
+        self._bind()
+        self._running = True
+        self._last_activity = time.monotonic()
+        threading.Thread(target=self._batch_loop, daemon=True, name="embedding-batcher").start()
+        logger.info(f"Embedding service listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            while self._running:
+                try:
+                    conn, _ = self._sock.accept()
+                except socket.timeout:
+                    continue
+                except (OSError, AttributeError):
+                    break
+                conn.settimeout(None)
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._running = False
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        with self._cond:
+            for queue in self._queues.values():
+                while queue:
+                    job, _, _ = queue.popleft()
+                    job.error = RuntimeError("Embedding service shut down")
+                    job.done.set()
+            self._cond.notify_all()
+
+
+class EmbeddingServiceClient(Embeddings):
+    """LangChain Embeddings backed by the shared embedding service
+
+    Queries are sent at interactive priority and document batches at bulk
+    priority. If the service is not running it is spawned (once, guarded by
+    a lock file) and the call is retried.
+    """
+
+    def __init__(self, socket_path=None, model_name=DEFAULT_MODEL, start_timeout=START_TIMEOUT):
+        self.socket_path = socket_path or default_socket_path()
+        self.model_name = model_name
+        self.start_timeout = start_timeout
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _request(self, message):
+        sock = self._connect()
+        with sock:
+            _send_message(sock, message)
+            response = _recv_message(sock)
+        if not response.get("ok"):
+            raise RuntimeError(f"Embedding service error: {response.get('error')}")
+        return response
+
+    def ping(self):
+        return self._request({"op": "ping"})
+
+    def ensure_running(self):
+        """Connect to the service, spawning it if no process is serving the socket"""
+        try:
+            return self.ping()
+        except OSError:
+            pass
+
+        lock_path = self.socket_path + ".lock"
+        with open(lock_path, 'w') as lock_file:
+            # Only one process spawns the service; others wait on the lock
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                try:
+                    return self.ping()
+                except OSError:
+                    pass
+                self._spawn()
+                deadline = time.monotonic() + self.start_timeout
+                while time.monotonic() < deadline:
+                    try:
+                        return self.ping()
+                    except OSError:
+                        time.sleep(0.5)
+                raise RuntimeError(f"Embedding service did not start within {self.start_timeout}s")
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _spawn(self):
+        log_path = os.path.join(str(config.logs_directory), "embedding_service.log")
+        logger.info(f"Starting embedding service on {self.socket_path}")
+        with open(log_path, 'a') as log_file:
+            subprocess.Popen(
+                [sys.executable, "-m", "personal_doc_library.core.embedding_service",
+                 "--socket", self.socket_path, "--model", self.model_name],
+                stdin=subprocess.DEVNULL, stdout=log_file, stderr=log_file,
+                start_new_session=True
+            )
+
+    def _embed(self, texts, priority):
+        message = {"op": "embed", "texts": list(texts), "priority": priority}
+        try:
+            response = self._request(message)
+        except OSError:
+            # The service exited (idle timeout or crash); start it again
+            self.ensure_running()
+            response = self._request(message)
+        return _decode_array(response["embeddings"]).tolist()
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self._embed(texts, PRIORITY_BULK)
+
+    def embed_query(self, text):
+        return self._embed([text], PRIORITY_INTERACTIVE)[0]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Shared embedding service for Personal Document Library')
+    parser.add_argument('--socket', default=None, help='Unix socket path')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='Embedding model name')
+    parser.add_argument('--idle-timeout', type=float, default=None,
+                        help=f'Exit after this many idle seconds (default: {DEFAULT_IDLE_TIMEOUT})')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    server = EmbeddingServer(args.socket or default_socket_path(), model_name=args.model,
+                             idle_timeout=args.idle_timeout)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Interactive-query QoS between the MCP server and the indexer
+The MCP server touches a small signal file while it serves tool calls;
+the indexer checks it before each embedding batch and yields CPU until
+the server has been quiet for a while
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENV_INDEX_QOS = "PERSONAL_LIBRARY_INDEX_QOS"
+ENV_QOS_QUIET_SECONDS = "PERSONAL_LIBRARY_QOS_QUIET_SECONDS"
+
+SIGNAL_FILENAME = "interactive_activity"
+
+
+def qos_enabled():
+    """QoS is on unless PERSONAL_LIBRARY_INDEX_QOS is set to a false value"""
+    return os.getenv(ENV_INDEX_QOS, "true").lower() not in ("0", "false", "no", "off")
+
+
+class InteractiveSignal:
+    """Publishes interactive activity by touching a file in the database directory
+
+    Only the file's mtime carries information, so marking is a single utime
+    call and checking is a single stat call. Marks are rate-limited.
+    """
+
+    MIN_MARK_INTERVAL = 0.5
+
+    def __init__(self, db_directory):
+        self.path = os.path.join(str(db_directory), SIGNAL_FILENAME)
+        self._last_mark = 0.0
+
+    def mark(self):
+        now = time.monotonic()
+        if now - self._last_mark < self.MIN_MARK_INTERVAL:
+            return
+        self._last_mark = now
+        try:
+            os.utime(self.path, None)
+        except FileNotFoundError:
+            try:
+                with open(self.path, 'a'):
+                    pass
+            except OSError as e:
+                logger.debug(f"Could not create interactive signal: {e}")
+        except OSError as e:
+            logger.debug(f"Could not mark interactive activity: {e}")
+
+    def seconds_since_activity(self):
+        """Seconds since the last mark, or None if there has never been one"""
+        try:
+            return max(0.0, time.time() - os.stat(self.path).st_mtime)
+        except OSError:
+            return None
+
+
+class IndexingThrottle:
+    """Yields indexing CPU to interactive queries
+
+    Called before every embedding batch. While the MCP server has been active
+    within the quiet period, torch is limited to throttled_threads and each
+    batch is preceded by a short pause; full speed is restored once the
+    server has been quiet for quiet_seconds. Renicing is deliberately not
+    used: an unprivileged process cannot lower its niceness again, so the
+    indexer could never return to full priority.
+
+    When embeddings come from the shared embedding service the model runs in
+    another process; the service itself serves queries first, and the pause
+    here still keeps indexing batches out of the way.
+    """
+
+    DEFAULT_QUIET_SECONDS = 5.0
+    CHECK_INTERVAL = 0.25   # Minimum seconds between stat calls
+    BATCH_PAUSE = 0.25      # Pause before each batch while throttled
+
+    def __init__(self, db_directory, quiet_seconds=None, throttled_threads=1, enabled=None):
+        self.signal = InteractiveSignal(db_directory)
+        self.quiet_seconds = quiet_seconds if quiet_seconds is not None else self._quiet_from_env()
+        self.throttled_threads = throttled_threads
+        self.enabled = qos_enabled() if enabled is None else enabled
+        self.full_threads = None
+        self.throttled = False
+        self.throttle_events = 0
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._active = False
+
+    def _quiet_from_env(self):
+        value = os.getenv(ENV_QOS_QUIET_SECONDS)
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                logger.warning(f"Invalid {ENV_QOS_QUIET_SECONDS} value '{value}', "
+                               f"using {self.DEFAULT_QUIET_SECONDS}s")
+        return self.DEFAULT_QUIET_SECONDS
+
+    def interactive_active(self):
+        now = time.monotonic()
+        if now - self._last_check >= self.CHECK_INTERVAL:
+            self._last_check = now
+            age = self.signal.seconds_since_activity()
+            self._active = age is not None and age < self.quiet_seconds
+        return self._active
+
+    def _set_torch_threads(self, count):
+        try:
+            import torch
+            if self.full_threads is None:
+                self.full_threads = torch.get_num_threads()
+            torch.set_num_threads(max(1, count))
+        except Exception as e:
+            logger.debug(f"Could not change torch threads: {e}")
+
+    def set_full_threads(self, count):
+        """Thread count to restore when unthrottled (set by the resource plan)"""
+        with self._lock:
+            self.full_threads = count
+            if self.throttled:
+                self._set_torch_threads(self.throttled_threads)
+
+    def before_batch(self):
+        """Throttle or restore indexing speed depending on interactive activity"""
+        if not self.enabled:
+            return
+        with self._lock:
+            active = self.interactive_active()
+            if active and not self.throttled:
+                self._set_torch_threads(self.throttled_threads)
+                self.throttled = True
+                self.throttle_events += 1
+                logger.info(f"Interactive queries active: throttling indexing to "
+                            f"{self.throttled_threads} torch thread(s)")
+            elif not active and self.throttled:
+                if self.full_threads is not None:
+                    self._set_torch_threads(self.full_threads)
+                self.throttled = False
+                logger.info(f"No interactive queries for {self.quiet_seconds:.0f}s: "
+                            f"indexing back to full speed")
+        if active:
+            time.sleep(self.BATCH_PAUSE)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Page manifest
+Compact record of which pages of a document were indexed and how many chunks
+each page produced, stored in the document's book_index entry so page
+questions are answered without querying the vector store
+"""
+
+import bisect
+
+
+def _runs(pages):
+    """Consecutive runs of sorted integers as (start, end) pairs"""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return [(start, end) for start, end in runs]
+
+
+class PageManifest:
+    """Indexed pages as ranges, with run-length encoded chunk counts per page
+
+    Stored as {"pages": "0-41,43-300", "chunks": [[3, 40], [2, 1], ...]},
+    where each [count, run] pair means the next `run` indexed pages (in page
+    order) have `count` chunks each. A 300-page book typically needs a few
+    dozen bytes.
+    """
+
+    def __init__(self, ranges=(), chunk_runs=()):
+        self._starts = [start for start, _ in ranges]
+        self._ends = [end for _, end in ranges]
+        self._chunk_runs = [(int(count), int(run)) for count, run in chunk_runs]
+        self._counts = None
+
+    @classmethod
+    def from_chunk_pages(cls, chunk_pages):
+        """Build from the page number of every chunk; non-integer pages are ignored"""
+        counts = {}
+        for page in chunk_pages:
+            if isinstance(page, int) and not isinstance(page, bool):
+                counts[page] = counts.get(page, 0) + 1
+        pages = sorted(counts)
+        chunk_runs = []
+        for page in pages:
+            if chunk_runs and chunk_runs[-1][0] == counts[page]:
+                chunk_runs[-1][1] += 1
+            else:
+                chunk_runs.append([counts[page], 1])
+        return cls(_runs(pages), chunk_runs)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Parse a stored manifest; None if the entry has none (indexed before manifests)"""
+        if not data or "pages" not in data:
+            return None
+        ranges = []
+        for part in data["pages"].split(","):
+            if part:
+                start, _, end = part.partition("-")
+                ranges.append((int(start), int(end or start)))
+        return cls(ranges, data.get("chunks", []))
+
+    def to_dict(self):
+        return {
+            "pages": ",".join(str(s) if s == e else f"{s}-{e}" for s, e in zip(self._starts, self._ends)),
+            "chunks": [[count, run] for count, run in self._chunk_runs]
+        }
+
+    def __contains__(self, page):
+        position = bisect.bisect_right(self._starts, page) - 1
+        return position >= 0 and page <= self._ends[position]
+
+    def __len__(self):
+        return sum(end - start + 1 for start, end in zip(self._starts, self._ends))
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    def pages(self):
+        """All indexed page numbers in order"""
+        return [page for start, end in zip(self._starts, self._ends) for page in range(start, end + 1)]
+
+    def ranges(self):
+        """Indexed pages as a range string, e.g. '1-41,43-300'"""
+        return self.to_dict()["pages"]
+
+    @property
+    def total_chunks(self):
+        return sum(count * run for count, run in self._chunk_runs)
+
+    def chunks_on(self, page):
+        """Number of chunks indexed for page (0 if the page is not in the manifest)"""
+        if page not in self:
+            return 0
+        if self._counts is None:
+            counts = [count for count, run in self._chunk_runs for _ in range(run)]
+            self._counts = dict(zip(self.pages(), counts))
+        return self._counts.get(page, 0)
+
+    def split(self, pages):
+        """(available, missing) for the requested pages, keeping their order"""
+        available, missing = [], []
+        for page in pages:
+            (available if page in self else missing).append(page)
+        return available, missing
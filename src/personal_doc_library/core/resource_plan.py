@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+CPU resource plan for indexing
+Splits the machine's cores between document extraction workers and the
+embedding stage, and configures torch threading to match, so parallel
+indexing does not oversubscribe the CPU
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+ENV_TORCH_THREADS = "PERSONAL_LIBRARY_TORCH_THREADS"
+ENV_TORCH_INTEROP_THREADS = "PERSONAL_LIBRARY_TORCH_INTEROP_THREADS"
+
+
+def _int_from_env(env_var):
+    value = os.getenv(env_var)
+    if not value:
+        return None
+    try:
+        parsed = int(value)
+        if parsed >= 1:
+            return parsed
+    except ValueError:
+        pass
+    logger.warning(f"Invalid {env_var} value '{value}', using the computed plan")
+    return None
+
+
+class ResourcePlan:
+    """How many threads extraction and embedding may use
+
+    Extraction workers each keep roughly one core busy (PDF parsing, OCR
+    subprocesses). Embedding is a single shared stage: batches from all
+    workers run one at a time through the embedding slot, each using
+    torch_threads intra-op threads. Without the slot every worker's
+    add_documents call would fan out to a full-width torch pool at once.
+
+    torch_threads = cores - min(extraction_workers, cores // 2), so the
+    embedding stage always keeps at least half the machine. Inter-op
+    parallelism is not used by sentence-transformers inference and is
+    set to 1. Both can be overridden with PERSONAL_LIBRARY_TORCH_THREADS
+    and PERSONAL_LIBRARY_TORCH_INTEROP_THREADS.
+    """
+
+    def __init__(self, extraction_workers=0, cpu_count=None):
+        self.cpu_count = cpu_count or multiprocessing.cpu_count()
+        self.extraction_workers = max(0, extraction_workers)
+        self.embedding_slots = 1
+
+        reserved = min(self.extraction_workers, self.cpu_count // 2)
+        computed_threads = max(1, self.cpu_count - reserved)
+        override_threads = _int_from_env(ENV_TORCH_THREADS)
+        self.torch_threads = override_threads or computed_threads
+        override_interop = _int_from_env(ENV_TORCH_INTEROP_THREADS)
+        self.interop_threads = override_interop or 1
+        self.overridden = override_threads is not None or override_interop is not None
+
+    def describe(self):
+        source = "env override" if self.overridden else "computed"
+        return (f"{self.cpu_count} CPUs: {self.extraction_workers} extraction worker(s), "
+                f"{self.embedding_slots} embedding slot x {self.torch_threads} torch thread(s), "
+                f"{self.interop_threads} interop thread(s) ({source})")
+
+    def as_dict(self):
+        return {
+            "cpu_count": self.cpu_count,
+            "extraction_workers": self.extraction_workers,
+            "embedding_slots": self.embedding_slots,
+            "torch_threads": self.torch_threads,
+            "interop_threads": self.interop_threads,
+            "overridden": self.overridden,
+        }
+
+    def apply(self):
+        """Configure torch threading for this plan and log it
+
+        Only touches torch if it is already imported: processes that get
+        embeddings from the shared service never need to load it. The
+        inter-op pool size can only be set before the first parallel work,
+        so a later plan keeps the existing inter-op setting.
+        """
+        logger.info(f"Resource plan: {self.describe()}")
+        torch = sys.modules.get("torch")
+        if torch is None:
+            return False
+        try:
+            torch.set_num_threads(self.torch_threads)
+        except Exception as e:
+            logger.warning(f"Could not set torch threads to {self.torch_threads}: {e}")
+            return False
+        try:
+            if torch.get_num_interop_threads() != self.interop_threads:
+                torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError as e:
+            logger.debug(f"Torch inter-op threads already fixed: {e}")
+        return True
+
+    def embedding_semaphore(self):
+        """Semaphore that serializes batches through the shared embedding stage"""
+        return threading.BoundedSemaphore(self.embedding_slots)
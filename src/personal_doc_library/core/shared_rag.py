@@ -7,7 +7,6 @@ Common functionality used by both MCP server and background indexer
 # Standard library imports
 import os
 import logging
-import torch
 import hashlib
 import json
 import time
@@ -19,50 +18,81 @@ from pathlib import Path
 import fcntl
 from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
-import psutil
 import threading
 from collections import OrderedDict
-import difflib
 
 # Setup logging first
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Core langchain imports
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    UnstructuredEPubLoader,
-    UnstructuredPowerPointLoader
-)
-from langchain.schema import Document
-import pypdf
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-# from langchain_community.llms import Ollama  # Removed for direct RAG results
-
 # Project imports
 from .config import config
+from .status_publisher import StatusPublisher
+from .interactive_qos import IndexingThrottle
+from .resource_plan import ResourcePlan
+
+# Heavy dependencies (torch, langchain loaders, Chroma, pypdf) are imported
+# where they are used, so importing this module stays cheap for the CLI, the
+# web monitor and the MCP server's startup path. The names below remain
+# importable from this module for existing callers.
+_LAZY_ATTRIBUTES = {
+    "torch": ("torch", None),
+    "pypdf": ("pypdf", None),
+    "Document": ("langchain.schema", "Document"),
+    "PyPDFLoader": ("langchain_community.document_loaders", "PyPDFLoader"),
+    "UnstructuredEPubLoader": ("langchain_community.document_loaders", "UnstructuredEPubLoader"),
+    "UnstructuredPowerPointLoader": ("langchain_community.document_loaders", "UnstructuredPowerPointLoader"),
+    "RecursiveCharacterTextSplitter": ("langchain.text_splitter", "RecursiveCharacterTextSplitter"),
+    "HuggingFaceEmbeddings": ("langchain_community.embeddings", "HuggingFaceEmbeddings"),
+    "Chroma": ("langchain_community.vectorstores", "Chroma"),
+}
+
+_optional_loaders = {}
+
+
+def _word_loader_class():
+    """UnstructuredWordDocumentLoader for .doc/.docx support, or None if not installed"""
+    if "word" not in _optional_loaders:
+        try:
+            from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+            _optional_loaders["word"] = UnstructuredWordDocumentLoader
+        except ImportError:
+            _optional_loaders["word"] = None
+            logger.warning(
+                "UnstructuredWordDocumentLoader not available. "
+                "Legacy .doc file support requires: pip install 'ragdex[doc-support]' "
+                "and LibreOffice installed on your system. "
+                ".docx files will still work with python-docx."
+            )
+    return _optional_loaders["word"]
+
 
-# Optional import for .doc/.docx support
-try:
-    from langchain_community.document_loaders import UnstructuredWordDocumentLoader
-    WORD_LOADER_AVAILABLE = True
-except ImportError:
-    WORD_LOADER_AVAILABLE = False
-    logger.warning(
-        "UnstructuredWordDocumentLoader not available. "
-        "Legacy .doc file support requires: pip install 'ragdex[doc-support]' "
-        "and LibreOffice installed on your system. "
-        ".docx files will still work with python-docx."
-    )
-
-# Fallback for .docx files when unstructured is not available
-try:
-    from langchain_community.document_loaders import Docx2txtLoader
-    DOCX_FALLBACK_AVAILABLE = True
-except ImportError:
-    DOCX_FALLBACK_AVAILABLE = False
+def _docx_fallback_class():
+    """Docx2txtLoader fallback for .docx files when unstructured is not available"""
+    if "docx" not in _optional_loaders:
+        try:
+            from langchain_community.document_loaders import Docx2txtLoader
+            _optional_loaders["docx"] = Docx2txtLoader
+        except ImportError:
+            _optional_loaders["docx"] = None
+    return _optional_loaders["docx"]
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+        module = importlib.import_module(module_name)
+        return getattr(module, attribute) if attribute else module
+    if name == "WORD_LOADER_AVAILABLE":
+        return _word_loader_class() is not None
+    if name == "DOCX_FALLBACK_AVAILABLE":
+        return _docx_fallback_class() is not None
+    if name == "UnstructuredWordDocumentLoader" and _word_loader_class() is not None:
+        return _word_loader_class()
+    if name == "Docx2txtLoader" and _docx_fallback_class() is not None:
+        return _docx_fallback_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class IndexLock:
     """File-based locking to prevent simultaneous indexing with stale lock detection"""
@@ -381,6 +411,7 @@ class UltraLargePDFLoader:
             import pypdf
             import gc  # For garbage collection
             import signal
+            from langchain.schema import Document
             from contextlib import contextmanager
             
             # Parallel processing support for ultra-large files
@@ -495,6 +526,7 @@ class FastPDFLoader:
     
     def _extract_page_batch(self, pdf_reader, start_page, end_page):
         """Extract text from a batch of pages"""
+        from langchain.schema import Document
         documents = []
         for page_num in range(start_page, min(end_page, len(pdf_reader.pages))):
             try:
@@ -516,6 +548,9 @@ class FastPDFLoader:
     
     def load(self):
         """Load PDF and return list of Document objects"""
+        import pypdf
+        from langchain.schema import Document
+        from langchain_community.document_loaders import PyPDFLoader
         documents = []
         logger.info(f"FastPDFLoader starting to load {os.path.basename(self.file_path)}")
         
@@ -790,6 +825,7 @@ class SharedRAG:
         
         self.index_file = os.path.join(self.db_directory, "book_index.json")
         self.status_file = os.path.join(self.db_directory, "index_status.json")
+        self.progress_file = os.path.join(self.db_directory, "indexing_progress.json")
         self.failed_pdfs_file = os.path.join(self.db_directory, "failed_pdfs.json")
         self.book_index = self.load_book_index()
         self.lock = IndexLock()
@@ -798,23 +834,32 @@ class SharedRAG:
         import threading
         self._index_lock = threading.Lock()  # For book_index updates
         self._status_lock = threading.Lock()  # For status file updates
+        self.status_publisher = StatusPublisher(self.status_file, self.progress_file)
+        self.indexing_throttle = IndexingThrottle(self.db_directory)  # Yields to MCP queries
+        self.resource_plan = ResourcePlan()
+        from .book_vectors import BookVectorIndex
+        self.book_vectors = BookVectorIndex(self.db_directory)  # Per-book centroids
+        from .title_index import TitleIndex
+        self._title_index = TitleIndex()  # Trigram index over book paths for name lookups
+        from .deadline import StageTimes
+        self._stage_times = StageTimes()  # Typical search stage durations, checked against deadlines
+        from .single_flight import SingleFlight
+        self._search_flights = SingleFlight()  # Concurrent identical searches share one computation
+        self.deadline_coarse_books = 50  # Books searched when a deadline forces the two-stage search
+        self._embedding_slot = self.resource_plan.embedding_semaphore()  # Shared embedding stage
         
         # LRU cache for search results to prevent memory leaks
         self._search_cache = OrderedDict()
         self._cache_ttl = 300  # 5 minutes TTL
         self._max_cache_size = 50  # Maximum number of cached queries
+        self._cache_lock = threading.Lock()  # Searches may run concurrently (MCP worker pool)
+        self._sample_cache = OrderedDict()  # (rel_path, file hash, count) -> representative chunk ids
+        self._max_sample_cache_size = 64
         
         # Initialize embeddings
         logger.info("Initializing embeddings...")
-        device = 'mps' if hasattr(torch, 'backends') and hasattr(torch.backends, 'mps') and torch.backends.mps.is_available() else 'cpu'
-        
-        # BACKUP: Original 384-dim model was "sentence-transformers/all-MiniLM-L6-v2"
-        # Switching to original 768-dim model to match existing database
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2",
-            model_kwargs={'device': device},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        self.embeddings = self._create_embeddings()
+        self.resource_plan.apply()
         
         # LLM initialization removed - using direct RAG results
         # logger.info("Initializing Ollama LLM...")
@@ -823,6 +868,33 @@ class SharedRAG:
         # Initialize or load vector store
         self.vectorstore = self.initialize_vectorstore()
     
+    def _create_embeddings(self):
+        """Use the shared embedding service when enabled, else load the model locally"""
+        from .embedding_service import EmbeddingServiceClient, default_socket_path, service_enabled
+        if service_enabled():
+            try:
+                client = EmbeddingServiceClient(default_socket_path(self.db_directory))
+                info = client.ensure_running()
+                logger.info(f"Using shared embedding service (pid {info.get('pid')}) on {client.socket_path}")
+                return client
+            except Exception as e:
+                logger.warning(f"Embedding service unavailable, loading model locally: {e}")
+        
+        from .embedding_backends import create_embeddings
+        
+        # BACKUP: Original 384-dim model was "sentence-transformers/all-MiniLM-L6-v2"
+        # Switching to original 768-dim model to match existing database
+        return create_embeddings("sentence-transformers/all-mpnet-base-v2")
+    
+    def configure_resources(self, extraction_workers):
+        """Re-plan torch threading around the indexer's extraction worker count"""
+        plan = ResourcePlan(extraction_workers)
+        plan.apply()
+        self.resource_plan = plan
+        # QoS restores this thread count once interactive queries go quiet
+        self.indexing_throttle.set_full_threads(plan.torch_threads)
+        return plan
+    
     def load_book_index(self):
         """Load the book index from disk"""
         if os.path.exists(self.index_file):
@@ -837,22 +909,22 @@ class SharedRAG:
         """Save the book index to disk (thread-safe)"""
         os.makedirs(self.db_directory, exist_ok=True)
         with self._index_lock:
-            with open(self.index_file, 'w') as f:
+            # Write-then-rename so readers (e.g. the MCP catalog) never see a partial file
+            temp_file = self.index_file + '.tmp'
+            with open(temp_file, 'w') as f:
                 json.dump(self.book_index, f, indent=2)
+            os.replace(temp_file, self.index_file)
     
     def update_status(self, status, details=None):
-        """Update indexing status file (thread-safe)"""
-        status_data = {
-            "status": status,
-            "timestamp": datetime.now().isoformat(),
-            "details": details or {}
-        }
-        with self._status_lock:
-            with open(self.status_file, 'w') as f:
-                json.dump(status_data, f, indent=2)
+        """Update indexing status (thread-safe, published at a bounded rate)"""
+        self.status_publisher.set_status(status, details)
     
     def get_indexing_status(self):
         """Get current indexing status"""
+        # Status set by this process is authoritative and newer than the file
+        status = self.status_publisher.get_status()
+        if status is not None:
+            return status
         if os.path.exists(self.status_file):
             try:
                 with open(self.status_file, 'r') as f:
@@ -870,35 +942,20 @@ class SharedRAG:
         return self.lock.get_lock_info()
     
     def update_progress(self, stage, current_page=None, total_pages=None, chunks_generated=None, current_file=None):
-        """Update detailed progress tracking"""
-        progress_file = os.path.join(self.db_directory, "indexing_progress.json")
-        
-        # Get memory usage
-        try:
-            process = psutil.Process()
-            memory_mb = process.memory_info().rss / (1024 * 1024)
-        except:
-            memory_mb = 0
-        
+        """Update detailed progress tracking for one document"""
+        current_file = current_file or self.get_status().get('details', {}).get('current_file')
         progress_data = {
-            "timestamp": datetime.now().isoformat(),
             "stage": stage,  # loading, extracting, chunking, embedding
             "current_page": current_page,
             "total_pages": total_pages,
             "chunks_generated": chunks_generated,
-            "memory_mb": round(memory_mb, 1),
-            "current_file": current_file or self.get_status().get('details', {}).get('current_file')
+            "current_file": current_file
         }
-        
-        try:
-            with open(progress_file, 'w') as f:
-                json.dump(progress_data, f, indent=2)
-        except Exception as e:
-            logger.warning(f"Could not update progress: {e}")
+        self.status_publisher.update_progress(current_file or "default", progress_data)
     
     def is_process_healthy(self):
         """Check if the indexing process is healthy"""
-        progress_file = os.path.join(self.db_directory, "indexing_progress.json")
+        progress_file = self.progress_file
         
         # Check if progress file exists
         if not os.path.exists(progress_file):
@@ -938,20 +995,40 @@ class SharedRAG:
         return hash_md5.hexdigest()
     
     def initialize_vectorstore(self):
-        """Initialize or load the vector store"""
-        if os.path.exists(self.db_directory) and os.path.exists(os.path.join(self.db_directory, "chroma.sqlite3")):
+        """Initialize or load the vector store (backend chosen by PERSONAL_LIBRARY_VECTOR_BACKEND)"""
+        from .vector_backends import open_vector_backend
+        if os.path.exists(os.path.join(self.db_directory, "chroma.sqlite3")):
             logger.info("Loading existing vector store...")
-            return Chroma(
-                persist_directory=self.db_directory,
-                embedding_function=self.embeddings
-            )
         else:
             logger.info("Creating new vector store...")
-            os.makedirs(self.db_directory, exist_ok=True)
-            return Chroma(
-                embedding_function=self.embeddings,
-                persist_directory=self.db_directory
-            )
+        return open_vector_backend(self.db_directory)
+    
+    def add_documents(self, documents):
+        """Embed documents and add them to the vector store; returns the embeddings
+
+        Book chunks (with rel_path and chunk_index metadata) get deterministic
+        ids so their neighbours can be fetched by id; others get random ids.
+        """
+        from .chunk_context import chunk_id
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+        ids = None
+        if metadatas and all('rel_path' in m and 'chunk_index' in m for m in metadatas):
+            ids = [chunk_id(m['rel_path'], m['chunk_index']) for m in metadatas]
+        embeddings = self.embeddings.embed_documents(texts)
+        self.vectorstore.add(texts, metadatas, embeddings, ids=ids)
+        return embeddings
+    
+    def rebuild_book_vectors(self, missing_only=True):
+        """Compute book centroids from stored embeddings (for books indexed before they existed)"""
+        rel_paths = [p for p in self.book_index if p not in self.book_vectors] if missing_only else None
+        if rel_paths == []:
+            return 0
+        return self.book_vectors.rebuild(self.vectorstore, self.book_index, rel_paths)
+    
+    def similarity_search_with_score(self, query, k, where=None):
+        """Embed the query and return (text, metadata, distance) for the k closest chunks"""
+        return self.vectorstore.query(self.embeddings.embed_query(query), k, where=where)
     
     def index_emails(self):
         """Index emails from Apple Mail and Outlook"""
@@ -1005,6 +1082,7 @@ class SharedRAG:
             logger.info(f"Adding {len(all_email_documents)} total email documents to vector store...")
 
             # Split emails into chunks if needed
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
             text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=1200,
                 chunk_overlap=150
@@ -1012,16 +1090,8 @@ class SharedRAG:
             split_email_docs = text_splitter.split_documents(all_email_documents)
 
             # Add to vector store
-            if self.vector_store is None:
-                # Create new vector store
-                self.vector_store = Chroma.from_documents(
-                    documents=split_email_docs,
-                    embedding=self.embeddings,
-                    persist_directory=self.persist_directory
-                )
-            else:
-                # Add to existing vector store
-                self.vector_store.add_documents(split_email_docs)
+            for i in range(0, len(split_email_docs), 100):
+                self.add_documents(split_email_docs[i:i + 100])
 
             logger.info(f"Successfully indexed {len(all_email_documents)} emails")
 
@@ -1079,7 +1149,8 @@ class SharedRAG:
             return OCRPDFLoader(filepath)  # Use OCR-enabled PDF loader
         elif file_ext in ['.docx', '.doc']:
             # Handle Word documents with graceful fallback
-            if file_ext == '.doc' and not WORD_LOADER_AVAILABLE:
+            word_loader = _word_loader_class()
+            if file_ext == '.doc' and word_loader is None:
                 # Legacy .doc format requires optional dependencies
                 raise ValueError(
                     f"Legacy .doc file support requires optional dependencies. "
@@ -1087,11 +1158,12 @@ class SharedRAG:
                     f"and ensure LibreOffice is installed on your system. "
                     f"File: {os.path.basename(filepath)}"
                 )
-            elif file_ext == '.docx' and not WORD_LOADER_AVAILABLE:
+            elif file_ext == '.docx' and word_loader is None:
                 # .docx can use fallback loader with python-docx
-                if DOCX_FALLBACK_AVAILABLE:
+                docx_loader = _docx_fallback_class()
+                if docx_loader is not None:
                     logger.info(f"Using Docx2txtLoader fallback for {os.path.basename(filepath)}")
-                    return Docx2txtLoader(filepath)
+                    return docx_loader(filepath)
                 else:
                     raise ValueError(
                         f"No Word document loader available. "
@@ -1100,13 +1172,15 @@ class SharedRAG:
                     )
             else:
                 # UnstructuredWordDocumentLoader is available
-                return UnstructuredWordDocumentLoader(filepath)
+                return word_loader(filepath)
         elif file_ext == '.epub':
+            from langchain_community.document_loaders import UnstructuredEPubLoader
             return UnstructuredEPubLoader(filepath)
         elif file_ext in ['.mobi', '.azw', '.azw3']:
             # Use custom MOBI loader for MOBI/Kindle formats
             return MOBILoader(filepath)
         elif file_ext in ['.pptx', '.ppt']:
+            from langchain_community.document_loaders import UnstructuredPowerPointLoader
             return UnstructuredPowerPointLoader(filepath)
         else:
             raise ValueError(f"Unsupported file type: {file_ext}")
@@ -1249,12 +1323,7 @@ class SharedRAG:
             logger.info(f"Processing {doc_type}: {rel_path}")
             
             # Update status but preserve any existing details like progress
-            try:
-                with open(self.status_file, 'r') as f:
-                    current_status = json.load(f)
-                    existing_details = current_status.get('details', {})
-            except:
-                existing_details = {}
+            existing_details = self.get_indexing_status().get('details', {})
             
             # Preserve critical progress fields if they exist
             preserved_fields = ['progress', 'success', 'failed', 'percentage', 'parallel_workers']
@@ -1273,6 +1342,7 @@ class SharedRAG:
             if file_size_mb > 2048:  # Skip files larger than 2GB (2048MB)
                 logger.warning(f"Skipping {rel_path}: File too large ({file_size_mb:.1f}MB)")
                 self.handle_failed_document(filepath, f"File too large: {file_size_mb:.1f}MB")
+                self.update_progress("failed", current_file=rel_path)
                 return False
             
             # Handle CloudDocs permission issue by copying to temp location if needed
@@ -1325,7 +1395,7 @@ class SharedRAG:
             
             result_queue = queue.Queue()
             exception_queue = queue.Queue()
-            progress_file = os.path.join(self.db_directory, "indexing_progress.json")
+            progress_file = self.progress_file
             
             def load_with_timeout():
                 try:
@@ -1395,24 +1465,21 @@ class SharedRAG:
                 elapsed = time.time() - start_time
                 time_since_progress = time.time() - last_progress_time
                 
-                # Check progress every 10 seconds, ensuring non-negative sleep
+                # Check progress every 10 seconds (or as soon as loading finishes)
                 remaining_time = timeout_seconds - elapsed
-                time.sleep(min(10, max(0, remaining_time)))
+                load_thread.join(timeout=min(10, max(0, remaining_time)))
                 
-                # Read current progress
-                try:
-                    if os.path.exists(progress_file):
-                        with open(progress_file, 'r') as f:
-                            progress_data = json.load(f)
-                            current_progress = progress_data.get('chunks_generated') or progress_data.get('current_page')
-                            
-                            # Check if progress has been made
-                            if current_progress and current_progress != last_progress_value:
-                                logger.info(f"Progress detected: {current_progress} (was {last_progress_value})")
-                                last_progress_value = current_progress
-                                last_progress_time = time.time()
-                except:
-                    pass  # Ignore errors reading progress
+                # Read this document's progress from memory; other workers
+                # track their own documents separately
+                progress_data = self.status_publisher.get_progress(rel_path)
+                if progress_data:
+                    current_progress = progress_data.get('chunks_generated') or progress_data.get('current_page')
+                    
+                    # Check if progress has been made
+                    if current_progress and current_progress != last_progress_value:
+                        logger.info(f"Progress detected: {current_progress} (was {last_progress_value})")
+                        last_progress_value = current_progress
+                        last_progress_time = time.time()
                 
                 # Check if we should timeout
                 if elapsed > timeout_seconds:
@@ -1429,6 +1496,7 @@ class SharedRAG:
                         # Try to terminate the thread cleanly if possible
                         # Note: Thread termination in Python is limited, but we can try to signal it
                         self.handle_failed_document(filepath, f"Timeout after {elapsed:.0f}s - file may be corrupted or too complex")
+                        self.update_progress("failed", current_file=rel_path)
                         return False
                 
                 if not load_thread.is_alive():
@@ -1457,11 +1525,13 @@ class SharedRAG:
             chunk_start = time.perf_counter()
             logger.info(f"Splitting {rel_path} into chunks...")
             self.update_progress("chunking", total_pages=total_sections, current_file=rel_path)
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
             text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=1200,  # Slightly larger chunks for better context
                 chunk_overlap=150,  # Less overlap for efficiency
                 separators=["\n\n", "\n", ". ", " ", ""],
-                length_function=len
+                length_function=len,
+                add_start_index=True  # Offset in the page, used to stitch neighbouring chunks
             )
 
             chunks = text_splitter.split_documents(documents)
@@ -1482,7 +1552,8 @@ class SharedRAG:
             energy_keywords = {'energy', 'chakra', 'healing', 'aura'}
             philosophy_keywords = {'conscious', 'awareness', 'enlighten', 'spiritual'}
 
-            for chunk in chunks:
+            for chunk_index, chunk in enumerate(chunks):
+                chunk.metadata['chunk_index'] = chunk_index  # Position in the book; also keys the chunk id
                 chunk.metadata['book'] = book_name
                 chunk.metadata['folder'] = folder_path
                 chunk.metadata['rel_path'] = rel_path
@@ -1515,11 +1586,16 @@ class SharedRAG:
             self.update_progress("embedding", total_pages=total_sections, chunks_generated=len(chunks), current_file=rel_path)
 
             # Add in batches for better performance
+            import numpy as np
             batch_size = 100
+            embedding_sum = None  # For the book's centroid
             for i in range(0, len(chunks), batch_size):
                 batch_start = time.perf_counter()
                 batch = chunks[i:i + batch_size]
-                self.vectorstore.add_documents(batch)
+                with self._embedding_slot:
+                    self.indexing_throttle.before_batch()
+                    batch_sum = np.sum(self.add_documents(batch), axis=0)
+                embedding_sum = batch_sum if embedding_sum is None else embedding_sum + batch_sum
                 batch_time = time.perf_counter() - batch_start
 
                 if i + batch_size < len(chunks):
@@ -1534,10 +1610,12 @@ class SharedRAG:
             embed_time = time.perf_counter() - embed_start
             logger.info(f"Embedded {len(chunks)} chunks in {embed_time:.2f}s ({len(chunks)/embed_time:.1f} chunks/sec)")
 
-            # Note: Removed self.vectorstore.persist() as ChromaDB 0.4.x+ auto-persists
+            # Note: Both vector backends persist on write
             self.update_progress("completed", total_pages=total_sections, chunks_generated=len(chunks), current_file=rel_path)
             
             # Update index (thread-safe)
+            from .page_manifest import PageManifest
+            page_manifest = PageManifest.from_chunk_pages(chunk.metadata.get('page') for chunk in chunks)
             with self._index_lock:
                 self.book_index[rel_path] = {
                     'hash': self.get_file_hash(filepath),
@@ -1546,7 +1624,13 @@ class SharedRAG:
                     'document_type': doc_type,
                     'indexed_at': datetime.now().isoformat()
                 }
+                if page_manifest:
+                    # Indexed pages and chunks per page, so page lookups skip the vector store
+                    self.book_index[rel_path]['page_manifest'] = page_manifest.to_dict()
+            self._title_index.mark_changed()
             self.save_book_index()
+            if embedding_sum is not None:
+                self.book_vectors.update(rel_path, book_name, embedding_sum / len(chunks), len(chunks))
             
             logger.info(f"Successfully indexed {rel_path}: {len(chunks)} chunks from {total_sections} sections")
 
@@ -1565,6 +1649,8 @@ class SharedRAG:
         except Exception as e:
             logger.error(f"Error processing {filepath}: {str(e)}")
             self.handle_failed_document(filepath, str(e))
+            # Take the document off the published list of active workers
+            self.update_progress("failed", current_file=rel_path)
             
             # Clean up temporary file if it was created
             self.cleanup_temp_file(working_filepath, filepath)
@@ -1827,12 +1913,13 @@ class SharedRAG:
         try:
             # Delete from vector store
             book_name = os.path.basename(rel_path)
-            collection = self.vectorstore._collection
-            collection.delete(where={"book": book_name})
+            self.vectorstore.delete(where={"book": book_name})
+            self.book_vectors.remove(rel_path)
             
             # Remove from index (thread-safe)
             with self._index_lock:
                 del self.book_index[rel_path]
+            self._title_index.mark_changed()
             if not skip_save:
                 self.save_book_index()
             
@@ -1840,7 +1927,79 @@ class SharedRAG:
         except Exception as e:
             logger.error(f"Error removing {rel_path}: {str(e)}")
     
-    def search(self, query, k=10, filter_type=None, synthesize=False, folder=None):
+    WARMUP_PROBE_QUERY = "meditation practice and inner peace"
+    
+    def _read_into_page_cache(self, block_size=1024 * 1024):
+        """Read the vector store files (Chroma database and HNSW segments, or the
+        NumPy flat store) so they sit in the OS page cache
+        
+        Returns the number of bytes read.
+        """
+        from .vector_backends import BACKEND_NUMPY, NumpyFlatBackend
+        if getattr(self.vectorstore, "name", None) == BACKEND_NUMPY:
+            numpy_dir = os.path.join(self.db_directory, NumpyFlatBackend.DIRNAME)
+            paths = [entry.path for entry in os.scandir(numpy_dir) if entry.is_file()]
+        else:
+            paths = [os.path.join(self.db_directory, "chroma.sqlite3")]
+            for entry in os.scandir(self.db_directory):
+                # Each HNSW segment lives in a UUID-named directory (data_level0.bin, link_lists.bin, ...)
+                if entry.is_dir() and entry.name != NumpyFlatBackend.DIRNAME:
+                    for segment_file in os.scandir(entry.path):
+                        if segment_file.is_file():
+                            paths.append(segment_file.path)
+        
+        total = 0
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                    while True:
+                        block = f.read(block_size)
+                        if not block:
+                            break
+                        total += len(block)
+            except OSError as e:
+                logger.debug(f"Could not preload {path}: {e}")
+        return total
+    
+    def warm_up(self, probe_query=None):
+        """Bring the first search up to steady-state speed
+        
+        Runs a probe query cold, then reads the vector segment files into the
+        page cache, pushes a dummy batch through the embedding model and runs
+        the probe query again. Returns timings in milliseconds.
+        """
+        probe_query = probe_query or self.WARMUP_PROBE_QUERY
+        report = {}
+        
+        def timed(fn):
+            start = time.perf_counter()
+            fn()
+            return round((time.perf_counter() - start) * 1000, 1)
+        
+        def probe():
+            if self.vectorstore is not None:
+                self.similarity_search_with_score(probe_query, k=5)
+        
+        report["probe_cold_ms"] = timed(probe)
+        
+        start = time.perf_counter()
+        bytes_read = self._read_into_page_cache()
+        report["page_cache_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        report["page_cache_mb"] = round(bytes_read / (1024 * 1024), 1)
+        
+        # A document-sized batch exercises the same kernels as indexing and search
+        report["model_batch_ms"] = timed(lambda: self.embeddings.embed_documents([probe_query] * 8))
+        report["embed_query_ms"] = timed(lambda: self.embeddings.embed_query(probe_query))
+        report["probe_warm_ms"] = timed(probe)
+        
+        logger.info(f"Warm-up: probe query {report['probe_cold_ms']:.0f}ms cold -> "
+                    f"{report['probe_warm_ms']:.0f}ms warm, preloaded {report['page_cache_mb']:.0f}MB")
+        return report
+    
+    def search(self, query, k=10, filter_type=None, synthesize=False, folder=None, top_books=None,
+               context_chunks=0, deadline=None, diversity=0.0, book=None):
         """Search the vector store with caching
 
         Args:
@@ -1849,6 +2008,17 @@ class SharedRAG:
             filter_type: Filter by content type (practice, energy_work, etc.)
             synthesize: Whether to synthesize results (deprecated, kept for compatibility)
             folder: Optional folder path to restrict search (e.g., "DigitalFence" or "DigitalFence/OU students resumes")
+            top_books: Two-stage search: pick this many books by centroid, then search only
+                their chunks (default: PERSONAL_LIBRARY_COARSE_BOOKS, 0 = flat search)
+            context_chunks: Also return each hit's text widened by this many neighbouring
+                chunks on either side, stitched without the overlap, as "context"
+            deadline: Optional Deadline. When the usual query would not finish in time the
+                search narrows to fewer candidates, and context expansion is skipped when
+                it would not fit; skipped stages are recorded on the deadline
+            diversity: 0-1. Above 0, re-rank a larger candidate pool by maximal marginal
+                relevance with a per-source cap, trading relevance for variety across books
+            book: Optional book file name; only its chunks are searched (no book
+                pre-selection and no per-source cap)
 
         Returns:
             List of formatted search results
@@ -1856,84 +2026,178 @@ class SharedRAG:
         if not self.vectorstore:
             return []
 
+        if top_books is None:
+            from .book_vectors import coarse_books_from_env
+            top_books = coarse_books_from_env()
+
         # Create cache key including folder
-        cache_key = f"{query}:{k}:{filter_type}:{folder}"
+        diversity = max(0.0, min(float(diversity or 0), 1.0))
+        cache_key = f"{query}:{k}:{filter_type}:{folder}:{top_books}:{context_chunks}:{diversity}:{book}"
 
         # Check cache
-        if cache_key in self._search_cache:
-            cached_result, timestamp = self._search_cache[cache_key]
-            if time.time() - timestamp < self._cache_ttl:
-                logger.debug(f"Cache hit for query: {query[:50]}...")
-                # Move to end (most recently used)
-                self._search_cache.move_to_end(cache_key)
-                return cached_result
-            else:
-                # Remove expired entry
-                del self._search_cache[cache_key]
+        with self._cache_lock:
+            if cache_key in self._search_cache:
+                cached_result, timestamp = self._search_cache[cache_key]
+                if time.time() - timestamp < self._cache_ttl:
+                    logger.debug(f"Cache hit for query: {query[:50]}...")
+                    # Move to end (most recently used)
+                    self._search_cache.move_to_end(cache_key)
+                    return cached_result
+                else:
+                    # Remove expired entry
+                    del self._search_cache[cache_key]
 
+        # The same search already running (another agent sub-task): wait for it instead of repeating it
+        # A waiter keeps to its own deadline even if the running search has a later one or none
+        wait = None if deadline is None or deadline.expires_at is None else deadline.remaining()
+        try:
+            results, skipped = self._search_flights.do(
+                cache_key, lambda: self._search_uncached(query, k, filter_type, folder, top_books,
+                                                         context_chunks, deadline, diversity, cache_key, book),
+                timeout=wait)
+        except TimeoutError:
+            logger.warning(f"Identical search still running at the deadline, answering empty: {query[:50]}...")
+            deadline.skip("shared search")
+            return []
+        if deadline is not None:
+            # Callers sharing a degraded result get the same partial flag
+            for stage in skipped:
+                deadline.skip(stage)
+        return results
+
+    def _search_uncached(self, query, k, filter_type, folder, top_books, context_chunks, deadline, diversity,
+                         cache_key, book=None):
+        """Run one search and cache it if complete; returns (results, stages skipped for the deadline)"""
         try:
             # Get more results if folder filtering is needed (will filter post-search)
             k_search = k * 3 if folder else k
-            search_kwargs = {"k": min(k_search, self.vectorstore._collection.count() or 1)}
-
             # Build filter conditions (only for type, not folder since ChromaDB doesn't support $contains)
-            if filter_type:
-                search_kwargs["filter"] = {"type": filter_type}
-
-            results = self.vectorstore.similarity_search_with_score(
-                query, **search_kwargs
-            )
+            where = {"type": filter_type} if filter_type else None
+            if book:
+                # One book: filter before ranking so other books cannot crowd it out of the pool
+                book_filter = {"book": book}
+                where = {"$and": [where, book_filter]} if where else book_filter
+                top_books = 0
+
+            query_embedding = self.embeddings.embed_query(query)
+            query_stage = "query"
+            if deadline is not None and not deadline.allows(self._stage_times.estimate("query")):
+                # Degraded runs are timed separately so they do not lower the full query's estimate
+                query_stage = "query (degraded)"
+                # Short on time: search fewer candidates rather than answer late
+                if k_search > k:
+                    k_search = k
+                    deadline.skip("folder over-fetch")
+                if not top_books and not book and self.book_index and len(self.book_vectors) >= len(self.book_index):
+                    top_books = self.deadline_coarse_books
+                    deadline.skip("whole-library search")
+                if diversity:
+                    diversity = 0.0
+                    deadline.skip("diversity re-ranking")
+            if top_books:
+                # Coarse stage: restrict the chunk search to the books whose centroids are closest
+                books = self.book_vectors.top_books(query_embedding, top_books)
+                if books:
+                    book_filter = {"book": {"$in": sorted({name for _, name, _ in books})}}
+                    where = {"$and": [where, book_filter]} if where else book_filter
+
+            started = time.perf_counter()
+            embeddings = None
+            if diversity:
+                # Re-ranking needs a larger pool and the candidates' stored embeddings (no re-embedding)
+                from .diversity import candidate_pool
+                results, embeddings = self.vectorstore.query_with_embeddings(
+                    query_embedding, candidate_pool(k_search), where=where)
+            else:
+                results = self.vectorstore.query(query_embedding, k_search, where=where)
+            self._stage_times.record(query_stage, time.perf_counter() - started)
 
             # Post-process folder filtering if needed
             if folder:
                 folder_normalized = folder.strip('/').strip('\\').lower()
-                filtered_results = []
-                for doc, score in results:
-                    doc_folder = doc.metadata.get('folder', '').lower()
-                    if folder_normalized in doc_folder:
-                        filtered_results.append((doc, score))
-                results = filtered_results[:k]  # Limit to k results after filtering
+                keep = [i for i, (_, metadata, _) in enumerate(results)
+                        if folder_normalized in metadata.get('folder', '').lower()]
+                results = [results[i] for i in keep]
+                if embeddings is not None:
+                    embeddings = embeddings[keep]
+            if diversity and results:
+                from .diversity import mmr_rank, source_cap
+                sources = [metadata.get('rel_path', metadata.get('book', '')) for _, metadata, _ in results]
+                # Within one book the per-source cap would only hold back its own passages
+                cap = None if book else source_cap(k, diversity)
+                order = mmr_rank(query_embedding, embeddings, sources, k, diversity, cap)
+                results = [results[i] for i in order]
+            results = results[:k]  # Limit to k results after filtering
             
             formatted_results = []
-            for doc, score in results:
+            for text, metadata, score in results:
                 # Skip documents with None or empty page_content
-                if doc.page_content is None or not doc.page_content.strip():
-                    logger.warning(f"Skipping document with None/empty content from {doc.metadata.get('book', 'Unknown')}")
+                if text is None or not text.strip():
+                    logger.warning(f"Skipping document with None/empty content from {metadata.get('book', 'Unknown')}")
                     continue
 
                 formatted_results.append({
-                    "content": doc.page_content,
-                    "source": doc.metadata.get('book', 'Unknown'),
-                    "page": doc.metadata.get('page', 'Unknown'),
-                    "type": doc.metadata.get('type', 'general'),
+                    "content": text,
+                    "source": metadata.get('book', 'Unknown'),
+                    "page": metadata.get('page', 'Unknown'),
+                    "type": metadata.get('type', 'general'),
                     "relevance_score": float(score)
                 })
-            
+            if context_chunks and formatted_results:
+                if deadline is None or deadline.allows(self._stage_times.estimate("context")):
+                    started = time.perf_counter()
+                    self._add_context(formatted_results, [metadata for text, metadata, _ in results
+                                                          if text is not None and text.strip()], context_chunks)
+                    self._stage_times.record("context", time.perf_counter() - started)
+                else:
+                    deadline.skip("context expansion")
+
+            if deadline is not None and deadline.partial:
+                # Degraded results are not what the same query returns given time
+                return formatted_results, deadline.skipped
+
             # Cache the results
-            self._search_cache[cache_key] = (formatted_results, time.time())
-            
-            # Enforce max cache size (LRU eviction)
-            while len(self._search_cache) > self._max_cache_size:
-                # Remove oldest item (first in OrderedDict)
-                self._search_cache.popitem(last=False)
-            
-            # Also clean expired entries periodically
-            if len(self._search_cache) > self._max_cache_size // 2:
-                current_time = time.time()
-                expired_keys = [
-                    k for k, (_, timestamp) in self._search_cache.items()
-                    if current_time - timestamp >= self._cache_ttl
-                ]
-                for k in expired_keys:
-                    del self._search_cache[k]
+            with self._cache_lock:
+                self._search_cache[cache_key] = (formatted_results, time.time())
+                
+                # Enforce max cache size (LRU eviction)
+                while len(self._search_cache) > self._max_cache_size:
+                    # Remove oldest item (first in OrderedDict)
+                    self._search_cache.popitem(last=False)
+                
+                # Also clean expired entries periodically
+                if len(self._search_cache) > self._max_cache_size // 2:
+                    current_time = time.time()
+                    expired_keys = [
+                        key for key, (_, timestamp) in self._search_cache.items()
+                        if current_time - timestamp >= self._cache_ttl
+                    ]
+                    for key in expired_keys:
+                        del self._search_cache[key]
             
             # Always return direct results (synthesis removed)
-            return formatted_results
+            return formatted_results, []
             
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
-            return []
+            return [], []
     
+    def _add_context(self, formatted_results, metadatas, radius):
+        """Set "context" on each result: the hit plus its neighbours, fetched in one get by id"""
+        from .chunk_context import context_ids, stitch_chunks
+        windows = [context_ids(metadata, radius) for metadata in metadatas]
+        wanted = list(dict.fromkeys(chunk for window in windows for chunk in window))
+        if not wanted:
+            return
+        fetched = self.vectorstore.get(ids=wanted, include=["documents", "metadatas"])
+        chunks = {chunk: (text, metadata) for chunk, text, metadata
+                  in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]) if text}
+        for result, window in zip(formatted_results, windows):
+            found = [chunks[chunk] for chunk in window if chunk in chunks]
+            if len(found) > 1:
+                result["context"] = stitch_chunks(found)
+                result["context_pages"] = list(dict.fromkeys(m['page'] for _, m in found if 'page' in m))
+
     def synthesize_results(self, query, context_chunks):
         """Stub method - synthesis now handled by Claude"""
         # This method is kept for backward compatibility but no longer used
@@ -1950,86 +2214,8 @@ class SharedRAG:
         Returns:
             tuple: (matched_books, exact_match_found, similarity_scores)
         """
-        book_pattern_lower = book_pattern.lower()
-        all_books = list(self.book_index.keys())
-
-        # First try exact substring match (case-insensitive)
-        exact_matches = []
-        for book_path in all_books:
-            book_path_lower = book_path.lower()
-            book_name_lower = os.path.basename(book_path).lower()
-
-            # Try exact match on full path or just filename
-            if book_pattern_lower == book_path_lower or book_pattern_lower == book_name_lower:
-                return ([book_path], True, {book_path: 1.0})
-
-            # Try exact match with .pdf/.docx extension added
-            if (book_pattern_lower + '.pdf' == book_name_lower or
-                book_pattern_lower + '.docx' == book_name_lower or
-                book_pattern_lower + '.doc' == book_name_lower or
-                book_pattern_lower + '.epub' == book_name_lower):
-                return ([book_path], True, {book_path: 1.0})
-
-            # Substring match
-            if book_pattern_lower in book_path_lower or book_pattern_lower in book_name_lower:
-                exact_matches.append(book_path)
-
-        if exact_matches:
-            if len(exact_matches) == 1:
-                return (exact_matches, True, {exact_matches[0]: 0.9})
-            else:
-                # Multiple substring matches - return all with high scores
-                return (exact_matches, False, {path: 0.9 for path in exact_matches})
-
-        # No exact matches, use fuzzy matching
-        # Create a list of book names (without directory path) for better matching
-        book_names = [os.path.basename(path) for path in all_books]
-
-        # Use difflib to find close matches
-        close_matches = difflib.get_close_matches(
-            book_pattern,
-            book_names,
-            n=5,  # Return up to 5 matches
-            cutoff=cutoff
-        )
-
-        if not close_matches:
-            # Try again with just the pattern against basenames (case-insensitive)
-            close_matches = difflib.get_close_matches(
-                book_pattern_lower,
-                [name.lower() for name in book_names],
-                n=5,
-                cutoff=cutoff
-            )
-
-            # Map back to original book names
-            if close_matches:
-                close_matches = [
-                    book_names[i] for i, name in enumerate([n.lower() for n in book_names])
-                    if name in close_matches
-                ]
-
-        # Map matched names back to full paths and calculate similarity scores
-        matched_books = []
-        similarity_scores = {}
-
-        for matched_name in close_matches:
-            for book_path in all_books:
-                if os.path.basename(book_path) == matched_name or os.path.basename(book_path).lower() == matched_name.lower():
-                    matched_books.append(book_path)
-                    # Calculate similarity score
-                    score = difflib.SequenceMatcher(
-                        None,
-                        book_pattern_lower,
-                        os.path.basename(book_path).lower()
-                    ).ratio()
-                    similarity_scores[book_path] = score
-                    break
-
-        # Sort by similarity score (highest first)
-        matched_books.sort(key=lambda x: similarity_scores.get(x, 0), reverse=True)
-
-        return (matched_books, False, similarity_scores)
+        self._title_index.sync(self.book_index)
+        return self._title_index.find(book_pattern, cutoff)
 
     def extract_pages(self, book_pattern, pages):
         """Extract specific pages from a book (or chunks for non-PDF documents)
@@ -2101,89 +2287,82 @@ class SharedRAG:
 
         # Query vector store for pages/chunks from this specific book
         extracted_pages = {}
+        from .page_manifest import PageManifest
+        manifest = PageManifest.from_dict(book_info.get('page_manifest'))
 
         if self.vectorstore:
             if is_pdf:
-                # PDFs: Try extracting by page number first
-                for page_num in page_list:
-                    try:
-                        # Get all chunks from this page using ChromaDB's filter syntax
-                        results = self.vectorstore._collection.get(
-                            where={"$and": [
-                                {"book": {"$eq": book_name}},
-                                {"page": {"$eq": page_num}}
-                            ]},
-                            include=["documents", "metadatas"]
-                        )
+                # PDFs: fetch every requested page in one query, then group chunks by page.
+                # The manifest says which pages exist, so missing pages are never queried.
+                fetch_pages = manifest.split(page_list)[0] if manifest else page_list
+                try:
+                    results = self.vectorstore.get(
+                        where={"$and": [{"book": {"$eq": book_name}}, {"page": {"$in": sorted(set(fetch_pages))}}]},
+                        include=["documents", "metadatas"]
+                    ) if fetch_pages else {"documents": [], "metadatas": []}
+                    by_page = {}
+                    for position, (text, metadata) in enumerate(zip(results['documents'] or [],
+                                                                     results['metadatas'] or [])):
+                        # Same-named books in other folders share the "book" value
+                        if not text or metadata.get('rel_path', book_path) != book_path:
+                            continue
+                        order = (metadata.get('chunk_index', position), metadata.get('start_index', 0))
+                        by_page.setdefault(metadata.get('page'), []).append((order, text, metadata))
 
-                        if results and results['documents']:
-                            # Combine chunks from the same page
-                            page_content = "\n".join(results['documents'])
+                    from .chunk_context import stitch_chunks
+                    for page_num in page_list:
+                        page_chunks = sorted(by_page.get(page_num, []), key=lambda chunk: chunk[0])
+                        if page_chunks:
                             extracted_pages[page_num] = {
-                                "content": page_content,
-                                "chunks": len(results['documents'])
+                                "content": stitch_chunks([(text, metadata) for _, text, metadata in page_chunks]),
+                                "chunks": len(page_chunks)
                             }
                         else:
-                            # Try alternative query method
-                            search_results = self.vectorstore.similarity_search(
-                                f"page {page_num}",
-                                k=10,
-                                filter={"book": book_name}
-                            )
-
-                            page_chunks = []
-                            for doc in search_results:
-                                if doc.metadata.get('page') == page_num:
-                                    page_chunks.append(doc.page_content)
-
-                            if page_chunks:
-                                extracted_pages[page_num] = {
-                                    "content": "\n".join(page_chunks),
-                                    "chunks": len(page_chunks)
-                                }
-                            else:
-                                # Mark as not found, will check for fallback later
-                                extracted_pages[page_num] = {
-                                    "content": None,
-                                    "chunks": 0,
-                                    "not_found": True
-                                }
+                            # Mark as not found, will check for fallback later
+                            extracted_pages[page_num] = {
+                                "content": None,
+                                "chunks": 0,
+                                "not_found": True
+                            }
 
-                    except Exception as e:
-                        logger.error(f"Error extracting page {page_num}: {str(e)}")
+                except Exception as e:
+                    logger.error(f"Error extracting pages from {book_name}: {str(e)}")
+                    for page_num in page_list:
                         extracted_pages[page_num] = {
                             "content": f"Error extracting page: {str(e)}",
                             "chunks": 0
                         }
 
                 # Check if ALL pages were not found - if so, fall back to chunk extraction
+                # (unless the manifest shows the book has page numbers and these are out of range)
                 all_not_found = all(p.get('not_found', False) for p in extracted_pages.values())
-                if all_not_found:
+                if all_not_found and not manifest:
                     logger.info(f"No page numbers found for {book_name}, falling back to chunk extraction")
                     # Clear extracted_pages and fall through to non-PDF logic
                     extracted_pages = {}
                     is_pdf = False  # Treat as non-PDF for chunk extraction
-            else:
-                # Non-PDFs (Word, EPUB, etc.): Extract by chunk index
-                try:
-                    # Get all chunks from this book
-                    results = self.vectorstore._collection.get(
-                        where={"book": {"$eq": book_name}},
-                        include=["documents", "metadatas"]
-                    )
 
-                    if results and results['documents']:
-                        all_chunks = results['documents']
+            if not is_pdf:
+                # Non-PDFs (Word, EPUB, etc.), and PDFs without page numbers: extract by chunk number
+                try:
+                    total_chunks = book_info.get('chunks', 0)
+                    chunks_by_number = self._chunks_by_number(book_path, page_list, total_chunks)
+                    if chunks_by_number is None:
+                        # Indexed before chunk ordinals: fetch the whole book and index it positionally
+                        results = self.vectorstore.get(
+                            where={"book": {"$eq": book_name}},
+                            include=["documents", "metadatas"]
+                        )
+                        all_chunks = (results['documents'] or []) if results else []
                         total_chunks = len(all_chunks)
+                        chunks_by_number = {n: all_chunks[n - 1] for n in page_list if 1 <= n <= total_chunks}
 
-                        # Extract requested chunks (treating page numbers as chunk indices)
+                    if total_chunks:
+                        # Requested 'pages' are 1-based chunk numbers
                         for chunk_idx in page_list:
-                            # Convert 1-based page number to 0-based chunk index
-                            array_idx = chunk_idx - 1
-
-                            if 0 <= array_idx < total_chunks:
+                            if chunk_idx in chunks_by_number:
                                 extracted_pages[chunk_idx] = {
-                                    "content": all_chunks[array_idx],
+                                    "content": chunks_by_number[chunk_idx],
                                     "chunks": 1,
                                     "note": f"Chunk {chunk_idx} of {total_chunks} (no page numbers available for {doc_type})"
                                 }
@@ -2216,6 +2395,8 @@ class SharedRAG:
             "extracted_pages": extracted_pages,
             "total_pages_found": len([p for p in extracted_pages.values() if p['chunks'] > 0])
         }
+        if is_pdf and manifest:
+            result["available_pages"] = manifest.ranges()
 
         # Add informative message for non-PDFs
         if not is_pdf:
@@ -2238,7 +2419,8 @@ class SharedRAG:
             "categories": {},
             "failed_books": 0,
             "cleaned_books": 0,
-            "indexing_status": self.get_indexing_status()
+            "indexing_status": self.get_indexing_status(),
+            "search_flights": self._search_flights.stats()
         }
 
         # Count chunks from book index (fast - already in memory)
@@ -2292,7 +2474,7 @@ class SharedRAG:
             if self.vectorstore:
                 # Fetch all documents at once and count categories
                 # This is faster than 4 separate filtered queries
-                all_docs = self.vectorstore.get()
+                all_docs = self.vectorstore.get(include=["metadatas"])
                 if all_docs and 'metadatas' in all_docs:
                     for metadata in all_docs['metadatas']:
                         if 'type' in metadata:
@@ -2307,6 +2489,67 @@ class SharedRAG:
 
         return counts.copy()
     
+    def _chunks_by_number(self, book_path, numbers, total_chunks):
+        """Text of the requested 1-based chunk numbers, fetched by id
+
+        Only the requested chunks are read. Returns None when none of the
+        in-range chunks exist under their ordinal ids (the book was indexed
+        before chunk ordinals), so the caller can fall back.
+        """
+        from .chunk_context import chunk_id
+        in_range = [n for n in dict.fromkeys(numbers) if 1 <= n <= total_chunks]
+        if not in_range:
+            return {} if total_chunks else None
+        results = self.vectorstore.get(ids=[chunk_id(book_path, n - 1) for n in in_range],
+                                       include=["documents", "metadatas"])
+        found = {metadata['chunk_index'] + 1: text
+                 for text, metadata in zip(results['documents'] or [], results['metadatas'] or [])
+                 if text and isinstance(metadata.get('chunk_index'), int)}
+        return found or None
+
+    def sample_book(self, rel_path, count):
+        """Representative passages of one book, in reading order
+
+        Pulls the book's chunk embeddings by metadata (no query embedding),
+        selects count chunks spread across its content, and returns them as
+        search-style result dicts. The selected ids are cached per book hash,
+        so repeat calls only fetch the passages' text.
+        """
+        from .book_sampler import representative_sample
+        book_name = os.path.basename(rel_path)
+        cache_key = (rel_path, self.book_index.get(rel_path, {}).get('hash'), count)
+        with self._cache_lock:
+            ids = self._sample_cache.get(cache_key)
+            if ids is not None:
+                self._sample_cache.move_to_end(cache_key)
+
+        if ids is None:
+            stored = self.vectorstore.get(where={"book": book_name}, include=["metadatas", "embeddings"])
+            # Same-named books in other folders share the "book" value
+            owned = [i for i, metadata in enumerate(stored["metadatas"] or [])
+                     if metadata.get('rel_path', rel_path) == rel_path]
+            if not owned:
+                return []
+            embeddings = [stored["embeddings"][i] for i in owned]
+            ids = [stored["ids"][owned[i]] for i in representative_sample(embeddings, count)]
+            with self._cache_lock:
+                self._sample_cache[cache_key] = ids
+                while len(self._sample_cache) > self._max_sample_cache_size:
+                    self._sample_cache.popitem(last=False)
+
+        fetched = self.vectorstore.get(ids=ids, include=["documents", "metadatas"])
+        passages = [(text, metadata) for text, metadata in zip(fetched["documents"], fetched["metadatas"]) if text]
+        # Reading order: chunk position, or page for books indexed before chunk ordinals
+        passages.sort(key=lambda passage: (passage[1].get('chunk_index', -1),
+                                           passage[1].get('page') if isinstance(passage[1].get('page'), int) else -1))
+        return [{
+            "content": text,
+            "source": metadata.get('book', book_name),
+            "page": metadata.get('page', 'Unknown'),
+            "type": metadata.get('type', 'general'),
+            "chunk_index": metadata.get('chunk_index')
+        } for text, metadata in passages]
+
     def get_book_pages(self, book_pattern):
         """Get all page numbers available in the index for a specific book
 
@@ -2345,10 +2588,21 @@ class SharedRAG:
         book_info = self.book_index[book_path]
         book_name = os.path.basename(book_path)
 
-        # Get all page numbers from the database
+        from .page_manifest import PageManifest
+        manifest = PageManifest.from_dict(book_info.get('page_manifest'))
+        if manifest is not None:
+            return {
+                "book": book_name,
+                "book_path": book_path,
+                "total_pages": len(manifest),
+                "total_chunks": book_info.get('chunks', manifest.total_chunks),
+                "page_numbers": manifest.pages()
+            }
+
+        # Indexed before page manifests: collect page numbers from the database
         try:
             # Query for all documents from this book
-            results = self.vectorstore._collection.get(
+            results = self.vectorstore.get(
                 where={"book": {"$eq": book_name}},
                 include=["metadatas"]
             )
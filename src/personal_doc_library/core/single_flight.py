@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Single-flight calls
+Collapses concurrent calls with the same key into one computation whose
+result every caller shares, so identical searches issued at the same moment
+embed and query once
+"""
+
+import threading
+
+
+class _Flight:
+    """One computation in progress and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time
+
+    The first caller for a key computes; callers arriving while it runs wait
+    for it and get the same result (or exception). Once it finishes the key
+    is free again, so later calls compute afresh (caching is up to the caller).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._computed = 0
+        self._coalesced = 0
+
+    def do(self, key, function, timeout=None):
+        """function() for key, shared with any concurrent call for the same key
+
+        A caller that finds the key already running waits at most timeout
+        seconds for it and raises TimeoutError after that; the computation
+        carries on for the callers still waiting.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._computed += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise TimeoutError(f"shared computation for {key!r} still running after {timeout}s")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        """Computations run and calls that shared another call's computation"""
+        with self._lock:
+            return {"computed": self._computed, "coalesced": self._coalesced, "in_flight": len(self._flights)}
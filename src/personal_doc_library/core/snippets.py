@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Query-focused snippets
+Cuts each passage down to the run of sentences that best matches the query,
+within a character budget shared by all passages of a response, instead of
+keeping whatever falls before a fixed offset
+"""
+
+import re
+
+_SENTENCE_END = re.compile(r'(?<=[.!?;:])["\')\]]*\s+|\n\s*\n')
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Words too common to say anything about relevance
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+other our out over own same she should so some such than that the their them then there these they this
+those through to too under until up very was we were what when where which while who whom why will with
+would you your
+""".split())
+
+ELLIPSIS = "..."
+
+
+def query_terms(query):
+    """Normalized content words of the query"""
+    return {_stem(word) for word in _WORD.findall(query.lower()) if word not in STOPWORDS and len(word) > 1}
+
+
+def _stem(word):
+    # A prefix is a cheap stand-in for stemming: meditation/meditating, breath/breathing
+    return word[:6]
+
+
+def _sentences(text):
+    """(start, end) spans of the sentences in text"""
+    spans, start = [], 0
+    for match in _SENTENCE_END.finditer(text):
+        if match.start() > start:
+            spans.append((start, match.start()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def _sentence_terms(text, spans, terms):
+    """Query terms found in each sentence, counted per occurrence"""
+    found = []
+    for start, end in spans:
+        hits = {}
+        for word in _WORD.findall(text[start:end].lower()):
+            stem = _stem(word)
+            if stem in terms:
+                hits[stem] = hits.get(stem, 0) + 1
+        found.append(hits)
+    return found
+
+
+def best_snippet(text, query, max_chars, terms=None):
+    """The window of consecutive sentences of at most max_chars that best covers the query
+
+    A window scores one point per distinct query term it contains plus a
+    little for repeats, so windows covering more of the query win over ones
+    repeating a single word; ties go to the earlier window. Text that fits is
+    returned unchanged; a trimmed window is marked with ellipses. Without any
+    matching term the start of the text is kept, as before.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+    terms = query_terms(query) if terms is None else terms
+    spans = _sentences(text)
+    hits = _sentence_terms(text, spans, terms) if terms else [{} for _ in spans]
+
+    best = None  # (score, first sentence, last sentence)
+    last = 0
+    window = {}
+    for first in range(len(spans)):
+        if last < first:
+            last, window = first, {}
+        # Grow the window while the next sentence still fits
+        while last < len(spans) and spans[last][1] - spans[first][0] <= max_chars:
+            for stem, count in hits[last].items():
+                window[stem] = window.get(stem, 0) + count
+            last += 1
+        if last > first:
+            score = len(window) + 0.1 * sum(window.values())
+            if best is None or score > best[0]:
+                best = (score, first, last - 1)
+        # Drop the first sentence before moving the window on
+        if last > first:
+            for stem, count in hits[first].items():
+                window[stem] -= count
+                if not window[stem]:
+                    del window[stem]
+
+    if best is None:
+        # Every sentence is longer than the budget: keep the start, cut at a word boundary
+        head = text[:max_chars]
+        return (head.rsplit(" ", 1)[0] if " " in head else head) + ELLIPSIS
+    _, first, last_sentence = best
+    snippet = text[spans[first][0]:spans[last_sentence][1]]
+    prefix = ELLIPSIS if spans[first][0] > 0 else ""
+    suffix = ELLIPSIS if spans[last_sentence][1] < len(text) else ""
+    return prefix + snippet + suffix
+
+
+def allocate_budget(count, budget, minimum=200):
+    """Characters per passage when count passages share budget (never below minimum)"""
+    if count <= 0:
+        return budget
+    return max(minimum, budget // count)
+
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Coalesced status and progress publishing for the indexer
+Keeps indexing status and per-document progress in memory and publishes
+them to index_status.json / indexing_progress.json at a bounded rate
+using atomic renames
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+ENV_STATUS_INTERVAL = "PERSONAL_LIBRARY_STATUS_INTERVAL"
+
+# Statuses written by the deferred writer thread; all others are flushed synchronously
+ACTIVE_STATUSES = ("indexing",)
+FINISHED_STAGES = ("completed", "failed")
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file next to path and rename it into place"""
+    temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(temp_file, path)
+
+
+class StatusPublisher:
+    """In-process status model published to disk at a bounded rate
+
+    Status and progress updates only touch memory and wake a writer thread,
+    which writes at most once per interval. Progress is tracked per document
+    (and the thread working on it) rather than in a single shared record;
+    the published progress file keeps the most recent update at the top
+    level for existing readers and lists every active document under
+    "workers".
+    """
+
+    DEFAULT_INTERVAL = 1.0
+
+    def __init__(self, status_file, progress_file, interval=None):
+        self.status_file = status_file
+        self.progress_file = progress_file
+        self.interval = interval if interval is not None else self._interval_from_env()
+
+        self._cond = threading.Condition()
+        # Held from snapshot to rename so an older snapshot never lands after a newer one
+        self._write_lock = threading.Lock()
+        self._status = None
+        self._progress = {}
+        self._latest = None
+        self._latest_key = None
+        self._status_dirty = False
+        self._progress_dirty = False
+        self._last_write = 0.0
+        self._thread = None
+        self._process = psutil.Process()
+
+    def _interval_from_env(self):
+        value = os.getenv(ENV_STATUS_INTERVAL)
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                logger.warning(f"Invalid {ENV_STATUS_INTERVAL} value '{value}', using {self.DEFAULT_INTERVAL}s")
+        return self.DEFAULT_INTERVAL
+
+    def _ensure_writer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._writer_loop, daemon=True,
+                                            name="status-publisher")
+            self._thread.start()
+
+    def set_status(self, status, details=None):
+        """Record the indexing status; non-active statuses are written immediately"""
+        with self._cond:
+            self._status = {
+                "status": status,
+                "timestamp": datetime.now().isoformat(),
+                "details": details or {}
+            }
+            self._status_dirty = True
+            self._cond.notify()
+        if status in ACTIVE_STATUSES:
+            self._ensure_writer()
+        else:
+            self.flush()
+
+    def get_status(self):
+        """Return a copy of the in-process status, or None if none was set"""
+        with self._cond:
+            if self._status is None:
+                return None
+            return dict(self._status, details=dict(self._status["details"]))
+
+    def update_progress(self, key, data):
+        """Record progress for one document"""
+        entry = dict(data)
+        entry["timestamp"] = datetime.now().isoformat()
+        entry["thread"] = threading.current_thread().name
+        with self._cond:
+            if entry.get("stage") in FINISHED_STAGES:
+                self._progress.pop(key, None)
+            else:
+                self._progress[key] = entry
+            self._latest = entry
+            self._latest_key = key
+            self._progress_dirty = True
+            self._cond.notify()
+        self._ensure_writer()
+
+    def get_progress(self, key):
+        """Return the latest progress record for a document, or None"""
+        with self._cond:
+            entry = self._progress.get(key)
+            return dict(entry) if entry else None
+
+    def get_latest_progress(self):
+        """Return the most recent progress record of any document, or None"""
+        with self._cond:
+            if self._latest_key is None:
+                return None
+            return dict(self._latest)
+
+    def _snapshot(self):
+        status = self._status if self._status_dirty else None
+        progress = None
+        if self._progress_dirty and self._latest_key is not None:
+            progress = dict(self._latest)
+            progress["workers"] = {key: dict(entry) for key, entry in self._progress.items()}
+        self._status_dirty = False
+        self._progress_dirty = False
+        return status, progress
+
+    def _write(self, status, progress):
+        if status is not None:
+            try:
+                write_json_atomic(self.status_file, status)
+            except Exception as e:
+                logger.warning(f"Could not update status: {e}")
+        if progress is not None:
+            # Sample memory once per write rather than once per update
+            try:
+                progress["memory_mb"] = round(self._process.memory_info().rss / (1024 * 1024), 1)
+            except Exception:
+                progress["memory_mb"] = 0
+            try:
+                write_json_atomic(self.progress_file, progress)
+            except Exception as e:
+                logger.warning(f"Could not update progress: {e}")
+        self._last_write = time.monotonic()
+
+    def flush(self):
+        """Write any pending status and progress now"""
+        with self._write_lock:
+            with self._cond:
+                status, progress = self._snapshot()
+            if status is not None or progress is not None:
+                self._write(status, progress)
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not (self._status_dirty or self._progress_dirty):
+                    self._cond.wait()
+            # Coalesce everything that arrives within the interval into one write
+            delay = self.interval - (time.monotonic() - self._last_write)
+            if delay > 0:
+                time.sleep(delay)
+            self.flush()
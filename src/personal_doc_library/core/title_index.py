@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Trigram title index
+Inverted index from character trigrams of lowercased book paths and file
+names to the books containing them, so name lookups examine a handful of
+candidates instead of every title in the library
+"""
+
+import difflib
+import logging
+import os
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Extensions tried when a pattern names a book without one
+TITLE_EXTENSIONS = ('.pdf', '.docx', '.doc', '.epub')
+
+
+def trigrams(text):
+    """Set of character trigrams of text (already lowercased)"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TitleIndex:
+    """Exact, substring and fuzzy book lookups over book_index keys
+
+    Kept in step with book_index incrementally: sync() diffs the keys only
+    when the dict object, its size, or an explicit mark_changed() says they
+    may have changed, then indexes the added paths and drops the removed ones.
+
+    find() returns the same results as a linear scan: exact path or file
+    name matches first, then substring matches in book_index order, then
+    difflib close matches on file names. Trigrams narrow the substring scan
+    to titles containing every trigram of the pattern, and the fuzzy scan to
+    the titles sharing the most trigrams with it.
+    """
+
+    FUZZY_CANDIDATES = 200  # Titles scored with difflib per fuzzy lookup
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None  # The book_index last synced (held, so its id cannot be reused)
+        self._source_size = 0
+        self._changed = False
+        self._next_seq = 0
+        self._seq = {}                # path -> insertion order, to keep book_index order
+        self._by_lower_path = {}      # lowercased path -> [paths]
+        self._by_lower_name = {}      # lowercased file name -> [paths]
+        self._path_postings = {}      # trigram -> {paths}
+        self._name_postings = None    # trigram -> {lowercased file names}, built on first fuzzy lookup
+
+    def __len__(self):
+        return len(self._seq)
+
+    def mark_changed(self):
+        """Call after adding or removing book_index keys in place"""
+        self._changed = True
+
+    def sync(self, book_index):
+        """Bring the index up to date with book_index's keys"""
+        with self._lock:
+            if book_index is self._source and len(book_index) == self._source_size and not self._changed:
+                return
+            added = [path for path in book_index if path not in self._seq]
+            removed = self._seq.keys() - book_index.keys() if len(self._seq) + len(added) != len(book_index) else ()
+            for path in removed:
+                self._remove(path)
+            for path in added:
+                self._add(path)
+            self._source, self._source_size, self._changed = book_index, len(book_index), False
+            if added or removed:
+                logger.debug(f"Title index: +{len(added)} -{len(removed)} ({len(self._seq)} titles)")
+
+    def _add(self, path):
+        self._seq[path] = self._next_seq
+        self._next_seq += 1
+        lower_path = path.lower()
+        lower_name = os.path.basename(path).lower()
+        self._by_lower_path.setdefault(lower_path, []).append(path)
+        self._by_lower_name.setdefault(lower_name, []).append(path)
+        self._post(self._path_postings, lower_path, path)
+        if self._name_postings is not None:
+            self._post(self._name_postings, lower_name, lower_name)
+
+    @staticmethod
+    def _post(postings, text, value):
+        for gram in trigrams(text):
+            bucket = postings.get(gram)
+            if bucket is None:
+                postings[gram] = {value}
+            else:
+                bucket.add(value)
+
+    def _remove(self, path):
+        del self._seq[path]
+        lower_path = path.lower()
+        lower_name = os.path.basename(path).lower()
+        self._discard(self._by_lower_path, lower_path, path)
+        name_gone = self._discard(self._by_lower_name, lower_name, path)
+        for gram in trigrams(lower_path):
+            self._discard(self._path_postings, gram, path)
+        if name_gone and self._name_postings is not None:
+            for gram in trigrams(lower_name):
+                self._discard(self._name_postings, gram, lower_name)
+
+    @staticmethod
+    def _discard(mapping, key, value):
+        """Remove value from mapping[key]; True if the key is now gone"""
+        values = mapping.get(key)
+        if values is None:
+            return True
+        if isinstance(values, set):
+            values.discard(value)
+        elif value in values:
+            values.remove(value)
+        if not values:
+            del mapping[key]
+            return True
+        return False
+
+    def _first(self, paths):
+        return min(paths, key=self._seq.__getitem__)
+
+    def _exact(self, pattern_lower):
+        """Book whose path or file name equals the pattern (optionally plus an extension)"""
+        paths = list(self._by_lower_path.get(pattern_lower, []))
+        paths += self._by_lower_name.get(pattern_lower, [])
+        for extension in TITLE_EXTENSIONS:
+            paths += self._by_lower_name.get(pattern_lower + extension, [])
+        return self._first(paths) if paths else None
+
+    def containing(self, pattern):
+        """Books whose path contains pattern (case-insensitive), in book_index order"""
+        with self._lock:
+            return self._substring(pattern.lower())
+
+    def _substring(self, pattern_lower):
+        """Books whose path contains the pattern (the file name is part of the path), in book_index order"""
+        grams = trigrams(pattern_lower)
+        if grams:
+            postings = sorted((self._path_postings.get(gram, set()) for gram in grams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= posting
+        else:
+            candidates = self._seq.keys()
+        matches = [path for path in candidates if pattern_lower in path.lower()]
+        return sorted(matches, key=self._seq.__getitem__)
+
+    def _fuzzy_candidates(self, pattern_lower):
+        """File names sharing the most trigrams with the pattern, as book_index-ordered (name, path) pairs"""
+        if self._name_postings is None:
+            self._name_postings = {}
+            for lower_name in self._by_lower_name:
+                self._post(self._name_postings, lower_name, lower_name)
+        grams = trigrams(pattern_lower)
+        if grams:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._name_postings.get(gram, ()))
+            names = [name for name, _ in shared.most_common(self.FUZZY_CANDIDATES)]
+        else:
+            names = list(self._by_lower_name)
+        pairs = [(os.path.basename(path), path) for name in names for path in self._by_lower_name[name]]
+        return sorted(pairs, key=lambda pair: self._seq[pair[1]])
+
+    def find(self, book_pattern, cutoff=0.6):
+        """(matched_books, exact_match_found, similarity_scores), as SharedRAG.find_book_by_fuzzy_match"""
+        pattern_lower = book_pattern.lower()
+        with self._lock:
+            exact = self._exact(pattern_lower)
+            if exact is not None:
+                return ([exact], True, {exact: 1.0})
+
+            substring_matches = self._substring(pattern_lower)
+            if len(substring_matches) == 1:
+                return (substring_matches, True, {substring_matches[0]: 0.9})
+            if substring_matches:
+                return (substring_matches, False, {path: 0.9 for path in substring_matches})
+
+            candidates = self._fuzzy_candidates(pattern_lower)
+            first_by_name = {}
+            for name, path in candidates:
+                first_by_name.setdefault(name.lower(), path)
+
+        book_names = [name for name, _ in candidates]
+        close_matches = difflib.get_close_matches(book_pattern, book_names, n=5, cutoff=cutoff)
+        if not close_matches:
+            # Try again case-insensitively, keeping every title whose lowercase form matched
+            lowered = difflib.get_close_matches(pattern_lower, [name.lower() for name in book_names],
+                                                n=5, cutoff=cutoff)
+            close_matches = [name for name in book_names if name.lower() in lowered]
+
+        matched_books = []
+        similarity_scores = {}
+        for matched_name in close_matches:
+            book_path = first_by_name.get(matched_name.lower())
+            if book_path is None or book_path in similarity_scores:
+                continue
+            matched_books.append(book_path)
+            similarity_scores[book_path] = difflib.SequenceMatcher(
+                None, pattern_lower, os.path.basename(book_path).lower()
+            ).ratio()
+
+        # Sort by similarity score (highest first)
+        matched_books.sort(key=lambda path: similarity_scores.get(path, 0), reverse=True)
+        return (matched_books, False, similarity_scores)
@@ -0,0 +1,735 @@
+#!/usr/bin/env python3
+"""
+Vector store backends for the Personal Document Library
+A small interface over the chunk store (add, delete, filtered nearest-neighbour
+query, metadata get) with two implementations: ChromaDB's HNSW index, and an
+exact-search NumPy flat index memory-mapped from disk with a SQLite sidecar
+holding documents and metadata
+"""
+
+import fcntl
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ENV_VECTOR_BACKEND = "PERSONAL_LIBRARY_VECTOR_BACKEND"
+ENV_VECTOR_DTYPE = "PERSONAL_LIBRARY_VECTOR_DTYPE"
+ENV_VECTOR_RESCORE = "PERSONAL_LIBRARY_VECTOR_RESCORE"
+
+BACKEND_CHROMA = "chroma"
+BACKEND_NUMPY = "numpy"
+BACKENDS = (BACKEND_CHROMA, BACKEND_NUMPY)
+
+
+def configured_backend():
+    """Backend named by PERSONAL_LIBRARY_VECTOR_BACKEND (default: chroma)"""
+    backend = os.getenv(ENV_VECTOR_BACKEND, BACKEND_CHROMA).strip().lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown {ENV_VECTOR_BACKEND} '{backend}', using {BACKEND_CHROMA}. "
+                       f"Choices: {', '.join(BACKENDS)}")
+        return BACKEND_CHROMA
+    return backend
+
+
+class VectorBackend:
+    """Chunk store interface used by SharedRAG
+
+    Embeddings are computed by the caller; backends only store and compare
+    them. Distances are squared L2 (2 - 2·cos for the normalized embeddings
+    the library uses), lower is closer, matching ChromaDB's default space.
+    Filters use ChromaDB's where syntax: {"field": value},
+    {"field": {"$eq"|"$ne"|"$in"|"$nin"|"$gt"|"$gte"|"$lt"|"$lte": value}},
+    {"$and": [...]} and {"$or": [...]}.
+    """
+
+    name = None
+
+    def count(self):
+        """Number of stored chunks"""
+        raise NotImplementedError
+
+    def add(self, texts, metadatas, embeddings, ids=None):
+        """Store chunks, replacing any existing chunks with the same ids; returns the ids"""
+        raise NotImplementedError
+
+    def delete(self, where=None, ids=None):
+        """Remove chunks matching a metadata filter and/or ids"""
+        raise NotImplementedError
+
+    def query(self, embedding, k, where=None):
+        """k nearest chunks to embedding as (text, metadata, distance), closest first"""
+        raise NotImplementedError
+
+    def query_with_embeddings(self, embedding, k, where=None):
+        """query() plus the stored embeddings of the hits as a float32 matrix, one row per hit"""
+        raise NotImplementedError
+
+    def get(self, where=None, ids=None, include=("documents", "metadatas"), limit=None, offset=0):
+        """Chunks by filter and/or ids as a dict of parallel lists (ChromaDB's get() shape)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ChromaBackend(VectorBackend):
+    """ChromaDB persistent collection (approximate HNSW search)"""
+
+    name = BACKEND_CHROMA
+    # The collection name LangChain's Chroma wrapper used, so existing databases stay readable
+    COLLECTION_NAME = "langchain"
+
+    def __init__(self, directory):
+        import chromadb
+        os.makedirs(directory, exist_ok=True)
+        self.directory = str(directory)
+        self._client = chromadb.PersistentClient(path=self.directory)
+        self._collection = self._client.get_or_create_collection(
+            self.COLLECTION_NAME, embedding_function=None
+        )
+        try:
+            self._max_batch = self._client.get_max_batch_size()
+        except Exception:
+            self._max_batch = 5000
+
+    def count(self):
+        return self._collection.count()
+
+    def add(self, texts, metadatas, embeddings, ids=None):
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        for start in range(0, len(ids), self._max_batch):
+            end = start + self._max_batch
+            self._collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=list(texts[start:end]),
+                metadatas=list(metadatas[start:end])
+            )
+        return ids
+
+    def delete(self, where=None, ids=None):
+        if where is None and ids is None:
+            return
+        self._collection.delete(ids=ids, where=where)
+
+    def query(self, embedding, k, where=None):
+        return self._query(embedding, k, where, ["documents", "metadatas", "distances"])[0]
+
+    def query_with_embeddings(self, embedding, k, where=None):
+        return self._query(embedding, k, where, ["documents", "metadatas", "distances", "embeddings"])
+
+    def _query(self, embedding, k, where, include):
+        count = self.count()
+        if count == 0 or k <= 0:
+            return [], np.zeros((0, len(embedding)), dtype=np.float32)
+        results = self._collection.query(
+            query_embeddings=[np.asarray(embedding, dtype=np.float32)],
+            n_results=min(k, count),
+            where=where or None,
+            include=include
+        )
+        hits = list(zip(results["documents"][0], results["metadatas"][0], results["distances"][0]))
+        embeddings = results.get("embeddings") if "embeddings" in include else None
+        if embeddings is None:
+            return hits, None
+        return hits, np.asarray(embeddings[0], dtype=np.float32).reshape(len(hits), -1)
+
+    def get(self, where=None, ids=None, include=("documents", "metadatas"), limit=None, offset=0):
+        return self._collection.get(
+            ids=ids, where=where or None, limit=limit, offset=offset or None, include=list(include)
+        )
+
+
+_COMPARATORS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+}
+
+
+def matches_where(metadata, where):
+    """Evaluate a ChromaDB-style where filter against one metadata dict"""
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, target in condition.items():
+                comparator = _COMPARATORS.get(operator)
+                if comparator is None:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                try:
+                    if not comparator(value, target):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+def fit_projection(sample, dims):
+    """Uncentered PCA of sample embeddings: a (dims, full_dim) projection
+
+    Uncentered, so inner products in the projected space approximate the
+    original inner products directly. Returns (projection, retained energy).
+    """
+    sample = np.asarray(sample, dtype=np.float32)
+    _, singular_values, components = np.linalg.svd(sample, full_matrices=False)
+    energy = singular_values ** 2
+    return np.ascontiguousarray(components[:dims]), float(energy[:dims].sum() / energy.sum())
+
+
+class NumpyFlatBackend(VectorBackend):
+    """Exact search over a memory-mapped float32/float16 matrix
+
+    Layout in the backend directory:
+      vectors-<layout>.bin  row-major vectors, row i belongs to chunks.row i
+      metadata.sqlite3      chunks(row, id, document, metadata JSON, deleted)
+                            and info(key, value) with dim, dtype and counters
+      full-<layout>.bin     compact stores only: float32 full-dimension vectors
+      projection.npy        compact stores only: PCA projection to dim
+
+    A compact store (see configure_compact) searches a smaller float16 and/or
+    PCA-projected matrix and rescores the best rescore × k candidates against
+    the full vectors. The full file is memory-mapped too, so only the
+    candidates' rows are read from disk.
+
+    Adds append to the vector file before their rows are committed, so a
+    reader never sees a row without its vector. Deletes only set tombstones;
+    once tombstones pass COMPACT_RATIO the live rows are rewritten to a new
+    vectors file under a new layout number, so readers that still map the old
+    file stay consistent until they notice the change. Each process keeps the
+    metadata in memory and reloads only what changed (appended rows,
+    tombstones, or everything after a compaction). A single writer at a time
+    is assumed and enforced with a lock file.
+    """
+
+    name = BACKEND_NUMPY
+    DIRNAME = "numpy_flat"
+    COMPACT_RATIO = 0.3     # Tombstone share that triggers compaction
+    COMPACT_MIN_ROWS = 1000  # ... once at least this many rows are dead
+    BLOCK_ROWS = 65536      # Rows scored per matrix-vector product
+    MASK_CACHE_SIZE = 32
+    DEFAULT_RESCORE = 4     # Candidates rescored per requested result in compact stores
+
+    def __init__(self, directory, dtype=None):
+        self.directory = str(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "metadata.sqlite3"),
+            timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                document TEXT,
+                metadata TEXT NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS chunks_id ON chunks(id);
+            CREATE INDEX IF NOT EXISTS chunks_deleted ON chunks(deleted);
+            CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        self._lock = threading.RLock()
+        self._lock_path = os.path.join(self.directory, ".write.lock")
+        self._write_depth = 0
+
+        stored_dtype = self._info().get("dtype")
+        requested = dtype or os.getenv(ENV_VECTOR_DTYPE, "float32")
+        if stored_dtype and requested != stored_dtype:
+            logger.warning(f"Vector store at {self.directory} holds {stored_dtype} vectors; "
+                           f"ignoring requested {requested}")
+        self.dtype = np.dtype(stored_dtype or requested)
+        if self.dtype not in (np.float32, np.float16):
+            raise ValueError(f"Unsupported vector dtype {self.dtype}; use float32 or float16")
+        self.rescore = self._rescore_from_env()
+
+        # Per-process snapshot, refreshed from SQLite before each read
+        self._layout = None
+        self._deletes = None
+        self._ids = []
+        self._metadatas = []
+        self._live = np.zeros(0, dtype=bool)
+        self._vectors = None
+        self._full = None
+        self._projection = None
+        self._mask_cache = {}
+        self._field_indexes = {}  # field -> ({value: [rows]}, rows indexed so far)
+        self._id_rows = ({}, 0)  # (id -> newest row, rows indexed so far)
+
+    def describe(self):
+        """Storage format, e.g. 'float16, 128 of 768 dims, rescore x4'"""
+        self._refresh()
+        info = self._info()
+        if not info.get("full_dim"):
+            return self.dtype.name
+        return (f"{self.dtype.name}, {info.get('dim')} of {info.get('full_dim')} dims, "
+                f"rescore x{self.rescore}")
+
+    def _rescore_from_env(self):
+        value = os.getenv(ENV_VECTOR_RESCORE)
+        if value:
+            try:
+                return max(0, int(value))
+            except ValueError:
+                logger.warning(f"Invalid {ENV_VECTOR_RESCORE} value '{value}', using {self.DEFAULT_RESCORE}")
+        return self.DEFAULT_RESCORE
+
+    def configure_compact(self, full_dim, projection=None):
+        """Make an empty store compact: keep full vectors for rescoring, search a
+        float16 (the store's dtype) and/or PCA-projected copy"""
+        with self._write_lock():
+            if self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]:
+                raise ValueError("Compact storage can only be configured on an empty store")
+            dim = full_dim
+            if projection is not None:
+                projection = np.ascontiguousarray(projection, dtype=np.float32)
+                if projection.shape[1] != full_dim:
+                    raise ValueError(f"Projection expects {projection.shape[1]} dimensions, not {full_dim}")
+                np.save(self._projection_path(), projection)
+                dim = projection.shape[0]
+            with self._transaction() as conn:
+                for key, value in (("dim", dim), ("full_dim", full_dim), ("dtype", self.dtype.name),
+                                   ("projection", int(projection is not None))):
+                    conn.execute("INSERT INTO info(key, value) VALUES (?, ?) "
+                                 "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value)))
+        self._layout = None  # Reload with the new layout
+
+    # -- storage helpers -------------------------------------------------
+
+    def _info(self):
+        return dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+
+    def _vectors_path(self, layout):
+        return os.path.join(self.directory, f"vectors-{layout}.bin")
+
+    def _full_path(self, layout):
+        return os.path.join(self.directory, f"full-{layout}.bin")
+
+    def _projection_path(self):
+        return os.path.join(self.directory, "projection.npy")
+
+    @staticmethod
+    def _map(path, dtype, rows, dim):
+        """Memory-map the first rows of a vector file, or None if it is too short"""
+        if not os.path.exists(path) or os.path.getsize(path) < rows * dim * dtype.itemsize:
+            logger.warning(f"Vector file {path} is shorter than its metadata; keeping previous snapshot")
+            return None
+        return np.memmap(path, dtype=dtype, mode="r", shape=(rows, dim))
+
+    @staticmethod
+    def _append(path, vectors, start_row):
+        """Append rows at start_row, dropping rows left by a writer that died before committing"""
+        with open(path, "ab") as f:
+            expected = start_row * vectors.shape[1] * vectors.dtype.itemsize
+            if f.tell() != expected:
+                f.truncate(expected)
+                f.seek(expected)
+            f.write(vectors.tobytes())
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN")
+        try:
+            yield self._conn
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    @contextmanager
+    def _write_lock(self):
+        """Exclusive across processes; re-entrant within this handle (delete -> compact)"""
+        with self._lock:
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._write_depth = 1
+                try:
+                    yield
+                finally:
+                    self._write_depth = 0
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _bump(self, conn, key):
+        conn.execute("INSERT INTO info(key, value) VALUES (?, '1') "
+                     "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1", (key,))
+
+    def _refresh(self):
+        """Bring the in-memory snapshot up to date with the files on disk"""
+        with self._lock, self._transaction() as conn:
+            info = dict(conn.execute("SELECT key, value FROM info").fetchall())
+            layout = info.get("layout", "0")
+            deletes = info.get("deletes", "0")
+            dim = int(info.get("dim", 0))
+            full_dim = int(info.get("full_dim", 0))
+            dtype = np.dtype(info.get("dtype", self.dtype.name))
+
+            if layout != self._layout:
+                ids, metadatas, loaded = [], [], 0
+            else:
+                ids, metadatas, loaded = self._ids, self._metadatas, len(self._ids)
+
+            new_rows = conn.execute(
+                "SELECT row, id, metadata FROM chunks WHERE row >= ? ORDER BY row", (loaded,)
+            ).fetchall()
+            if not new_rows and layout == self._layout and deletes == self._deletes:
+                return
+            if new_rows:
+                ids = ids + [row_id for _, row_id, _ in new_rows]
+                metadatas = metadatas + [json.loads(metadata) for _, _, metadata in new_rows]
+            total = len(ids)
+
+            live = np.ones(total, dtype=bool)
+            dead = [row for (row,) in conn.execute("SELECT row FROM chunks WHERE deleted = 1")]
+            if dead:
+                live[dead] = False
+
+        vectors, full = self._vectors, self._full
+        if total and (layout != self._layout or new_rows or vectors is None):
+            vectors = self._map(self._vectors_path(layout), dtype, total, dim)
+            if vectors is None:
+                return
+            if full_dim:
+                full = self._map(self._full_path(layout), np.dtype(np.float32), total, full_dim)
+                if full is None:
+                    return
+        elif not total:
+            vectors = full = None
+        if info.get("projection") == "1" and self._projection is None:
+            self._projection = np.load(self._projection_path())
+
+        if layout != self._layout or new_rows:
+            self._mask_cache = {}
+        if layout != self._layout:
+            self._field_indexes = {}
+            self._id_rows = ({}, 0)
+        self.dtype = dtype
+        self._layout, self._deletes = layout, deletes
+        self._ids, self._metadatas, self._live, self._vectors = ids, metadatas, live, vectors
+        self._full = full
+
+    def _field_index(self, field):
+        """Rows per value of a metadata field, extended incrementally as rows are appended"""
+        with self._lock:
+            index, indexed = self._field_indexes.get(field, ({}, 0))
+            for row in range(indexed, len(self._metadatas)):
+                value = self._metadatas[row].get(field)
+                if isinstance(value, (str, int, float, bool)):
+                    index.setdefault(value, []).append(row)
+            self._field_indexes[field] = (index, len(self._metadatas))
+            return index
+
+    def _id_index(self):
+        """Newest row per id (an upserted id's older rows are tombstoned), extended incrementally"""
+        with self._lock:
+            index, indexed = self._id_rows
+            for row in range(indexed, len(self._ids)):
+                index[self._ids[row]] = row
+            self._id_rows = (index, len(self._ids))
+            return index
+
+    def _where_mask(self, where):
+        """Evaluate a where filter for every row; equality and $in use the field indexes"""
+        total = len(self._metadatas)
+        mask = np.ones(total, dtype=bool)
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                masks = [self._where_mask(clause) for clause in condition]
+                clause_mask = np.logical_and.reduce(masks) if key == "$and" else np.logical_or.reduce(masks)
+            elif not isinstance(condition, dict) or list(condition) in (["$eq"], ["$in"]):
+                if not isinstance(condition, dict):
+                    values = [condition]
+                else:
+                    values = condition["$in"] if "$in" in condition else [condition["$eq"]]
+                index = self._field_index(key)
+                clause_mask = np.zeros(total, dtype=bool)
+                for value in values:
+                    rows = index.get(value) if isinstance(value, (str, int, float, bool)) else None
+                    if rows:
+                        clause_mask[rows] = True
+            else:
+                clause_mask = np.fromiter((matches_where(metadata, {key: condition}) for metadata in self._metadatas),
+                                          dtype=bool, count=total)
+            mask &= clause_mask
+        return mask
+
+    def _filter_mask(self, where):
+        """Boolean mask of live rows matching where (cached per filter until rows change)"""
+        if not where:
+            return self._live
+        key = json.dumps(where, sort_keys=True, default=str)
+        # Concurrent queries share the caches; fill them one at a time
+        with self._lock:
+            mask = self._mask_cache.get(key)
+            if mask is None:
+                mask = self._where_mask(where)
+                if len(self._mask_cache) >= self.MASK_CACHE_SIZE:
+                    self._mask_cache.pop(next(iter(self._mask_cache)))
+                self._mask_cache[key] = mask
+            return mask & self._live
+
+    def _documents(self, rows):
+        if not rows:
+            return {}
+        documents = {}
+        for start in range(0, len(rows), 900):  # Stay under SQLite's variable limit
+            batch = [int(row) for row in rows[start:start + 900]]
+            placeholders = ",".join("?" * len(batch))
+            documents.update(self._conn.execute(
+                f"SELECT row, document FROM chunks WHERE row IN ({placeholders})", batch
+            ).fetchall())
+        return documents
+
+    # -- VectorBackend ---------------------------------------------------
+
+    def count(self):
+        self._refresh()
+        return int(self._live.sum())
+
+    def add(self, texts, metadatas, embeddings, ids=None):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts) or len(metadatas) != len(texts):
+            raise ValueError("texts, metadatas and embeddings must have the same length")
+        if not len(texts):
+            return []
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+
+        with self._write_lock():
+            info = self._info()
+            # The first writer fixes the store's dtype; a handle opened before that adopts it
+            self.dtype = np.dtype(info.get("dtype", self.dtype.name))
+            layout = info.get("layout", "0")
+            full_dim = int(info.get("full_dim", 0))
+            dim = int(info.get("dim", 0)) or vectors.shape[1]
+            expected_dim = full_dim or dim
+            if vectors.shape[1] != expected_dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {expected_dim}")
+            start_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+
+            if full_dim:
+                self._append(self._full_path(layout), np.ascontiguousarray(vectors), start_row)
+                if info.get("projection") == "1":
+                    vectors = vectors @ np.load(self._projection_path()).T
+            self._append(self._vectors_path(layout), np.ascontiguousarray(vectors, dtype=self.dtype), start_row)
+
+            with self._transaction() as conn:
+                conn.execute("INSERT OR IGNORE INTO info(key, value) VALUES ('dim', ?)", (str(dim),))
+                conn.execute("INSERT OR IGNORE INTO info(key, value) VALUES ('dtype', ?)", (self.dtype.name,))
+                replaced = 0
+                for start in range(0, len(ids), 900):
+                    batch = ids[start:start + 900]
+                    placeholders = ",".join("?" * len(batch))
+                    replaced += conn.execute(
+                        f"UPDATE chunks SET deleted = 1 WHERE deleted = 0 AND id IN ({placeholders})", batch
+                    ).rowcount
+                conn.executemany(
+                    "INSERT INTO chunks(row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(start_row + i, chunk_id, text, json.dumps(metadata or {}))
+                     for i, (chunk_id, text, metadata) in enumerate(zip(ids, texts, metadatas))]
+                )
+                if replaced:
+                    self._bump(conn, "deletes")
+        return ids
+
+    def delete(self, where=None, ids=None):
+        if where is None and ids is None:
+            return
+        with self._write_lock():
+            self._refresh()
+            mask = self._filter_mask(where)
+            if ids is not None:
+                index = self._id_index()
+                rows = sorted({index[chunk_id] for chunk_id in ids
+                               if chunk_id in index and mask[index[chunk_id]]})
+            else:
+                rows = np.flatnonzero(mask).tolist()
+            if not rows:
+                return
+            with self._transaction() as conn:
+                conn.executemany("UPDATE chunks SET deleted = 1 WHERE row = ?", [(row,) for row in rows])
+                self._bump(conn, "deletes")
+            self._refresh()
+            total = len(self._live)
+            dead = total - int(self._live.sum())
+            if dead >= self.COMPACT_MIN_ROWS and dead > total * self.COMPACT_RATIO:
+                self.compact()
+
+    def compact(self):
+        """Rewrite live rows contiguously and drop tombstones"""
+        with self._write_lock():
+            self._refresh()
+            live_rows = np.flatnonzero(self._live)
+            old_layout = self._layout
+            new_layout = str(int(old_layout) + 1)
+            logger.info(f"Compacting vector store: {len(live_rows)} live of {len(self._live)} rows")
+
+            files = [(self._vectors, self._vectors_path)]
+            if self._full is not None:
+                files.append((self._full, self._full_path))
+            for matrix, path_for in files:
+                with open(path_for(new_layout), "wb") as f:
+                    for start in range(0, len(live_rows), self.BLOCK_ROWS):
+                        f.write(np.ascontiguousarray(matrix[live_rows[start:start + self.BLOCK_ROWS]]).tobytes())
+
+            with self._transaction() as conn:
+                kept = conn.execute(
+                    "SELECT id, document, metadata FROM chunks WHERE deleted = 0 ORDER BY row"
+                ).fetchall()
+                conn.execute("DELETE FROM chunks")
+                conn.executemany(
+                    "INSERT INTO chunks(row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(row, chunk_id, document, metadata) for row, (chunk_id, document, metadata) in enumerate(kept)]
+                )
+                conn.execute("INSERT INTO info(key, value) VALUES ('layout', ?) "
+                             "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (new_layout,))
+                self._bump(conn, "deletes")
+
+            # Processes still mapping the old files keep a valid view until they refresh
+            for path_for in (self._vectors_path, self._full_path):
+                try:
+                    os.remove(path_for(old_layout))
+                except OSError:
+                    pass
+            self._refresh()
+
+    def _scores(self, rows, query):
+        """Cosine scores of query against rows (None means every row)"""
+        total = len(self._live) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, total)
+            block = self._vectors[start:end] if rows is None else self._vectors[rows[start:end]]
+            scores[start:end] = np.asarray(block, dtype=np.float32) @ query
+        return scores
+
+    @staticmethod
+    def _top(scores, k):
+        """Indices of the k highest scores, best first"""
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        return top[np.argsort(-scores[top])]
+
+    def query(self, embedding, k, where=None):
+        return self._query(embedding, k, where)[0]
+
+    def query_with_embeddings(self, embedding, k, where=None):
+        hits, rows = self._query(embedding, k, where)
+        matrix = self._full if self._full is not None else self._vectors
+        if not rows:
+            return hits, np.zeros((0, len(embedding)), dtype=np.float32)
+        return hits, np.asarray(matrix[rows], dtype=np.float32)
+
+    def _query(self, embedding, k, where):
+        """(query() hits, their rows)"""
+        self._refresh()
+        if self._vectors is None or k <= 0:
+            return [], []
+        query = np.asarray(embedding, dtype=np.float32)
+        search_query = self._projection @ query if self._projection is not None else query
+        mask = self._filter_mask(where)
+        if mask.all():
+            rows = np.arange(len(mask))
+            scores = self._scores(None, search_query)
+        else:
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                return [], []
+            scores = self._scores(rows, search_query)
+
+        k = min(k, len(rows))
+        if self._full is not None and self.rescore:
+            # Shortlist on the compact vectors, then rank the shortlist exactly
+            # Ascending rows read the memory map sequentially
+            candidates = np.sort(rows[self._top(scores, min(len(rows), k * self.rescore))])
+            exact = np.asarray(self._full[candidates], dtype=np.float32) @ query
+            top = self._top(exact, k)
+            rows, scores = candidates, exact
+        else:
+            top = self._top(scores, k)
+        top_rows = rows[top].tolist()
+        documents = self._documents(top_rows)
+        return [(documents.get(row), self._metadatas[row], float(2.0 - 2.0 * score))
+                for row, score in zip(top_rows, scores[top])], top_rows
+
+    def get(self, where=None, ids=None, include=("documents", "metadatas"), limit=None, offset=0):
+        self._refresh()
+        mask = self._filter_mask(where)
+        if ids is not None:
+            index = self._id_index()
+            rows = [index[chunk_id] for chunk_id in ids if chunk_id in index and mask[index[chunk_id]]]
+        else:
+            rows = np.flatnonzero(mask).tolist()
+        offset = offset or 0
+        rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+
+        result = {"ids": [self._ids[row] for row in rows], "documents": None,
+                  "metadatas": None, "embeddings": None}
+        if "documents" in include:
+            documents = self._documents(rows)
+            result["documents"] = [documents.get(row) for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self._metadatas[row] for row in rows]
+        if "embeddings" in include:
+            matrix = self._full if self._full is not None else self._vectors
+            dim = matrix.shape[1] if matrix is not None else 0
+            result["embeddings"] = (np.asarray(matrix[rows], dtype=np.float32)
+                                    if rows else np.zeros((0, dim), dtype=np.float32))
+        return result
+
+    def close(self):
+        self._vectors = self._full = None
+        self._conn.close()
+
+
+def copy_vectors(source, target, batch_size=1000):
+    """Copy every chunk (ids, text, metadata, embedding) from one backend to another"""
+    copied = 0
+    total = source.count()
+    while copied < total:
+        batch = source.get(include=["documents", "metadatas", "embeddings"], limit=batch_size, offset=copied)
+        if not batch["ids"]:
+            break
+        target.add(batch["documents"], batch["metadatas"], batch["embeddings"], ids=batch["ids"])
+        copied += len(batch["ids"])
+    return copied
+
+
+def open_vector_backend(db_directory, backend=None):
+    """Open the configured vector backend for a database directory"""
+    backend = backend or configured_backend()
+    if backend == BACKEND_NUMPY:
+        store = NumpyFlatBackend(os.path.join(str(db_directory), NumpyFlatBackend.DIRNAME))
+        if store.count() == 0 and os.path.exists(os.path.join(str(db_directory), "chroma.sqlite3")):
+            logger.warning("NumPy vector store is empty but a Chroma index exists; copy it with "
+                           "scripts/benchmark_vector_backends.py --migrate")
+        logger.info(f"Using NumPy flat vector store ({store.describe()}) with {store.count()} chunks")
+        return store
+    return ChromaBackend(db_directory)
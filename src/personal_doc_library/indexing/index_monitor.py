@@ -19,6 +19,13 @@ import psutil
 
 from personal_doc_library.core.shared_rag import SharedRAG, IndexLock
 from personal_doc_library.core.config import config
+from personal_doc_library.indexing.memory_budget import (
+    FootprintEstimator, IndexJob, MemoryBudget, PeakRSSTracker,
+    get_pdf_page_count, select_next_job
+)
+from personal_doc_library.indexing.worker_controller import (
+    AdaptiveWorkerController, ResizableWorkerPool, count_open_fds
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -150,6 +157,13 @@ class IndexMonitor:
         self.fd_reserve = 100  # Reserve 100 FDs for system operations
         logger.info(f"File descriptor limit: {self.max_file_descriptors}, reserving {self.fd_reserve} for system")
         
+        # Memory footprint estimation, calibrated from observed peak RSS per job
+        self.footprint_estimator = FootprintEstimator(
+            os.path.join(self.db_directory, "memory_calibration.json")
+        )
+        self.rss_tracker = PeakRSSTracker()
+        self.rss_tracker.start()
+        
         # Adjust delays for service mode
         self.retry_delay = 5.0 if self.SERVICE_MODE else 2.0
         self.batch_delay = 5.0 if self.SERVICE_MODE else 2.0
@@ -185,38 +199,14 @@ class IndexMonitor:
     
     def _get_current_fd_usage(self):
         """Get current file descriptor usage for this process"""
-        try:
-            process = psutil.Process()
-            return len(process.open_files())
-        except:
-            # Fallback: count open file descriptors in /proc/self/fd (Linux/Mac)
-            try:
-                if os.path.exists('/proc/self/fd'):
-                    return len(os.listdir('/proc/self/fd'))
-                else:
-                    # macOS fallback
-                    import subprocess
-                    result = subprocess.run(['lsof', '-p', str(os.getpid())], 
-                                         capture_output=True, text=True)
-                    return len(result.stdout.splitlines()) - 1  # Subtract header
-            except:
-                return 50  # Conservative estimate if we can't determine
+        fds = count_open_fds()
+        return fds if fds is not None else 50  # Conservative estimate if we can't determine
     
     def _calculate_safe_workers(self, base_workers=5):
-        """Calculate safe number of workers based on available file descriptors and system load"""
+        """Calculate a safe worker count from file descriptors and memory (non-blocking)"""
         current_fds = self._get_current_fd_usage()
         available_fds = self.max_file_descriptors - current_fds - self.fd_reserve
         
-        # Check current system load for dynamic adjustment
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory_percent = psutil.virtual_memory().percent
-        
-        # Dynamic adjustment based on system load
-        if cpu_percent > 70 or memory_percent > 80:
-            # System under load, reduce workers
-            base_workers = max(1, base_workers // 2)
-            logger.info(f"System load high (CPU: {cpu_percent}%, Memory: {memory_percent}%), reducing workers")
-        
         # Each worker might use ~20-50 file descriptors (PDF processing, temp files, etc)
         # Increase reserve for EPUB handling
         fds_per_worker = 60  # Increased from 50 for EPUB safety
@@ -224,10 +214,12 @@ class IndexMonitor:
         
         # Also consider memory with more conservative allocation
         try:
+            memory_percent = psutil.virtual_memory().percent
             available_memory_gb = psutil.virtual_memory().available / (1024**3)
             # More conservative: 3GB per worker for large PDFs/EPUBs
             max_workers_by_memory = max(1, int(available_memory_gb // 3))
         except:
+            memory_percent = 0
             max_workers_by_memory = base_workers
         
         # Take the minimum of all constraints
@@ -235,12 +227,26 @@ class IndexMonitor:
         
         logger.info(f"FD usage: {current_fds}/{self.max_file_descriptors}, "
                    f"Available FDs: {available_fds}, "
-                   f"CPU: {cpu_percent:.1f}%, Memory: {memory_percent:.1f}%, "
+                   f"Memory: {memory_percent:.1f}%, "
                    f"Safe workers: {safe_workers} (FD limit: {max_workers_by_fds}, "
                    f"Memory limit: {max_workers_by_memory})")
         
         return safe_workers
     
+    def _build_index_job(self, filepath, rel_path):
+        """Create an IndexJob with a calibrated memory estimate"""
+        try:
+            size_mb = os.path.getsize(filepath) / (1024 * 1024)
+        except OSError:
+            size_mb = 0.0  # If we can't check size, treat as regular
+        # Page counts are only worth the extra PDF parse for bigger files
+        page_count = None
+        if filepath.lower().endswith('.pdf') and size_mb > 50:
+            page_count = get_pdf_page_count(filepath)
+        job = IndexJob(filepath, rel_path, size_mb, page_count)
+        job.estimate_mb = self.footprint_estimator.estimate(filepath, size_mb, page_count)
+        return job
+    
     def is_paused(self):
         """Check if indexing is paused"""
         return os.path.exists(self.pause_file)
@@ -313,6 +319,8 @@ class IndexMonitor:
             self.progress_monitor_running = False
             self.progress_monitor_thread.join(timeout=2)
         
+        self.rss_tracker.stop()
+        
         # Cancel any pending updates
         with self.update_lock:
             if self.update_timer:
@@ -464,7 +472,7 @@ class IndexMonitor:
                 logger.info(f"About to process {len(documents_to_index)} documents")
                 
                 # Import required modules for parallel processing
-                from concurrent.futures import ThreadPoolExecutor, as_completed
+                from concurrent.futures import wait, FIRST_COMPLETED
                 import multiprocessing
                 import threading
                 import psutil
@@ -474,91 +482,47 @@ class IndexMonitor:
                 failed_lock = threading.Lock()
                 progress_lock = threading.Lock()
                 
-                # Separate large files from regular files
-                large_files = []
-                regular_files = []
-                
-                for filepath, rel_path in documents_to_index:
-                    try:
-                        file_size_mb = os.path.getsize(filepath) / (1024 * 1024)
-                        if file_size_mb > 100:  # Files over 100MB
-                            large_files.append((filepath, rel_path))
-                        else:
-                            regular_files.append((filepath, rel_path))
-                    except:
-                        regular_files.append((filepath, rel_path))  # If we can't check size, treat as regular
-                
-                logger.info(f"Found {len(large_files)} large files (>100MB) and {len(regular_files)} regular files")
-                
-                # Process large files first, sequentially
-                if large_files:
-                    logger.info("Processing large files sequentially to prevent memory issues...")
-                    for i, (filepath, rel_path) in enumerate(large_files, 1):
-                        if not self.running:
-                            break
-                        
-                        self.wait_if_paused()
-                        
-                        logger.info(f"Processing large file {i}/{len(large_files)}: {rel_path}")
-                        
-                        # Check if file is in failed list
-                        if self.rag.is_document_failed(rel_path):
-                            logger.info(f"Skipping previously failed file: {rel_path}")
-                            failed_count += 1
-                            self.current_document_index += 1
-                            continue
-                        
-                        # Process large file with timeout
-                        result = self.rag.process_document_with_timeout(filepath, rel_path)
-                        
-                        if result:
-                            success_count += 1
-                            logger.info(f"Successfully processed large file: {rel_path}")
-                        else:
-                            failed_count += 1
-                            logger.warning(f"Failed to process large file: {rel_path}")
-                        
-                        self.current_document_index += 1
-                        
-                        # Update status
-                        self.rag.update_status("indexing", {
-                            "current_file": rel_path,
-                            "progress": f"{self.current_document_index}/{len(documents_to_index)}",
-                            "success": success_count,
-                            "failed": failed_count,
-                            "percentage": round(self.current_document_index / len(documents_to_index) * 100, 1),
-                            "processing_mode": "sequential_large_file"
-                        })
-                
-                # Now process regular files in parallel
-                if regular_files and self.running:
-                    # Determine optimal worker count based on system resources
+                # Estimate each document's memory footprint. Large files are queued
+                # first so they get the first claim on the budget, regular files
+                # backfill whatever budget is left.
+                jobs = [self._build_index_job(filepath, rel_path)
+                        for filepath, rel_path in documents_to_index]
+                jobs.sort(key=lambda job: job.is_large, reverse=True)
+                for i, job in enumerate(jobs, 1):
+                    job.index = i
+
+                memory_budget = MemoryBudget.from_environment()
+                large_count = sum(1 for job in jobs if job.is_large)
+                logger.info(f"Found {large_count} large files (>100MB) and {len(jobs) - large_count} regular files, "
+                           f"memory budget {memory_budget.total_mb:.0f}MB")
+
+                if jobs and self.running:
+                    # Determine the worker ceiling and starting point from system resources;
+                    # the adaptive controller then ramps between them from measured throughput
                     cpu_count = multiprocessing.cpu_count()
-                    # Get available memory in GB
                     available_memory_gb = psutil.virtual_memory().available / (1024**3)
                     
-                    # Use dynamic worker calculation based on file descriptors and memory
-                    # Implement adaptive scaling based on system resources
-                    base_workers = min(
-                        max(1, cpu_count // 2),  # Half the CPU cores
-                        5  # Max 5 workers as base
+                    worker_ceiling = AdaptiveWorkerController.worker_ceiling(min(12, max(2, cpu_count)))
+                    initial_workers = self._calculate_safe_workers(min(max(1, cpu_count // 2), 5))
+                    controller = AdaptiveWorkerController(
+                        min_workers=1,
+                        max_workers=worker_ceiling,
+                        initial_workers=initial_workers,
+                        fd_limit=self.max_file_descriptors,
+                        fd_reserve=self.fd_reserve
                     )
                     
-                    # Adaptive scaling based on available memory
-                    # Each worker needs ~500MB for document processing
-                    memory_based_workers = max(1, int(available_memory_gb * 2))  # 2 workers per GB
-                    
-                    # Take the minimum to avoid overload
-                    adaptive_workers = min(base_workers, memory_based_workers)
-                    max_workers = self._calculate_safe_workers(adaptive_workers)
-                    
-                    logger.info(f"Processing regular files with {max_workers} parallel workers (CPUs: {cpu_count}, Available RAM: {available_memory_gb:.1f}GB)")
+                    logger.info(f"Processing documents with {controller.current} workers, adapting up to {worker_ceiling} "
+                               f"(CPUs: {cpu_count}, Available RAM: {available_memory_gb:.1f}GB)")
+                    # Size torch's thread pool around the extraction workers so the
+                    # shared embedding stage does not oversubscribe the CPU
+                    self.rag.configure_resources(worker_ceiling)
 
-                    def process_single_document(doc_info):
+                    def process_single_document(job):
                         """Process a single document with thread-safe progress tracking"""
                         nonlocal success_count, failed_count
 
-                        filepath, rel_path, index = doc_info
+                        filepath, rel_path, index = job.filepath, job.rel_path, job.index
 
                         # Check if paused before processing
                         self.wait_if_paused()
@@ -567,7 +531,8 @@ class IndexMonitor:
                         if not self.running:
                             return None
 
-                        logger.info(f"Processing document {index}/{len(documents_to_index)}: {rel_path}")
+                        logger.info(f"Processing document {index}/{len(documents_to_index)}: {rel_path} "
+                                   f"(estimated {job.estimate_mb:.0f}MB, reserved {job.reserved_mb:.0f}MB)")
 
                         # Check if file is in failed list before processing
                         if self.rag.is_document_failed(rel_path):
@@ -588,14 +553,20 @@ class IndexMonitor:
                                 })
                             return False
 
-                        # Process document with timeout
-                        result = self.rag.process_document_with_timeout(filepath, rel_path)
+                        # Process document with timeout, tracking its peak memory
+                        self.rss_tracker.begin(index, job.estimate_mb)
+                        try:
+                            result = self.rag.process_document_with_timeout(filepath, rel_path)
+                        finally:
+                            peak_mb = self.rss_tracker.end(index)
 
                         # Update counters thread-safely
                         if result:
                             with success_lock:
                                 success_count += 1
-                            logger.info(f"Successfully processed: {rel_path}")
+                            logger.info(f"Successfully processed: {rel_path} (peak {peak_mb or 0:.0f}MB)")
+                            self.footprint_estimator.observe(filepath, job.size_mb, job.page_count, peak_mb)
+                            controller.record(self.rag.book_index.get(rel_path, {}).get('chunks', 0))
                         else:
                             with failed_lock:
                                 failed_count += 1
@@ -610,52 +581,38 @@ class IndexMonitor:
                                 "success": success_count,
                                 "failed": failed_count,
                                 "percentage": round(self.current_document_index / len(documents_to_index) * 100, 1),
-                                "parallel_workers": max_workers
+                                "parallel_workers": pool.limit,
+                                "docs_per_min": round(controller.last_rates["docs_per_sec"] * 60, 1),
+                                "chunks_per_sec": round(controller.last_rates["chunks_per_sec"], 1),
+                                "memory_reserved_mb": round(memory_budget.reserved_mb),
+                                "memory_budget_mb": round(memory_budget.total_mb)
                             })
 
                         return result
 
-                    # Process regular documents in parallel with dynamic worker adjustment
-                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                        # Prepare document info with indices, adjusting for already processed large files
-                        doc_infos = [(filepath, rel_path, self.current_document_index + i)
-                                   for i, (filepath, rel_path) in enumerate(regular_files, 1)]
-
-                        # Submit tasks in batches to control file descriptor usage
-                        batch_size = max_workers * 2  # Process 2x workers at a time
+                    # Dispatch documents whenever a worker slot is free and the
+                    # next document's estimated footprint fits in the memory budget
+                    with ResizableWorkerPool(worker_ceiling, controller.current) as pool:
+                        pending = list(jobs)
                         processed_docs = 0
 
-                        for batch_start in range(0, len(doc_infos), batch_size):
-                            batch_end = min(batch_start + batch_size, len(doc_infos))
-                            batch = doc_infos[batch_start:batch_end]
-
-                            # Check file descriptors before each batch
-                            current_fds = self._get_current_fd_usage()
-                            if current_fds > self.max_file_descriptors - self.fd_reserve:
-                                logger.warning(f"High FD usage ({current_fds}/{self.max_file_descriptors}), waiting for cleanup...")
-                                time.sleep(5)  # Wait for cleanup
-
-                                # Recalculate workers if needed
-                                new_max_workers = self._calculate_safe_workers(base_workers)
-                                if new_max_workers < max_workers:
-                                    logger.info(f"Reducing workers from {max_workers} to {new_max_workers} due to FD pressure")
-                                    executor._max_workers = new_max_workers
-                                    max_workers = new_max_workers
-
-                            # Submit batch
-                            futures = {executor.submit(process_single_document, doc_info): doc_info
-                                     for doc_info in batch}
-
-                            # Process completed futures for this batch
-                            for future in as_completed(futures):
-                                if not self.running:
-                                    # Cancel remaining futures if stopped
-                                    for f in futures:
-                                        f.cancel()
+                        while (pending or pool.running) and self.running:
+                            while pending and pool.has_capacity():
+                                job = select_next_job(pending, memory_budget, not pool.running)
+                                if job is None:
                                     break
+                                pool.submit(process_single_document, job)
+
+                            if not pool.running:
+                                break
+
+                            done, _ = wait(list(pool.running), timeout=5, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                job = pool.pop(future)
+                                memory_budget.release(job.reserved_mb)
 
                                 try:
-                                    result = future.result()
+                                    future.result()
                                     processed_docs += 1
 
                                     # Periodic FD check every 10 documents
@@ -672,8 +629,13 @@ class IndexMonitor:
                                     with failed_lock:
                                         failed_count += 1
 
-                            if not self.running:
-                                break
+                            # Let measured throughput and resource pressure resize the pool
+                            pool.resize(controller.maybe_adjust())
+
+                        if not self.running:
+                            # Cancel work that has not started yet
+                            for future in pool.running:
+                                future.cancel()
                 
                 # Final status update (moved outside regular_files block)
             # This ensures status is updated even when only large files were processed
@@ -722,30 +684,19 @@ class IndexMonitor:
         logger.info("Started PDF progress monitoring thread")
     
     def monitor_pdf_progress(self):
-        """Monitor stderr logs for PDF page extraction progress and update progress file"""
+        """Monitor stderr logs for PDF page extraction progress and publish it"""
         import re
-        import json
         import subprocess
         
         logger.info("Progress monitor thread started")
         log_file = os.path.join(config.logs_directory, 'index_monitor_stderr.log')
-        progress_file = os.path.join(self.db_directory, 'indexing_progress.json')
         logger.info(f"Monitoring log file: {log_file}")
-        logger.info(f"Updating progress file: {progress_file}")
         
         while self.progress_monitor_running:
             try:
-                # Check if we're currently indexing
-                if not os.path.exists(progress_file):
-                    time.sleep(5)
-                    continue
-                
-                # Read current progress file to see if we're in loading/extracting stage
-                with open(progress_file, 'r') as f:
-                    progress_data = json.load(f)
-                
-                current_stage = progress_data.get('stage', '')
-                if current_stage not in ['loading', 'extracting']:
+                # Check if we're currently loading/extracting a document
+                progress_data = self.rag.status_publisher.get_latest_progress()
+                if not progress_data or progress_data.get('stage', '') not in ['loading', 'extracting']:
                     time.sleep(5)
                     continue
                 
@@ -763,21 +714,20 @@ class IndexMonitor:
                             latest_page = max(int(m) for m in matches)
                             
                             # Check if this is a PDF file
-                            current_file = progress_data.get('current_file', '')
+                            current_file = progress_data.get('current_file') or ''
                             if current_file.lower().endswith('.pdf'):
                                 # Get total pages from log if available
                                 total_matches = re.findall(r'PDF has (\d+) pages', result.stdout)
                                 total_pages = int(total_matches[-1]) if total_matches else progress_data.get('total_pages')
                                 
-                                # Update progress file with actual page number
-                                progress_data['current_page'] = latest_page
-                                if total_pages:
-                                    progress_data['total_pages'] = total_pages
-                                progress_data['stage'] = 'extracting'
-                                progress_data['timestamp'] = datetime.now().isoformat()
-                                
-                                with open(progress_file, 'w') as f:
-                                    json.dump(progress_data, f, indent=2)
+                                # Publish the actual page number for this document
+                                self.rag.update_progress(
+                                    'extracting',
+                                    current_page=latest_page,
+                                    total_pages=total_pages,
+                                    chunks_generated=progress_data.get('chunks_generated'),
+                                    current_file=current_file
+                                )
                     except subprocess.TimeoutExpired:
                         pass
                     except Exception as e:
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Memory budget scheduling for the background indexer
+Lets large documents run alongside regular ones while the combined
+estimated footprint of all running jobs stays under a global budget
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+ENV_MEMORY_BUDGET_MB = "PERSONAL_LIBRARY_MEMORY_BUDGET_MB"
+
+LARGE_FILE_MB = 100  # Files above this size are scheduled ahead of regular files
+
+
+class IndexJob:
+    """A document waiting to be indexed together with its memory estimate"""
+
+    def __init__(self, filepath, rel_path, size_mb, page_count=None, estimate_mb=0.0):
+        self.filepath = filepath
+        self.rel_path = rel_path
+        self.size_mb = size_mb
+        self.page_count = page_count
+        self.estimate_mb = estimate_mb
+        self.reserved_mb = 0.0
+        self.index = 0
+
+    @property
+    def is_large(self):
+        return self.size_mb > LARGE_FILE_MB
+
+
+class FootprintEstimator:
+    """Estimates peak memory per document and calibrates against observed RSS
+
+    The raw estimate is a linear model of file size and page count per
+    document category. Each category keeps a correction factor that is
+    smoothed towards the ratio between observed peak RSS and the raw
+    estimate, and persisted so calibration survives restarts.
+    """
+
+    BASE_MB = {'pdf': 200.0, 'epub': 250.0, 'office': 200.0, 'other': 150.0}
+    MB_PER_FILE_MB = {'pdf': 1.5, 'epub': 4.0, 'office': 3.0, 'other': 2.0}
+    MB_PER_PAGE = 0.35  # Extracted text, chunks and embedding batches per page
+    SMOOTHING = 0.3     # Weight of a new observation in the correction factor
+    MIN_FACTOR = 0.25
+    MAX_FACTOR = 8.0
+
+    def __init__(self, calibration_file=None):
+        self.calibration_file = calibration_file
+        self._lock = threading.Lock()
+        self._factors = {}
+        self._observations = {}
+        self._load()
+
+    @staticmethod
+    def category(filepath):
+        """Map a file to the category used for its coefficients"""
+        ext = os.path.splitext(filepath)[1].lower()
+        if ext == '.pdf':
+            return 'pdf'
+        if ext in ('.epub', '.mobi', '.azw', '.azw3'):
+            return 'epub'
+        if ext in ('.doc', '.docx', '.ppt', '.pptx'):
+            return 'office'
+        return 'other'
+
+    def _raw_estimate(self, category, size_mb, page_count):
+        return (self.BASE_MB[category]
+                + size_mb * self.MB_PER_FILE_MB[category]
+                + (page_count or 0) * self.MB_PER_PAGE)
+
+    def estimate(self, filepath, size_mb, page_count=None):
+        """Return the calibrated peak memory estimate in MB"""
+        category = self.category(filepath)
+        with self._lock:
+            factor = self._factors.get(category, 1.0)
+        return self._raw_estimate(category, size_mb, page_count) * factor
+
+    def observe(self, filepath, size_mb, page_count, peak_mb):
+        """Fold an observed peak RSS (MB) for a finished job into the calibration"""
+        if peak_mb is None or peak_mb <= 0:
+            return
+        category = self.category(filepath)
+        raw = self._raw_estimate(category, size_mb, page_count)
+        ratio = min(self.MAX_FACTOR, max(self.MIN_FACTOR, peak_mb / raw))
+        with self._lock:
+            old = self._factors.get(category, 1.0)
+            self._factors[category] = old * (1 - self.SMOOTHING) + ratio * self.SMOOTHING
+            self._observations[category] = self._observations.get(category, 0) + 1
+            new = self._factors[category]
+        logger.debug(f"Memory calibration for {category}: observed {peak_mb:.0f}MB vs raw "
+                     f"{raw:.0f}MB, factor {old:.2f} -> {new:.2f}")
+        self._save()
+
+    def _load(self):
+        if not self.calibration_file or not os.path.exists(self.calibration_file):
+            return
+        try:
+            with open(self.calibration_file, 'r') as f:
+                data = json.load(f)
+            self._factors = {k: float(v) for k, v in data.get('factors', {}).items()}
+            self._observations = data.get('observations', {})
+            logger.info(f"Loaded memory calibration factors: {self._factors}")
+        except Exception as e:
+            logger.warning(f"Could not load memory calibration: {e}")
+
+    def _save(self):
+        if not self.calibration_file:
+            return
+        with self._lock:
+            data = {
+                'factors': dict(self._factors),
+                'observations': dict(self._observations),
+                'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+        try:
+            temp_file = self.calibration_file + '.tmp'
+            with open(temp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.calibration_file)
+        except Exception as e:
+            logger.debug(f"Could not save memory calibration: {e}")
+
+
+class MemoryBudget:
+    """Global memory budget that jobs reserve against before they start"""
+
+    DEFAULT_FRACTION = 0.6  # Share of currently available memory used when not configured
+    MIN_BUDGET_MB = 1024
+
+    def __init__(self, total_mb):
+        self.total_mb = float(total_mb)
+        self.reserved_mb = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        """Build a budget from PERSONAL_LIBRARY_MEMORY_BUDGET_MB or available memory"""
+        value = os.getenv(ENV_MEMORY_BUDGET_MB)
+        if value:
+            try:
+                return cls(max(cls.MIN_BUDGET_MB, float(value)))
+            except ValueError:
+                logger.warning(f"Invalid {ENV_MEMORY_BUDGET_MB} value '{value}', using default")
+        try:
+            available_mb = psutil.virtual_memory().available / (1024 * 1024)
+        except Exception:
+            available_mb = 4096
+        return cls(max(cls.MIN_BUDGET_MB, available_mb * cls.DEFAULT_FRACTION))
+
+    @property
+    def available_mb(self):
+        with self._lock:
+            return self.total_mb - self.reserved_mb
+
+    def try_reserve(self, mb, force=False):
+        """Reserve mb from the budget, returning the granted amount or None
+
+        Estimates larger than the whole budget are clamped to it, so such a
+        job still runs once everything else has drained. force grants the
+        reservation even when it overcommits the budget.
+        """
+        grant = min(float(mb), self.total_mb)
+        with self._lock:
+            if force or self.reserved_mb + grant <= self.total_mb:
+                self.reserved_mb += grant
+                return grant
+        return None
+
+    def release(self, mb):
+        with self._lock:
+            self.reserved_mb = max(0.0, self.reserved_mb - mb)
+
+
+class PeakRSSTracker:
+    """Samples process RSS in the background and attributes peaks to running jobs
+
+    RSS is process-wide, so while several jobs overlap the growth above each
+    job's starting baseline is shared out in proportion to their estimates.
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._process = psutil.Process()
+
+    def _rss_mb(self):
+        try:
+            return self._process.memory_info().rss / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _sample(self):
+        rss = self._rss_mb()
+        with self._lock:
+            total_estimate = sum(w['estimate'] for w in self._windows.values()) or 1.0
+            for window in self._windows.values():
+                share = window['estimate'] / total_estimate
+                attributed = max(0.0, rss - window['baseline']) * share
+                window['peak'] = max(window['peak'], attributed)
+
+    def _sample_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                active = bool(self._windows)
+            if active:
+                self._sample()
+            self._stop.wait(self.interval)
+
+    def begin(self, job_id, estimate_mb):
+        with self._lock:
+            self._windows[job_id] = {
+                'baseline': self._rss_mb(),
+                'estimate': max(1.0, estimate_mb),
+                'peak': 0.0
+            }
+
+    def end(self, job_id):
+        """Stop tracking a job and return its attributed peak RSS growth in MB"""
+        self._sample()
+        with self._lock:
+            window = self._windows.pop(job_id, None)
+        return window['peak'] if window else None
+
+
+def get_pdf_page_count(filepath):
+    """Return the page count of a PDF, or None if it cannot be read"""
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(filepath, strict=False).pages)
+    except Exception as e:
+        logger.debug(f"Could not read page count for {filepath}: {e}")
+        return None
+
+
+def select_next_job(pending, budget, nothing_running):
+    """Pop the first pending job whose estimate fits in the budget
+
+    If nothing is running and no job fits, the head of the queue is admitted
+    anyway so an oversized document cannot stall the whole batch.
+    """
+    for i, job in enumerate(pending):
+        grant = budget.try_reserve(job.estimate_mb)
+        if grant is not None:
+            job.reserved_mb = grant
+            return pending.pop(i)
+    if nothing_running and pending:
+        job = pending.pop(0)
+        job.reserved_mb = budget.try_reserve(job.estimate_mb, force=True)
+        return job
+    return None
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Feedback-driven worker control for the background indexer
+Grows or shrinks indexing concurrency from measured throughput (AIMD)
+instead of static CPU/memory formulas
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+ENV_MAX_WORKERS = "PERSONAL_LIBRARY_MAX_WORKERS"
+
+
+def count_open_fds():
+    """Count this process's open file descriptors without spawning lsof
+
+    Reads /proc/self/fd on Linux and /dev/fd on macOS, both of which are a
+    single directory listing.
+    """
+    for fd_dir in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    try:
+        return psutil.Process().num_fds()
+    except Exception:
+        return None
+
+
+class ResizableWorkerPool:
+    """Thread pool whose concurrency limit can be changed while it runs
+
+    Threads are created up to max_threads, but only `limit` jobs are
+    admitted at a time; shrinking takes effect as running jobs finish.
+    """
+
+    def __init__(self, max_threads, initial_limit=None):
+        self.max_threads = max(1, max_threads)
+        self._limit = self._clamp(initial_limit or self.max_threads)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_threads)
+        self.running = {}
+
+    def _clamp(self, value):
+        return max(1, min(self.max_threads, int(value)))
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def resize(self, new_limit):
+        self._limit = self._clamp(new_limit)
+        return self._limit
+
+    def has_capacity(self):
+        return len(self.running) < self._limit
+
+    def submit(self, fn, item):
+        future = self._executor.submit(fn, item)
+        self.running[future] = item
+        return future
+
+    def pop(self, future):
+        return self.running.pop(future)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=True)
+        return False
+
+
+class AdaptiveWorkerController:
+    """Additive-increase / multiplicative-decrease controller for worker count
+
+    Completed documents and chunks are accumulated over a sampling window.
+    At the end of each window the controller adds one worker if the last
+    increase paid off (or nothing has been tried yet) and there is no
+    resource pressure; if throughput did not improve after an increase, or
+    file descriptors or memory are under pressure, it cuts the worker count
+    multiplicatively. CPU saturation shows up as flat throughput, so it is
+    not sampled separately.
+    """
+
+    WINDOW_SECONDS = 60      # Minimum length of a sampling window
+    MIN_WINDOW_DOCS = 3      # Completions needed before a window is judged
+    GAIN_TOLERANCE = 0.05    # Throughput must improve by 5% to justify an increase
+    DECREASE_FACTOR = 0.75
+    FDS_PER_WORKER = 60      # Each worker might hold ~20-60 FDs (PDFs, EPUB zips, temp files)
+    MEMORY_PRESSURE_PERCENT = 85
+
+    def __init__(self, min_workers=1, max_workers=8, initial_workers=2,
+                 fd_limit=None, fd_reserve=100, window_seconds=None):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.current = max(self.min_workers, min(self.max_workers, initial_workers))
+        self.fd_limit = fd_limit
+        self.fd_reserve = fd_reserve
+        self.window_seconds = window_seconds or self.WINDOW_SECONDS
+
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_docs = 0
+        self._window_chunks = 0
+        self._previous_throughput = None
+        self._last_action = None
+        self.last_rates = {"docs_per_sec": 0.0, "chunks_per_sec": 0.0}
+
+    @classmethod
+    def worker_ceiling(cls, default_ceiling):
+        """Upper bound for workers, overridable with PERSONAL_LIBRARY_MAX_WORKERS"""
+        value = os.getenv(ENV_MAX_WORKERS)
+        if value:
+            try:
+                return max(1, int(value))
+            except ValueError:
+                logger.warning(f"Invalid {ENV_MAX_WORKERS} value '{value}', using {default_ceiling}")
+        return default_ceiling
+
+    def record(self, chunks=0):
+        """Record a completed document and the number of chunks it produced"""
+        with self._lock:
+            self._window_docs += 1
+            self._window_chunks += chunks or 0
+
+    def _pressure(self):
+        """Return a description of resource pressure, or None"""
+        if self.fd_limit:
+            fds = count_open_fds()
+            if fds is not None:
+                fd_headroom = self.fd_limit - self.fd_reserve - fds
+                if fd_headroom < self.FDS_PER_WORKER:
+                    return f"file descriptors {fds}/{self.fd_limit}"
+        try:
+            memory_percent = psutil.virtual_memory().percent
+            if memory_percent > self.MEMORY_PRESSURE_PERCENT:
+                return f"memory {memory_percent:.0f}%"
+        except Exception:
+            pass
+        return None
+
+    def maybe_adjust(self):
+        """Close the sampling window if it is due and return the new worker count"""
+        with self._lock:
+            elapsed = time.monotonic() - self._window_start
+            if elapsed < self.window_seconds or self._window_docs < self.MIN_WINDOW_DOCS:
+                return self.current
+            docs_rate = self._window_docs / elapsed
+            chunks_rate = self._window_chunks / elapsed
+            self._window_start = time.monotonic()
+            self._window_docs = 0
+            self._window_chunks = 0
+
+        self.last_rates = {"docs_per_sec": docs_rate, "chunks_per_sec": chunks_rate}
+        # Chunks are a better measure of work done than documents of wildly
+        # different sizes; fall back to documents when nothing was chunked
+        throughput = chunks_rate if chunks_rate > 0 else docs_rate
+        previous = self._previous_throughput
+        old = self.current
+
+        pressure = self._pressure()
+        if pressure:
+            self.current = max(self.min_workers, min(old - 1, int(old * self.DECREASE_FACTOR)))
+            self._last_action = "decrease"
+            reason = f"resource pressure ({pressure})"
+        elif (self._last_action == "increase" and previous is not None
+              and throughput < previous * (1 + self.GAIN_TOLERANCE)):
+            self.current = max(self.min_workers, min(old - 1, int(old * self.DECREASE_FACTOR)))
+            self._last_action = "decrease"
+            reason = "last increase did not improve throughput"
+        elif self.current < self.max_workers:
+            self.current = old + 1
+            self._last_action = "increase"
+            reason = "probing for more throughput"
+        else:
+            self._last_action = "hold"
+            reason = "at worker ceiling"
+
+        self._previous_throughput = throughput
+        logger.info(f"Worker controller: {docs_rate * 60:.1f} docs/min, {chunks_rate:.1f} chunks/sec; "
+                    f"workers {old} -> {self.current} ({reason})")
+        return self.current
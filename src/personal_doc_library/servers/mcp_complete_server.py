@@ -11,16 +11,36 @@ import logging
 import select
 import time
 import threading
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 from datetime import datetime
 
-from ..core.shared_rag import SharedRAG, IndexLock
+from ..core.catalog import LibraryCatalog
 from ..core.config import config
+from ..core.deadline import Deadline
+from ..core.interactive_qos import InteractiveSignal
+from ..core.snippets import allocate_budget, best_snippet, query_terms
+
+if TYPE_CHECKING:
+    from ..core.shared_rag import SharedRAG
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
 logger = logging.getLogger(__name__)
 
+
+class RequestContext:
+    """An in-flight JSON-RPC request and its cancellation flag"""
+
+    def __init__(self, request: Dict[str, Any]):
+        self.request = request
+        self.id = request.get("id")
+        self.method = request.get("method", "")
+        self.tool_name = (request.get("params") or {}).get("name") if self.method == "tools/call" else None
+        self.cancelled = threading.Event()
+        self.received = time.monotonic()  # The client's timeout runs from here
+
+
 class CompleteMCPServer:
     """Complete MCP server with all features"""
 
@@ -38,21 +58,52 @@ class CompleteMCPServer:
     PASSAGE_PREVIEW_SHORT = 200   # Short passage preview
     PASSAGE_PREVIEW_MEDIUM = 400  # Medium passage preview
     PASSAGE_PREVIEW_LONG = 600    # Long passage preview
+    CONTEXT_WINDOW_MAX = 6000     # Max characters of a hit widened with its neighbouring chunks
+    MAX_CONTEXT_CHUNKS = 5        # Max neighbouring chunks fetched on each side of a hit
+    DEFAULT_RESPONSE_CHAR_BUDGET = 8000  # Passage characters shared by all hits of one response
+    COMPARE_DIVERSITY = 0.5       # Default diversity for compare_perspectives
+    READING_DIVERSITY = 0.7       # Default diversity for daily_reading
+
+    # Configuration: Request concurrency
+    DEFAULT_MAX_WORKERS = 4       # Requests handled at the same time
+    DEFAULT_MAX_HEAVY_TOOLS = 1   # Heavy tool calls running at the same time
+    HEAVY_TOOLS = frozenset({
+        "summarize_book", "extract_pages", "book_pages", "compare_perspectives",
+        "extract_quotes", "daily_reading", "refresh_cache", "warmup",
+    })
 
     def __init__(self):
         # Use configuration system for paths
         self.books_directory = str(config.books_directory)
         self.db_directory = str(config.db_directory)
-        self.rag: Optional[SharedRAG] = None
+        self.rag: Optional["SharedRAG"] = None
+        # Metadata tools are answered from the catalog while the RAG loads
+        self.catalog = LibraryCatalog(self.db_directory, self.books_directory)
         self._rag_lock = threading.Lock()
         self._rag_initializing = False
         self._rag_init_error: Optional[str] = None
         self._init_thread: Optional[threading.Thread] = None
+        # Tells a running indexer to yield CPU while tool calls are served
+        self.interactive_signal = InteractiveSignal(self.db_directory)
 
         # Read timeout configuration from environment with validation
         self.init_timeout = self._parse_timeout_config('MCP_INIT_TIMEOUT', self.DEFAULT_INIT_TIMEOUT)
         self.tool_timeout = self._parse_timeout_config('MCP_TOOL_TIMEOUT', self.DEFAULT_TOOL_TIMEOUT)
 
+        # Concurrent request handling
+        self.max_workers = self._parse_count_config('MCP_MAX_WORKERS', self.DEFAULT_MAX_WORKERS)
+        self.max_heavy_tools = self._parse_count_config('MCP_MAX_HEAVY_TOOLS', self.DEFAULT_MAX_HEAVY_TOOLS)
+        self.response_char_budget = self._parse_count_config('MCP_RESPONSE_CHAR_BUDGET',
+                                                             self.DEFAULT_RESPONSE_CHAR_BUDGET)
+        self._heavy_semaphore = threading.BoundedSemaphore(self.max_heavy_tools)
+        self._inflight: Dict[Any, RequestContext] = {}
+        self._inflight_lock = threading.Lock()
+        self._request_state = threading.local()  # The deadline of the request a worker is handling
+        self._write_lock = threading.Lock()
+        self._stdout = sys.stdout
+        self.last_warmup: Optional[Dict[str, Any]] = None
+        self._book_vector_index = None
+
         # Check if warmup on start is requested
         warmup_on_start = os.environ.get('MCP_WARMUP_ON_START', 'false').lower() in ('true', '1', 'yes')
 
@@ -64,6 +115,10 @@ class CompleteMCPServer:
             logger.info("MCP_WARMUP_ON_START enabled - waiting for RAG initialization...")
             logger.info(f"Timeout: {self.init_timeout} seconds")
             if self.ensure_rag_initialized(timeout=self.init_timeout):
+                try:
+                    self.last_warmup = self.rag.warm_up()
+                except Exception as e:
+                    logger.warning(f"Warm-up probe failed: {e}")
                 logger.info("✅ Warmup complete - server ready to accept requests")
             else:
                 logger.warning("⚠️  Warmup incomplete - initialization still in progress")
@@ -106,6 +161,62 @@ class CompleteMCPServer:
             )
             return default
 
+    def _parse_count_config(self, env_var: str, default: int) -> int:
+        """Parse a positive integer setting from an environment variable"""
+        try:
+            value = int(os.environ.get(env_var, default))
+            if value < 1:
+                logger.warning(f"{env_var}={value} must be at least 1. Using default: {default}")
+                return default
+            return value
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid {env_var} value '{os.environ.get(env_var)}': {e}. Using default: {default}")
+            return default
+
+    def _passage_limit(self, arguments: Dict[str, Any], count: int, display_max: int, widen: int = 1) -> int:
+        """Characters each of count passages may use: the response budget split between them
+
+        The caller's max_chars sets the budget and is honoured even when the
+        share drops below the usual per-passage minimum; by default it is the
+        configured response budget, times widen for passages widened with
+        their neighbours.
+        """
+        budget = self.response_char_budget * widen
+        try:
+            if arguments.get("max_chars"):
+                budget = max(1, int(arguments["max_chars"]))
+                return min(display_max, allocate_budget(count, budget, minimum=1))
+        except (ValueError, TypeError):
+            pass
+        return min(display_max, allocate_budget(count, budget))
+
+    def _diversity(self, arguments: Dict[str, Any], default: float = 0.0) -> float:
+        """The diversity argument as a number in 0-1"""
+        try:
+            value = float(arguments.get("diversity", default))
+        except (ValueError, TypeError):
+            return default
+        return max(0.0, min(value, 1.0))
+
+    def _request_deadline(self) -> Deadline:
+        """Deadline of the tool call being handled: MCP_TOOL_TIMEOUT after it was received"""
+        deadline = getattr(self._request_state, "deadline", None)
+        return deadline if deadline is not None else Deadline(self.tool_timeout)
+
+    def _passage_text(self, content: str, query: str, limit: int, terms, deadline: Deadline) -> str:
+        """Query-focused snippet of content, or its first limit characters once the deadline has passed"""
+        if deadline.expired():
+            deadline.skip("query-focused snippets")
+            return f"{content[:limit]}..." if len(content) > limit else content
+        return best_snippet(content, query, limit, terms)
+
+    def _partial_notice(self, deadline: Deadline) -> str:
+        """Line flagging a response that left out work to answer in time (empty if complete)"""
+        if not deadline.partial:
+            return ""
+        return (f"⚠️ Partial results: skipped {', '.join(deadline.skipped)} "
+                f"to answer within {self.tool_timeout}s (MCP_TOOL_TIMEOUT)\n\n")
+
     def _start_background_init(self):
         """Start RAG initialization in background thread"""
         def init_rag():
@@ -119,6 +230,7 @@ class CompleteMCPServer:
                     self._rag_initializing = True
 
                 logger.info("Starting background RAG initialization...")
+                from ..core.shared_rag import SharedRAG
                 rag = SharedRAG(self.books_directory, self.db_directory)
 
                 duration = time.time() - start_time
@@ -194,6 +306,7 @@ class CompleteMCPServer:
         if self.rag is None and not self._rag_initializing:
             logger.info("Initializing RAG synchronously (background init not running)...")
             try:
+                from ..core.shared_rag import SharedRAG
                 with self._rag_lock:
                     self.rag = SharedRAG(self.books_directory, self.db_directory)
                 logger.info("Synchronous RAG initialization completed")
@@ -273,7 +386,7 @@ class CompleteMCPServer:
     def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Handle incoming MCP requests"""
         method = request.get("method", "")
-        params = request.get("params", {})
+        params = request.get("params") or {}
         
         # Check for new books on initialization
         if method == "initialize":
@@ -332,6 +445,24 @@ class CompleteMCPServer:
                                 "folder": {
                                     "type": "string",
                                     "description": "Optional: Restrict search to a specific folder (e.g., 'DigitalFence' or 'DigitalFence/OU students resumes')"
+                                },
+                                "top_books": {
+                                    "type": "integer",
+                                    "description": "Optional: Two-stage search - pick this many most relevant books first, then search only their passages (0 = whole library)"
+                                },
+                                "context_chunks": {
+                                    "type": "integer",
+                                    "description": "Optional: Widen each passage with this many neighbouring passages on either side (0-5), returned as continuous text",
+                                    "default": 0
+                                },
+                                "max_chars": {
+                                    "type": "integer",
+                                    "description": "Optional: Character budget for passage text in the whole response; each passage is cut to its sentences that best match the query"
+                                },
+                                "diversity": {
+                                    "type": "number",
+                                    "description": "Optional: 0-1, trade relevance for variety - re-rank a larger pool by maximal marginal relevance and cap passages per book (0 = plain relevance order)",
+                                    "default": 0
                                 }
                             },
                             "required": ["query"]
@@ -346,6 +477,15 @@ class CompleteMCPServer:
                                 "practice_type": {
                                     "type": "string",
                                     "description": "Type of practice to find"
+                                },
+                                "max_chars": {
+                                    "type": "integer",
+                                    "description": "Optional: Character budget for passage text in the whole response; each passage is cut to its sentences that best match the query"
+                                },
+                                "diversity": {
+                                    "type": "number",
+                                    "description": "Optional: 0-1, trade relevance for variety - re-rank a larger pool by maximal marginal relevance and cap passages per book (0 = plain relevance order)",
+                                    "default": 0
                                 }
                             },
                             "required": ["practice_type"]
@@ -360,6 +500,15 @@ class CompleteMCPServer:
                                 "topic": {
                                     "type": "string",
                                     "description": "Topic to compare"
+                                },
+                                "max_chars": {
+                                    "type": "integer",
+                                    "description": "Optional: Character budget for passage text in the whole response; each passage is cut to its sentences that best match the query"
+                                },
+                                "diversity": {
+                                    "type": "number",
+                                    "description": "Optional: 0-1, trade relevance for variety - re-rank a larger pool by maximal marginal relevance and cap passages per book (0 = plain relevance order)",
+                                    "default": 0.5
                                 }
                             },
                             "required": ["topic"]
@@ -415,6 +564,11 @@ class CompleteMCPServer:
                                     "type": "integer",
                                     "description": "Maximum number of quotes",
                                     "default": 10
+                                },
+                                "diversity": {
+                                    "type": "number",
+                                    "description": "Optional: 0-1, trade relevance for variety - re-rank a larger pool by maximal marginal relevance and cap passages per book (0 = plain relevance order)",
+                                    "default": 0
                                 }
                             },
                             "required": ["topic"]
@@ -435,6 +589,11 @@ class CompleteMCPServer:
                                     "description": "Reading length",
                                     "enum": ["short", "medium", "long"],
                                     "default": "medium"
+                                },
+                                "diversity": {
+                                    "type": "number",
+                                    "description": "Optional: 0-1, trade relevance for variety - re-rank a larger pool by maximal marginal relevance and cap passages per book (0 = plain relevance order)",
+                                    "default": 0.7
                                 }
                             }
                         }
@@ -454,6 +613,11 @@ class CompleteMCPServer:
                                     "description": "Level of detail in answer",
                                     "enum": ["concise", "detailed"],
                                     "default": "concise"
+                                },
+                                "diversity": {
+                                    "type": "number",
+                                    "description": "Optional: 0-1, trade relevance for variety - re-rank a larger pool by maximal marginal relevance and cap passages per book (0 = plain relevance order)",
+                                    "default": 0
                                 }
                             },
                             "required": ["question"]
@@ -469,7 +633,7 @@ class CompleteMCPServer:
                     },
                     {
                         "name": "warmup",
-                        "description": "Initialize the RAG system to prevent timeouts on first use",
+                        "description": "Initialize the RAG system, preload the vector index and prime the model to prevent slow first searches; reports cold vs warm timings",
                         "inputSchema": {
                             "type": "object",
                             "properties": {}
@@ -554,6 +718,25 @@ class CompleteMCPServer:
                             "required": ["book", "pages"]
                         }
                     },
+                    {
+                        "name": "similar_books",
+                        "description": "Find books whose overall content is most similar to a given book",
+                        "inputSchema": {
+                            "type": "object",
+                            "properties": {
+                                "book": {
+                                    "type": "string",
+                                    "description": "Book name or partial title to match (case-insensitive)"
+                                },
+                                "limit": {
+                                    "type": "integer",
+                                    "description": "Number of similar books to return (default 10, max 50)",
+                                    "default": 10
+                                }
+                            },
+                            "required": ["book"]
+                        }
+                    },
                     {
                         "name": "book_pages",
                         "description": "List all page numbers available in the index for a specific book",
@@ -609,8 +792,8 @@ class CompleteMCPServer:
             uri = params.get("uri", "")
 
             if uri == "library://stats":
-                self.ensure_rag_initialized()
-                stats = self.rag.get_stats()
+                # Category counts need the vector store; serve the catalog until it has loaded
+                stats = self.rag.get_stats() if self.rag is not None else self.catalog.get_stats()
                 return {
                     "result": {
                         "contents": [{
@@ -622,13 +805,12 @@ class CompleteMCPServer:
                 }
 
             elif uri == "library://recent":
-                self.ensure_rag_initialized()
                 recent_books = []
                 days = 7
                 cutoff_time = time.time() - (days * 24 * 3600)
 
-                for book_path in self.rag.book_index.keys():
-                    full_path = os.path.join(self.rag.books_directory, book_path)
+                for book_path in self.catalog.book_index.keys():
+                    full_path = os.path.join(self.books_directory, book_path)
                     if os.path.exists(full_path):
                         mtime = os.path.getmtime(full_path)
                         if mtime > cutoff_time:
@@ -649,9 +831,8 @@ class CompleteMCPServer:
                 }
 
             elif uri == "library://bibliography":
-                self.ensure_rag_initialized()
                 bibliography = []
-                for book_path in sorted(self.rag.book_index.keys()):
+                for book_path in sorted(self.catalog.book_index.keys()):
                     bibliography.append(f"• {os.path.basename(book_path)}")
 
                 return {
@@ -667,11 +848,7 @@ class CompleteMCPServer:
                 }
 
             elif uri == "library://failed":
-                failed_list_path = os.path.join(os.path.dirname(self.rag.db_directory), "failed_documents.json")
-                failed_docs = []
-                if os.path.exists(failed_list_path):
-                    with open(failed_list_path, 'r') as f:
-                        failed_docs = json.load(f)
+                failed_docs = self.catalog.get_failed()
 
                 return {
                     "result": {
@@ -817,6 +994,9 @@ Show:
                 synthesize = arguments.get("synthesize", False)
                 book = arguments.get("book")
                 folder = arguments.get("folder")
+                top_books = arguments.get("top_books")
+                context_chunks = max(0, min(int(arguments.get("context_chunks") or 0), self.MAX_CONTEXT_CHUNKS))
+                deadline = self._request_deadline()
 
                 # If a book is specified, filter results to that book
                 if book:
@@ -838,28 +1018,34 @@ Show:
                     # If multiple matches, use the first one
                     book_name = matching_books[0]
 
-                    # Search with book filter and optional folder filter
-                    all_results = self.rag.search(query, limit * 3, filter_type, synthesize, folder)
-                    results = [r for r in all_results if r.get('source', '').startswith(book_name)][:limit]
+                    # Search only that book's passages, with the optional folder filter
+                    results = self.rag.search(query, limit, filter_type, synthesize, folder,
+                                              context_chunks=context_chunks, deadline=deadline,
+                                              diversity=self._diversity(arguments), book=book_name)
                 else:
-                    results = self.rag.search(query, limit, filter_type, synthesize, folder)
+                    results = self.rag.search(query, limit, filter_type, synthesize, folder, top_books=top_books,
+                                              context_chunks=context_chunks, deadline=deadline,
+                                              diversity=self._diversity(arguments))
                 
                 # Enhanced formatting for article writing
                 text = f"Found {len(results)} relevant passages for query: '{query}'\n\n"
+                display_max = self.CONTEXT_WINDOW_MAX if context_chunks else self.CONTENT_PREVIEW_MAX
+                passage_max = self._passage_limit(arguments, len(results), display_max, 1 + 2 * context_chunks)
+                terms = query_terms(query)
                 
                 for i, result in enumerate(results, 1):
                     text += f"━━━ Result {i} ━━━\n"
                     text += f"📖 Source: {result['source']}\n"
                     text += f"📄 Page: {result['page']}\n"
+                    if len(result.get('context_pages', [])) > 1:
+                        text += f"📑 Context pages: {', '.join(str(p) for p in result['context_pages'])}\n"
                     text += f"🏷️  Type: {result['type']}\n"
                     text += f"📊 Relevance: {result['relevance_score']:.3f}\n\n"
                     
-                    # Provide more content for article writing
-                    content = result['content']
-                    if len(content) > self.CONTENT_PREVIEW_MAX:
-                        text += f"{content[:self.CONTENT_PREVIEW_MAX]}...\n\n"
-                    else:
-                        text += f"{content}\n\n"
+                    # The sentences that best match the query, within this passage's share of the budget
+                    content = result.get('context', result['content'])
+                    text += f"{self._passage_text(content, query, passage_max, terms, deadline)}\n\n"
+                text = self._partial_notice(deadline) + text
                 
                 return {
                     "result": {
@@ -871,11 +1057,15 @@ Show:
                 self.ensure_rag_initialized()
                 practice_type = arguments.get("practice_type", "")
                 query = f"practice {practice_type} technique method"
+                deadline = self._request_deadline()
                 
-                results = self.rag.search(query, k=15, filter_type="practice", synthesize=False)
+                results = self.rag.search(query, k=15, filter_type="practice", synthesize=False, deadline=deadline,
+                                          diversity=self._diversity(arguments))
                 
                 if results:
                     text = f"Found {len(results)} practices related to '{practice_type}':\n\n"
+                    passage_max = self._passage_limit(arguments, len(results), self.PASSAGE_PREVIEW_MEDIUM)
+                    terms = query_terms(practice_type)
                     
                     # Group by source for better organization
                     by_source = {}
@@ -889,9 +1079,11 @@ Show:
                         text += f"\n📚 {source}\n"
                         text += "─" * 40 + "\n"
                         for practice in practices:
-                            text += f"• Page {practice['page']}: {practice['content'][:self.PASSAGE_PREVIEW_MEDIUM]}...\n\n"
+                            snippet = self._passage_text(practice['content'], practice_type, passage_max, terms, deadline)
+                            text += f"• Page {practice['page']}: {snippet}\n\n"
                 else:
                     text = "No specific practices found for that query."
+                text = self._partial_notice(deadline) + text
                 
                 return {
                     "result": {
@@ -903,8 +1095,10 @@ Show:
                 self.ensure_rag_initialized()
                 topic = arguments.get("topic", "")
                 query = f"{topic} perspective view understanding"
+                deadline = self._request_deadline()
                 
-                results = self.rag.search(query, k=20, synthesize=False)
+                results = self.rag.search(query, k=20, synthesize=False, deadline=deadline,
+                                          diversity=self._diversity(arguments, self.COMPARE_DIVERSITY))
                 
                 if results:
                     text = f"Comparing perspectives on '{topic}' across {len(results)} passages:\n\n"
@@ -917,6 +1111,10 @@ Show:
                             by_type[type_cat] = []
                         by_type[type_cat].append(result)
                     
+                    shown = sum(min(len(perspectives), 3) for perspectives in by_type.values())
+                    passage_max = self._passage_limit(arguments, shown, self.CONTENT_SUMMARY_MAX)
+                    terms = query_terms(topic)
+                    
                     for type_cat, perspectives in by_type.items():
                         text += f"\n🔸 {type_cat.title()} Perspective:\n"
                         text += "━" * 50 + "\n"
@@ -924,10 +1122,11 @@ Show:
                         # Show top 3 from each category
                         for i, persp in enumerate(perspectives[:3], 1):
                             text += f"\n{i}. {persp['source']} (p.{persp['page']}):\n"
-                            text += f"   {persp['content'][:self.CONTENT_SUMMARY_MAX]}...\n"
+                            text += f"   {self._passage_text(persp['content'], topic, passage_max, terms, deadline)}\n"
                             text += f"   [Relevance: {persp['relevance_score']:.3f}]\n"
                 else:
                     text = "Not enough material found to compare perspectives."
+                text = self._partial_notice(deadline) + text
                 
                 return {
                     "result": {
@@ -953,6 +1152,11 @@ Content Categories:"""
                 
                 for category, count in stats.get('categories', {}).items():
                     text += f"\n- {category.title()}: {count:,} chunks"
+
+                flights = stats.get('search_flights')
+                if flights:
+                    text += (f"\n\nSearches since start: {flights['computed']:,} run, "
+                             f"{flights['coalesced']:,} served by an identical search already in progress")
                 
                 # Add indexing status
                 status = stats.get('indexing_status', {})
@@ -968,8 +1172,7 @@ Content Categories:"""
                 }
             
             elif tool_name == "index_status":
-                self.ensure_rag_initialized()
-                status = self.rag.get_status()
+                status = self.catalog.get_status()
                 
                 if status.get('status') == 'indexing':
                     details = status.get('details', {})
@@ -987,12 +1190,12 @@ Failed: {details.get('failed', 0)}"""
                         if 'failed' in status['details']:
                             text += f"\nFailed: {status['details']['failed']} files"
                 
-                # Check for new files
-                self.ensure_rag_initialized()
-                pdfs_to_index = self.rag.find_new_or_modified_pdfs()
-                if pdfs_to_index:
-                    text += f"\n\nNew/Modified PDFs waiting: {len(pdfs_to_index)}"
-                    text += "\nRun any search to trigger indexing, or use background monitor."
+                # Check for new files (hashes the library, so only once the RAG has loaded)
+                if self.rag is not None:
+                    pdfs_to_index = self.rag.find_new_or_modified_pdfs()
+                    if pdfs_to_index:
+                        text += f"\n\nNew/Modified PDFs waiting: {len(pdfs_to_index)}"
+                        text += "\nRun any search to trigger indexing, or use background monitor."
                 
                 return {
                     "result": {
@@ -1005,29 +1208,27 @@ Failed: {details.get('failed', 0)}"""
                 book_name = arguments.get("book_name", "")
                 summary_length = arguments.get("summary_length", "brief")
                 
-                # Search for content from this specific book
-                results = self.rag.search(
-                    query=f"book:{book_name}",
-                    k=50 if summary_length == "detailed" else 20,
-                    synthesize=False
-                )
-                
-                # Filter results to only include the specified book
-                book_results = [r for r in results if book_name.lower() in r.get('source', '').lower()]
+                # Representative passages spread across the book, in reading order
+                max_passages = 30 if summary_length == "detailed" else 15
+                matching_books, _, _ = self.rag.find_book_by_fuzzy_match(book_name) if book_name else ([], False, {})
+                book_results = []
+                if len(matching_books) == 1:
+                    book_results = self.rag.sample_book(matching_books[0], max_passages)
                 
-                if not book_results:
+                if len(matching_books) > 1:
+                    text = f"Multiple books match '{book_name}'. Please be more specific:\n"
+                    text += "\n".join(f"{i}. {path}" for i, path in enumerate(matching_books[:10], 1))
+                elif not book_results:
                     text = f"No content found for book: {book_name}"
                 else:
                     # Return direct passages for Claude to summarize
-                    text = f"Content from '{book_name}' ({len(book_results)} passages found):\n\n"
+                    total_chunks = self.rag.book_index.get(matching_books[0], {}).get('chunks', 0)
+                    text = (f"Content from '{os.path.basename(matching_books[0])}' ({len(book_results)} "
+                            f"representative passages of {total_chunks}):\n\n")
                     
-                    # Determine how many passages to show based on summary length
-                    max_passages = 30 if summary_length == "detailed" else 15
-                    
-                    for i, result in enumerate(book_results[:max_passages], 1):
+                    for i, result in enumerate(book_results, 1):
                         text += f"━━━ Passage {i} (Page {result['page']}) ━━━\n"
-                        text += f"🏷️  Type: {result['type']}\n"
-                        text += f"📊 Relevance: {result['relevance_score']:.3f}\n\n"
+                        text += f"🏷️  Type: {result['type']}\n\n"
                         
                         # Show more content for detailed summaries
                         content_length = 800 if summary_length == "detailed" else 500
@@ -1051,7 +1252,8 @@ Failed: {details.get('failed', 0)}"""
                 results = self.rag.search(
                     query=f"{topic} quote saying wisdom teaching",
                     k=max_quotes * 2,  # Get extra to filter
-                    synthesize=False
+                    synthesize=False,
+                    diversity=self._diversity(arguments)
                 )
                 
                 if not results:
@@ -1098,14 +1300,15 @@ Failed: {details.get('failed', 0)}"""
                 results = self.rag.search(
                     query=f"{theme} practice daily reflection",
                     k=num_passages * 2,
-                    synthesize=False
+                    synthesize=False,
+                    diversity=self._diversity(arguments, self.READING_DIVERSITY)
                 )
                 
                 if not results:
                     text = f"No readings found for theme: {theme}"
                 else:
                     import random
-                    # Select diverse passages
+                    # Vary the reading from day to day among the diversified passages
                     selected = random.sample(results, min(num_passages, len(results)))
                     
                     text = f"Daily Reading - Theme: {theme.title()}\n\n"
@@ -1135,7 +1338,8 @@ Failed: {details.get('failed', 0)}"""
                 results = self.rag.search(
                     query=question,
                     k=10 if detail_level == "detailed" else 5,
-                    synthesize=False
+                    synthesize=False,
+                    diversity=self._diversity(arguments)
                 )
                 
                 if results:
@@ -1173,10 +1377,16 @@ Failed: {details.get('failed', 0)}"""
 
                 # Reload the vector store to pick up new documents
                 logger.info("Reloading vector store...")
+                # The previous backend is dropped, not closed: searches still running on it
+                # keep it alive, and its connection and memory maps are freed after they finish
                 self.rag.vectorstore = self.rag.initialize_vectorstore()
 
-                # Clear the search cache
-                self.rag._search_cache.clear()
+                # Compute centroids for books indexed before book vectors existed
+                rebuilt_books = self.rag.rebuild_book_vectors()
+
+                # Clear the search cache (searches may be reading it concurrently)
+                with self.rag._cache_lock:
+                    self.rag._search_cache.clear()
 
                 # Clear the category cache (v0.3.4+)
                 if hasattr(self.rag, '_category_cache'):
@@ -1186,6 +1396,7 @@ Failed: {details.get('failed', 0)}"""
                 text += f"📚 Total books: {len(self.rag.book_index)}\n"
                 text += f"📊 Total chunks: {sum(info.get('chunks', 0) for info in self.rag.book_index.values())}\n"
                 text += f"🔄 Vector store: Reloaded\n"
+                text += f"🧭 Book vectors: {rebuilt_books} rebuilt\n"
                 text += f"🗑️  Search cache: Cleared\n"
                 text += f"🗑️  Category cache: Cleared"
 
@@ -1202,11 +1413,14 @@ Failed: {details.get('failed', 0)}"""
 
                 try:
                     if self.ensure_rag_initialized(timeout=warmup_timeout):
+                        report = self.rag.warm_up()
+                        self.last_warmup = report
                         text = "✅ RAG system initialized and warmed up!\n\n"
                         text += f"📚 Books indexed: {len(self.rag.book_index)}\n"
                         text += f"🔍 Search ready: Yes\n"
-                        text += f"💾 Vector store: Loaded\n"
-                        text += f"⚙️  Initialization took: <{warmup_timeout}s"
+                        text += f"💾 Vector store: Loaded, {report['page_cache_mb']:.0f}MB preloaded in {report['page_cache_ms']:.0f}ms\n"
+                        text += f"🧠 Model: {report['model_batch_ms']:.0f}ms dummy batch, {report['embed_query_ms']:.0f}ms per query embedding\n"
+                        text += f"⏱️  Probe query: {report['probe_cold_ms']:.0f}ms cold → {report['probe_warm_ms']:.0f}ms warm"
                     else:
                         text = "⏳ System is still initializing...\n\n"
                         text += f"The system is loading the embedding model and vector database.\n"
@@ -1224,34 +1438,14 @@ Failed: {details.get('failed', 0)}"""
                 }
             
             elif tool_name == "list_books":
-                self.ensure_rag_initialized()
-
                 pattern = arguments.get("pattern", "")
                 author = arguments.get("author", "")
                 limit = min(arguments.get("limit", 50), 200)  # Cap at 200
                 offset = max(arguments.get("offset", 0), 0)  # Ensure non-negative
 
-                # Get all books
-                all_books = list(self.rag.book_index.keys())
-                matching_books = []
-
-                for book_path in all_books:
-                    book_name = os.path.basename(book_path)
-                    book_dir = os.path.dirname(book_path)
-
-                    # Apply filters
-                    if pattern and pattern.lower() not in book_path.lower():
-                        continue
-                    if author and author.lower() not in book_dir.lower():
-                        continue
-
-                    matching_books.append((book_path, book_name, self.rag.book_index[book_path]))
-
-                # Sort by name
-                matching_books.sort(key=lambda x: x[1])
-
-                # Calculate pagination
-                total_matching = len(matching_books)
+                # One page from the catalog's name-sorted index
+                paginated_books, total_matching = self.catalog.list_books(pattern, author, offset, limit)
+                total_books = len(self.catalog.book_index)
 
                 # Check if offset is out of bounds
                 if offset >= total_matching and total_matching > 0:
@@ -1263,8 +1457,6 @@ Failed: {details.get('failed', 0)}"""
                         }
                     }
 
-                # Apply pagination
-                paginated_books = matching_books[offset:offset + limit]
                 has_more = (offset + limit) < total_matching
 
                 if not paginated_books:
@@ -1286,7 +1478,7 @@ Failed: {details.get('failed', 0)}"""
                     # Pagination summary
                     text += f"📊 Showing books {start_idx}-{end_idx} of {total_matching} matching"
                     if pattern or author:
-                        text += f" (filtered from {len(all_books)} total books)"
+                        text += f" (filtered from {total_books} total books)"
                     else:
                         text += " books"
 
@@ -1307,26 +1499,16 @@ Failed: {details.get('failed', 0)}"""
                 }
             
             elif tool_name == "recent_books":
-                self.ensure_rag_initialized()
-                
                 days = arguments.get("days", 1)
                 include_content = arguments.get("include_content", False)
+                if include_content:
+                    # Content samples need search; the listing itself comes from the catalog
+                    error_response = self.ensure_rag_or_error()
+                    if error_response:
+                        return error_response
                 
-                # Calculate cutoff time
-                from datetime import datetime, timedelta
-                cutoff_time = datetime.now() - timedelta(days=days)
-                
-                # Find recent books from the index
-                recent_books = []
-                for book_path, book_info in self.rag.book_index.items():
-                    # Check if book has indexed_at timestamp
-                    if 'indexed_at' in book_info:
-                        indexed_time = datetime.fromisoformat(book_info['indexed_at'])
-                        if indexed_time > cutoff_time:
-                            recent_books.append((book_path, book_info, indexed_time))
-                
-                # Sort by indexed time (most recent first)
-                recent_books.sort(key=lambda x: x[2], reverse=True)
+                # Most recent first, from the catalog's indexed_at-ordered index
+                recent_books = self.catalog.recent_books(days)
                 
                 if not recent_books:
                     text = f"No books found that were indexed in the last {days} day(s)."
@@ -1354,8 +1536,8 @@ Failed: {details.get('failed', 0)}"""
                         text += f"   📄 Chunks: {book_info.get('chunks', 'Unknown')}\n"
                         
                         if include_content:
-                            # Search for a sample from this book
-                            results = self.rag.search(f"book:{book_name}", k=1)
+                            # The book's most representative passage
+                            results = self.rag.sample_book(book_path, 1)
                             if results:
                                 sample = results[0]['content'][:self.PASSAGE_PREVIEW_SHORT] + "..." if len(results[0]['content']) > self.PASSAGE_PREVIEW_SHORT else results[0]['content']
                                 text += f"   📖 Sample: {sample}\n"
@@ -1407,7 +1589,10 @@ Failed: {details.get('failed', 0)}"""
                     text = f"📚 Extracted pages from: {result['book']}\n"
                     text += f"📁 Path: {result['book_path']}\n"
                     text += f"📄 Requested pages: {result['requested_pages']}\n"
-                    text += f"✅ Found: {result['total_pages_found']} pages\n\n"
+                    text += f"✅ Found: {result['total_pages_found']} pages\n"
+                    if result.get('available_pages'):
+                        text += f"📑 Pages in index: {result['available_pages']}\n"
+                    text += "\n"
                     
                     for page_num in sorted(result['extracted_pages'].keys()):
                         page_data = result['extracted_pages'][page_num]
@@ -1416,7 +1601,7 @@ Failed: {details.get('failed', 0)}"""
                             text += f"({page_data['chunks']} chunks)\n\n"
                             text += page_data['content']
                         else:
-                            text += page_data['content']
+                            text += page_data['content'] or "Page not found in index"
                         text += "\n"
                 
                 return {
@@ -1425,6 +1610,44 @@ Failed: {details.get('failed', 0)}"""
                     }
                 }
             
+            elif tool_name == "similar_books":
+                book = arguments.get("book", "")
+                limit = min(max(arguments.get("limit", 10), 1), 50)
+                if not book:
+                    return {
+                        "result": {
+                            "content": [{"type": "text", "text": "Error: Book name is required"}]
+                        }
+                    }
+
+                # Served from the book index and centroid file; no model or vector store needed
+                book_index = self.catalog.book_index
+                matches, _, _ = self.catalog.find_book(book)
+
+                book_vectors = self._book_vectors()
+                if not matches:
+                    text = f"❌ No books found matching '{book}'"
+                elif len(matches) > 1:
+                    text = f"❌ Multiple books match '{book}'. Please be more specific:\n"
+                    text += "\n".join(f"{i}. {p}" for i, p in enumerate(matches[:10], 1))
+                else:
+                    similar = book_vectors.similar(matches[0], limit)
+                    if similar is None:
+                        text = (f"⏳ No book vector for '{matches[0]}' yet. Book vectors are computed at "
+                                f"indexing time; run refresh_cache to build them for books indexed earlier.")
+                    else:
+                        text = f"📚 Books similar to {os.path.basename(matches[0])}:\n\n"
+                        for i, (rel_path, name, score) in enumerate(similar, 1):
+                            info = book_index.get(rel_path, {})
+                            text += f"{i}. {name} ({score:.0%} similar)\n"
+                            text += f"   📁 {rel_path} • {info.get('chunks', 0)} chunks\n"
+
+                return {
+                    "result": {
+                        "content": [{"type": "text", "text": text}]
+                    }
+                }
+            
             elif tool_name == "book_pages":
                 self.ensure_rag_initialized()
                 book = arguments.get("book", "")
@@ -1498,64 +1721,152 @@ Failed: {details.get('failed', 0)}"""
             }
         }
     
-    def run(self):
-        """Main loop to handle stdin/stdout communication"""
-        logger.info("Complete MCP Server starting...")
-        
-        while True:
+    def _book_vectors(self):
+        """Book centroid index, shared with the RAG once it is loaded"""
+        if self.rag is not None:
+            return self.rag.book_vectors
+        if self._book_vector_index is None:
+            from ..core.book_vectors import BookVectorIndex
+            self._book_vector_index = BookVectorIndex(self.db_directory)
+        return self._book_vector_index
+    
+    def _write_response(self, response: Dict[str, Any]):
+        """Write one JSON-RPC message; responses from worker threads never interleave"""
+        line = json.dumps(response)
+        with self._write_lock:
+            self._stdout.write(line + "\n")
+            self._stdout.flush()
+
+    def _write_error(self, request_id: Any, code: int, message: str):
+        """Write a JSON-RPC error response for a request that never reached a worker"""
+        self._write_response({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}})
+
+    def _cancel_request(self, params: Dict[str, Any]):
+        """Handle notifications/cancelled: abandon the request if it has not answered yet"""
+        request_id = params.get("requestId")
+        with self._inflight_lock:
+            context = self._inflight.get(request_id)
+        if context is None:
+            logger.info(f"Cancel for unknown or finished request {request_id}")
+            return
+        context.cancelled.set()
+        logger.info(f"Cancelled request {request_id} ({context.method}): {params.get('reason', 'no reason given')}")
+
+    def _acquire_heavy_slot(self, context: RequestContext) -> bool:
+        """Wait for a heavy-tool slot, giving up if the request is cancelled meanwhile"""
+        while not self._heavy_semaphore.acquire(timeout=0.5):
+            if context.cancelled.is_set():
+                return False
+        return True
+
+    def _dispatch(self, context: RequestContext):
+        """Handle one request on a worker thread and write its response"""
+        request = context.request
+        heavy = context.tool_name in self.HEAVY_TOOLS
+        response = None
+        try:
+            if heavy and not self._acquire_heavy_slot(context):
+                return
             try:
-                line = sys.stdin.readline()
+                if context.cancelled.is_set():
+                    return
+                if context.method == "tools/call":
+                    self.interactive_signal.mark()
+                self._request_state.deadline = Deadline(self.tool_timeout, start=context.received)
+                response = self.handle_request(request)
+                if context.method == "tools/call":
+                    self.interactive_signal.mark()
+            finally:
+                self._request_state.deadline = None
+                if heavy:
+                    self._heavy_semaphore.release()
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            response = {
+                "error": {
+                    "code": -32603,
+                    "message": str(e)
+                }
+            }
+        finally:
+            with self._inflight_lock:
+                if self._inflight.get(context.id) is context:
+                    del self._inflight[context.id]
+
+        if response is None or context.cancelled.is_set():
+            # Cancelled requests get no response
+            logger.info(f"Dropped cancelled request {context.id} ({context.method})")
+            return
+
+        # Add jsonrpc fields
+        response["jsonrpc"] = "2.0"
+        if "id" in request:
+            response["id"] = request["id"]
+
+        self._write_response(response)
+        logger.info(f"Sent response for method: {context.method}")
+        logger.info(f"Response sent: {json.dumps(response)[:200]}...")
+
+    def run(self, stdin=None, stdout=None):
+        """Main loop to handle stdin/stdout communication
+
+        Requests are dispatched to a worker pool and each response is written
+        as soon as it is ready, so a slow tool call does not hold up later
+        requests. At most MCP_MAX_HEAVY_TOOLS heavy tools run at once, and
+        notifications/cancelled abandons requests that have not answered yet.
+        """
+        stdin = stdin or sys.stdin
+        self._stdout = stdout or sys.stdout
+        logger.info(f"Complete MCP Server starting ({self.max_workers} workers, "
+                    f"{self.max_heavy_tools} heavy tool slots)...")
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mcp-request")
+        try:
+            while True:
+                line = stdin.readline()
                 if not line:
                     logger.info("No more input, exiting...")
                     break
                 logger.info(f"Received line: {line.strip()}")
-                
+
                 # Handle empty lines
                 if not line.strip():
                     logger.info("Received empty line, continuing...")
                     continue
-                
-                request = json.loads(line)
-                method = request.get("method", "")
-                
-                # Handle notifications (no response needed)
-                if method.startswith("notifications/"):
-                    logger.info(f"Received notification: {method}")
+
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Invalid JSON: {e}")
                     continue
-                
-                response = self.handle_request(request)
-                
-                # Add jsonrpc fields
-                response["jsonrpc"] = "2.0"
-                if "id" in request:
-                    response["id"] = request["id"]
-                
-                print(json.dumps(response))
-                sys.stdout.flush()
-                logger.info(f"Sent response for method: {request.get('method', 'unknown')}")
-                logger.info(f"Response sent: {json.dumps(response)[:200]}...")
-                logger.info("Waiting for next request...")
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON: {e}")
-            except Exception as e:
-                logger.error(f"Error: {e}")
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32603,
-                        "message": str(e)
-                    },
-                    "id": None  # Default id if request parsing failed
-                }
-                # Try to get the id from the request if available
+                if not isinstance(request, dict):
+                    logger.error(f"Invalid request, expected a JSON object: {line.strip()[:200]}")
+                    self._write_error(None, -32600, "Invalid Request: expected a JSON object")
+                    continue
+
+                # One bad message must not stop the read loop
                 try:
-                    if "request" in locals() and request and "id" in request:
-                        error_response["id"] = request["id"]
-                except:
-                    pass
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+                    method = request.get("method", "")
+
+                    # Handle notifications (no response needed)
+                    if method == "notifications/cancelled":
+                        self._cancel_request(request.get("params") or {})
+                        continue
+                    if method.startswith("notifications/"):
+                        logger.info(f"Received notification: {method}")
+                        continue
+
+                    context = RequestContext(request)
+                    if context.id is not None:
+                        with self._inflight_lock:
+                            self._inflight[context.id] = context
+                    executor.submit(self._dispatch, context)
+                except Exception as e:
+                    logger.error(f"Could not dispatch request: {e}", exc_info=True)
+                    self._write_error(request.get("id"), -32603, str(e))
+        finally:
+            # Finish in-flight requests before exiting
+            executor.shutdown(wait=True)
 
 def main() -> int:
     """Command-line entry point for launching the MCP server."""
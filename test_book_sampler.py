@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test representative passage selection for summarize_book.
+Checks that the sample covers every topic of a book whose chunks fall
+into clusters, and that it starts from the book's most typical chunk.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.book_sampler import representative_sample
+
+
+def test_sample_covers_every_topic():
+    rng = np.random.default_rng(0)
+    topics = rng.normal(size=(5, 64))
+    # 5 topics of very different sizes; the biggest dominates the centroid
+    sizes = [120, 40, 20, 10, 5]
+    labels = np.repeat(np.arange(5), sizes)
+    embeddings = topics[labels] + 0.1 * rng.normal(size=(len(labels), 64))
+
+    chosen = representative_sample(embeddings, 5)
+    assert len(set(chosen)) == 5
+    assert sorted(labels[chosen]) == [0, 1, 2, 3, 4]
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    assert chosen[0] == int(np.argmax(normalized @ normalized.mean(axis=0)))
+
+    assert representative_sample(embeddings[:3], 10) == [0, 1, 2]
+    assert representative_sample(np.zeros((0, 64)), 3) == []
+
+
+if __name__ == "__main__":
+    test_sample_covers_every_topic()
+    print("✅ Book sampler tests passed")
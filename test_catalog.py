@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test the library catalog's sorted listing indexes.
+Checks list_books paging and filters, recent_books ordering, and that both
+follow the indexer's rewrites of book_index.json.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.catalog import LibraryCatalog
+
+
+def write_index(directory, book_index):
+    path = os.path.join(directory, "book_index.json")
+    with open(path, "w") as f:
+        json.dump(book_index, f)
+    # Make sure the catalog sees a new mtime even on coarse-grained filesystems
+    stamp = time.time() + len(book_index)
+    os.utime(path, (stamp, stamp))
+
+
+def test_list_and_recent_books():
+    directory = tempfile.mkdtemp(prefix='ragdex_catalog_')
+    now = datetime.now()
+    book_index = {
+        "Watts/The Way of Zen.pdf": {"chunks": 10, "indexed_at": (now - timedelta(hours=2)).isoformat()},
+        "Watts/The Book.epub": {"chunks": 5, "indexed_at": (now - timedelta(days=3)).isoformat()},
+        "Suzuki/Zen Mind, Beginner's Mind.pdf": {"chunks": 7, "indexed_at": (now - timedelta(minutes=5)).isoformat()},
+        "Science/A Brief History of Time.pdf": {"chunks": 9, "indexed_at": (now - timedelta(days=40)).isoformat()},
+        "Notes/Untimed.docx": {"chunks": 1},
+    }
+    write_index(directory, book_index)
+    catalog = LibraryCatalog(directory)
+
+    page, total = catalog.list_books(offset=1, limit=2)
+    assert total == 5
+    assert [name for _, name, _ in page] == ["The Book.epub", "The Way of Zen.pdf"]
+
+    page, total = catalog.list_books(pattern="zen")
+    assert total == 2 and [name for _, name, _ in page] == ["The Way of Zen.pdf", "Zen Mind, Beginner's Mind.pdf"]
+    page, total = catalog.list_books(pattern="zen", author="watts")
+    assert total == 1 and page[0][0] == "Watts/The Way of Zen.pdf" and page[0][2]["chunks"] == 10
+
+    assert [path for path, _, _ in catalog.recent_books(1)] == [
+        "Suzuki/Zen Mind, Beginner's Mind.pdf", "Watts/The Way of Zen.pdf"]
+    assert len(catalog.recent_books(7)) == 3 and len(catalog.recent_books(365)) == 4
+
+    # The indexer removes one book and adds another
+    del book_index["Watts/The Way of Zen.pdf"]
+    book_index["Zen/Zen Flesh, Zen Bones.pdf"] = {"chunks": 3, "indexed_at": now.isoformat()}
+    write_index(directory, book_index)
+    page, total = catalog.list_books(pattern="zen")
+    assert [name for _, name, _ in page] == ["Zen Flesh, Zen Bones.pdf", "Zen Mind, Beginner's Mind.pdf"]
+    assert catalog.recent_books(1)[0][0] == "Zen/Zen Flesh, Zen Bones.pdf"
+
+    # Name lookups follow the same rules as SharedRAG.find_book_by_fuzzy_match
+    assert catalog.find_book("the book")[:2] == (["Watts/The Book.epub"], True)
+    assert catalog.find_book("Brief History")[0] == ["Science/A Brief History of Time.pdf"]
+    assert len(catalog.find_book("zen")[0]) == 2
+    assert catalog.find_book("Untimd.docx")[0] == ["Notes/Untimed.docx"]
+
+
+if __name__ == "__main__":
+    test_list_and_recent_books()
+    print("✅ Catalog tests passed")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test context windows around search hits.
+Splits pages the way the indexer does, stores the chunks under their
+deterministic ids, then checks that a hit's neighbours come back in one get
+and stitch into the original text without the splitter's overlap.
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from personal_doc_library.core.chunk_context import chunk_id, context_ids, stitch_chunks
+from personal_doc_library.core.vector_backends import NumpyFlatBackend
+
+
+def split_pages(pages, rel_path="shelf/book.pdf"):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=150,
+                                              separators=["\n\n", "\n", ". ", " ", ""],
+                                              length_function=len, add_start_index=True)
+    documents = [Document(page_content=text, metadata={"source": rel_path, "page": page})
+                 for page, text in enumerate(pages)]
+    chunks = splitter.split_documents(documents)
+    for chunk_index, chunk in enumerate(chunks):
+        chunk.metadata.update(chunk_index=chunk_index, rel_path=rel_path, book=os.path.basename(rel_path))
+    return chunks
+
+
+def page_text(page, sentences=60):
+    return " ".join(f"Page {page} sentence {i} talks about breathing and attention." for i in range(sentences))
+
+
+def test_stitching_removes_overlap():
+    pages = [page_text(0), page_text(1)]
+    chunks = split_pages(pages)
+    assert len(chunks) > 4
+
+    page_zero = [(c.page_content, c.metadata) for c in chunks if c.metadata["page"] == 0]
+    assert stitch_chunks(page_zero) == pages[0]
+
+    # Without start_index the overlap is found by matching text
+    legacy = [(text, {k: v for k, v in metadata.items() if k != "start_index"}) for text, metadata in page_zero]
+    assert stitch_chunks(legacy) == pages[0]
+
+    # Pages do not overlap each other
+    everything = stitch_chunks([(c.page_content, c.metadata) for c in chunks])
+    assert everything == pages[0] + "\n\n" + pages[1]
+
+
+def test_context_fetched_by_id():
+    chunks = split_pages([page_text(0), page_text(1)])
+    store = NumpyFlatBackend(tempfile.mkdtemp(prefix='ragdex_vectors_'))
+    vectors = np.random.default_rng(0).normal(size=(len(chunks), 8)).astype(np.float32)
+    store.add([c.page_content for c in chunks], [c.metadata for c in chunks], vectors,
+              ids=[chunk_id(c.metadata["rel_path"], c.metadata["chunk_index"]) for c in chunks])
+
+    hit = chunks[2].metadata
+    window = context_ids(hit, 1)
+    assert window == [chunk_id("shelf/book.pdf", i) for i in (1, 2, 3)]
+    fetched = store.get(ids=window + ["missing-0"], include=["documents", "metadatas"])
+    assert [m["chunk_index"] for m in fetched["metadatas"]] == [1, 2, 3]
+
+    stitched = stitch_chunks(list(zip(fetched["documents"], fetched["metadatas"])))
+    assert chunks[2].page_content in stitched
+    assert len(stitched) < sum(len(text) for text in fetched["documents"])
+
+    # Legacy chunks without ordinals have no window
+    assert context_ids({"book": "old.pdf", "page": 3}, 2) == []
+
+
+if __name__ == "__main__":
+    test_stitching_removes_overlap()
+    test_context_fetched_by_id()
+    print("✅ Chunk context tests passed")
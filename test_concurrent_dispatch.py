@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test concurrent JSON-RPC dispatch in the MCP server.
+Interleaves slow and fast requests and checks that fast requests are not
+blocked behind slow ones, that heavy tools are capped and that cancelled
+requests are abandoned without a response.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.servers.mcp_complete_server import CompleteMCPServer
+
+SLOW_SECONDS = 2.0
+
+
+class FakeServer(CompleteMCPServer):
+    """Server with canned handlers and no RAG initialization"""
+
+    def _start_background_init(self):
+        pass
+
+    def handle_request(self, request):
+        params = request.get("params", {})
+        name = params.get("name")
+        if name == "summarize_book":
+            time.sleep(SLOW_SECONDS)
+        return {"result": {"content": [{"type": "text", "text": name or request.get("method")}]}}
+
+
+class PipeReader:
+    """Line reader over an os.pipe so the test can feed requests over time"""
+
+    def __init__(self):
+        read_fd, write_fd = os.pipe()
+        self.reader = os.fdopen(read_fd, 'r')
+        self.writer = os.fdopen(write_fd, 'w')
+
+    def readline(self):
+        return self.reader.readline()
+
+    def send(self, message):
+        self.writer.write(json.dumps(message) + "\n")
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class Collector:
+    """stdout replacement recording when each response arrives"""
+
+    def __init__(self):
+        self.responses = []
+        self.start = time.monotonic()
+
+    def write(self, text):
+        for line in text.splitlines():
+            if line.strip():
+                self.responses.append((time.monotonic() - self.start, json.loads(line)))
+
+    def flush(self):
+        pass
+
+
+def tool_call(request_id, name):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": name, "arguments": {}}}
+
+
+def serve(messages, delay_between=0.05):
+    """Feed messages to a FakeServer and return the (seconds, response) pairs it wrote"""
+    settings = {
+        'MCP_MAX_WORKERS': '4',
+        'MCP_MAX_HEAVY_TOOLS': '1',
+        'PERSONAL_LIBRARY_DB_PATH': tempfile.mkdtemp(prefix='ragdex_test_'),
+    }
+    saved = {key: os.environ.get(key) for key in settings}
+    os.environ.update(settings)
+    try:
+        server = FakeServer()
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    stdin = PipeReader()
+    stdout = Collector()
+    thread = threading.Thread(target=server.run, kwargs={"stdin": stdin, "stdout": stdout})
+    thread.start()
+    for message in messages:
+        stdin.send(message)
+        time.sleep(delay_between)
+    stdin.close()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "server did not exit after stdin closed"
+    return stdout.responses
+
+
+def run_server(messages, delay_between=0.05):
+    return {response["id"]: elapsed for elapsed, response in serve(messages, delay_between)}
+
+
+def test_fast_requests_not_blocked_by_slow_tool():
+    """search and tools/list answer while summarize_book is still running"""
+    arrivals = run_server([
+        tool_call(1, "summarize_book"),
+        tool_call(2, "search"),
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/list"},
+    ])
+    assert set(arrivals) == {1, 2, 3}
+    assert arrivals[2] < SLOW_SECONDS / 2
+    assert arrivals[3] < SLOW_SECONDS / 2
+    assert arrivals[1] >= SLOW_SECONDS
+
+
+def test_heavy_tools_are_capped():
+    """With one heavy slot, two summarize_book calls run back to back"""
+    arrivals = run_server([
+        tool_call(1, "summarize_book"),
+        tool_call(2, "summarize_book"),
+    ])
+    assert arrivals[2] - arrivals[1] >= SLOW_SECONDS * 0.9
+
+
+def test_cancelled_request_gets_no_response():
+    """A queued heavy request cancelled by the client is abandoned"""
+    arrivals = run_server([
+        tool_call(1, "summarize_book"),
+        tool_call(2, "summarize_book"),
+        {"jsonrpc": "2.0", "method": "notifications/cancelled",
+         "params": {"requestId": 2, "reason": "user navigated away"}},
+        tool_call(3, "search"),
+    ])
+    assert 1 in arrivals and 3 in arrivals
+    assert 2 not in arrivals
+    # The cancelled call never ran, so the server finished after one slow call
+    assert max(arrivals.values()) < SLOW_SECONDS * 1.9
+
+
+def test_malformed_messages_do_not_stop_the_server():
+    """Non-object lines and null params get error replies and later requests are still served"""
+    responses = [response for _, response in serve([
+        [],
+        "x",
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": None},
+        {"jsonrpc": "2.0", "id": 2, "method": 5},
+        tool_call(3, "search"),
+    ])]
+    invalid = [response for response in responses if response["id"] is None]
+    assert len(invalid) == 2 and all(response["error"]["code"] == -32600 for response in invalid)
+    by_id = {response["id"]: response for response in responses if response["id"] is not None}
+    assert by_id[1]["error"]["code"] == -32603
+    assert by_id[2]["error"]["code"] == -32603
+    assert by_id[3]["result"]["content"][0]["text"] == "search"
+
+
+if __name__ == "__main__":
+    test_fast_requests_not_blocked_by_slow_tool()
+    test_heavy_tools_are_capped()
+    test_cancelled_request_gets_no_response()
+    test_malformed_messages_do_not_stop_the_server()
+    print("✅ Concurrent dispatch tests passed")
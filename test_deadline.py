@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test deadline-aware search.
+Checks that a search whose deadline cannot fit the usual query narrows its
+candidates, skips context expansion, records what it skipped and keeps the
+degraded results out of the cache.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.chunk_context import chunk_id
+from personal_doc_library.core.deadline import Deadline, StageTimes
+from personal_doc_library.core.shared_rag import SharedRAG
+from personal_doc_library.core.single_flight import SingleFlight
+from personal_doc_library.core.vector_backends import NumpyFlatBackend
+
+
+class FixedEmbeddings:
+    def embed_query(self, query):
+        return np.ones(8, dtype=np.float32)
+
+
+def make_rag():
+    """SharedRAG over a small in-memory library, without loading models"""
+    rng = np.random.default_rng(0)
+    store = NumpyFlatBackend(tempfile.mkdtemp(prefix='ragdex_vectors_'))
+    texts, metadatas, ids = [], [], []
+    for book in range(4):
+        rel_path = f"shelf/folder{book % 2}/book{book}.pdf"
+        for index in range(10):
+            texts.append(f"Book {book} passage {index}.")
+            metadatas.append({"book": os.path.basename(rel_path), "rel_path": rel_path, "page": index,
+                              "chunk_index": index, "folder": os.path.dirname(rel_path), "type": "general"})
+            ids.append(chunk_id(rel_path, index))
+    store.add(texts, metadatas, rng.normal(size=(len(texts), 8)).astype(np.float32) + 1, ids=ids)
+
+    rag = SharedRAG.__new__(SharedRAG)
+    rag.vectorstore = store
+    rag.embeddings = FixedEmbeddings()
+    rag.book_index = {}
+    rag._search_cache = OrderedDict()
+    rag._cache_lock = threading.Lock()
+    rag._cache_ttl = 300
+    rag._max_cache_size = 50
+    rag._stage_times = StageTimes()
+    rag._search_flights = SingleFlight()
+    rag.deadline_coarse_books = 50
+    return rag
+
+
+def test_deadline_and_stage_times():
+    assert Deadline().remaining() == float("inf") and not Deadline().expired()
+    deadline = Deadline(0.05, start=time.monotonic() - 1)
+    assert deadline.expired() and not deadline.allows(0)
+    deadline.skip("context expansion")
+    deadline.skip("context expansion")
+    assert deadline.partial and deadline.skipped == ["context expansion"]
+
+    times = StageTimes()
+    assert times.estimate("query") == 0.0
+    times.record("query", 1.0)
+    times.record("query", 2.0)
+    assert abs(times.estimate("query") - 1.2) < 1e-9
+
+
+def test_search_degrades_under_deadline():
+    rag = make_rag()
+    full = rag.search("breath", k=3, folder="folder1", context_chunks=1, deadline=Deadline(60))
+    assert len(full) == 3 and all("context" in result for result in full)
+    assert len(rag._search_cache) == 1
+
+    # Nothing left: no folder over-fetch, no context, not cached
+    full_estimate = rag._stage_times.estimate("query")
+    late = Deadline(1, start=time.monotonic() - 2)
+    partial = rag.search("silence", k=3, folder="folder1", context_chunks=1, deadline=late)
+    assert late.skipped == ["folder over-fetch", "context expansion"]
+    assert len(partial) <= 3 and not any("context" in result for result in partial)
+    assert len(rag._search_cache) == 1
+
+    # The degraded run is timed on its own and leaves the full query's estimate alone
+    assert rag._stage_times.estimate("query") == full_estimate
+    assert rag._stage_times.estimate("query (degraded)") > 0
+
+
+if __name__ == "__main__":
+    test_deadline_and_stage_times()
+    test_search_degrades_under_deadline()
+    print("✅ Deadline tests passed")
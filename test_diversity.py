@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test diversity-aware re-ranking.
+Checks that maximal marginal relevance spreads results across distinct
+passages and books instead of returning near-duplicates from one book, and
+that the per-source cap holds, while a single-book search keeps every result in its book.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.chunk_context import chunk_id
+from personal_doc_library.core.deadline import StageTimes
+from personal_doc_library.core.diversity import candidate_pool, mmr_rank, source_cap
+from personal_doc_library.core.shared_rag import SharedRAG
+from personal_doc_library.core.single_flight import SingleFlight
+from personal_doc_library.core.vector_backends import NumpyFlatBackend
+
+
+class FixedEmbeddings:
+    def embed_query(self, query):
+        return np.ones(8, dtype=np.float32)
+
+
+def test_mmr_spreads_across_books():
+    rng = np.random.default_rng(0)
+    query = rng.normal(size=32)
+    # One book has 15 near-duplicate passages right on the query; four others are slightly further off
+    duplicates = query + 0.05 * rng.normal(size=(15, 32))
+    others = query + 0.8 * rng.normal(size=(4, 32))
+    embeddings = np.vstack([duplicates, others])
+    sources = ["same.pdf"] * 15 + [f"other{i}.pdf" for i in range(4)]
+
+    plain = mmr_rank(query, embeddings, sources, 5, diversity=0.0)
+    assert {sources[i] for i in plain} == {"same.pdf"}
+
+    diverse = mmr_rank(query, embeddings, sources, 5, diversity=0.7)
+    assert diverse[0] == plain[0] and len({sources[i] for i in diverse}) == 5
+
+    capped = mmr_rank(query, embeddings, sources, 10, diversity=0.1, max_per_source=2)
+    assert [sources[i] for i in capped][:6].count("same.pdf") == 2 and len(capped) == 10
+    # Once the other books are used up the cap gives way rather than returning fewer results
+    assert {sources[i] for i in capped[6:]} == {"same.pdf"}
+
+    assert mmr_rank(query, np.zeros((0, 32)), [], 5, 0.5) == []
+
+
+def test_pool_and_cap():
+    assert candidate_pool(10) == 40 and candidate_pool(100) == 200 and candidate_pool(300) == 300
+    assert source_cap(20, 0.5) == 5 and source_cap(20, 1.0) == 1 and source_cap(10, 0.0) == 5
+
+
+def test_single_book_search_with_diversity():
+    # Three books sit right on the query; the requested one is further off
+    rng = np.random.default_rng(0)
+    store = NumpyFlatBackend(tempfile.mkdtemp(prefix='ragdex_vectors_'))
+    texts, metadatas, embeddings, ids = [], [], [], []
+    for book in range(4):
+        spread = 2.0 if book == 3 else 0.1
+        for index in range(12):
+            texts.append(f"Book {book} passage {index}.")
+            metadatas.append({"book": f"book{book}.pdf", "rel_path": f"shelf/book{book}.pdf", "page": index,
+                              "chunk_index": index, "folder": "shelf", "type": "general"})
+            embeddings.append(np.ones(8) + spread * rng.normal(size=8))
+            ids.append(chunk_id(f"shelf/book{book}.pdf", index))
+    store.add(texts, metadatas, np.asarray(embeddings, dtype=np.float32), ids=ids)
+
+    rag = SharedRAG.__new__(SharedRAG)
+    rag.vectorstore = store
+    rag.embeddings = FixedEmbeddings()
+    rag.book_index = {}
+    rag._search_cache = OrderedDict()
+    rag._cache_lock = threading.Lock()
+    rag._cache_ttl = 300
+    rag._max_cache_size = 50
+    rag._stage_times = StageTimes()
+    rag._search_flights = SingleFlight()
+
+    # source_cap(10, 0.8) is 1, but within one book the cap must not apply
+    results = rag.search("passage", k=10, top_books=0, diversity=0.8, book="book3.pdf")
+    assert len(results) == 10 and {result["source"] for result in results} == {"book3.pdf"}
+
+
+if __name__ == "__main__":
+    test_mmr_spreads_across_books()
+    test_pool_and_cap()
+    test_single_book_search_with_diversity()
+    print("✅ Diversity tests passed")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test import-time budgets for ragdex entry points.
+Runs each entry-point module under `python -X importtime` in a fresh
+interpreter and checks its cumulative import time, and that heavy
+dependencies (torch, langchain, ChromaDB) are not pulled in at import.
+"""
+
+import os
+import sys
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+# Cumulative import time budgets in seconds. Importing torch or langchain
+# alone takes seconds, so these catch any heavy import creeping back in.
+BUDGETS = {
+    "personal_doc_library.cli": 1.0,
+    "personal_doc_library.monitoring.monitor_web_enhanced": 1.5,
+    "personal_doc_library.servers.mcp_complete_server": 1.0,
+}
+
+HEAVY_MODULES = ("torch", "langchain", "langchain_community", "chromadb", "sentence_transformers")
+
+
+def import_profile(module):
+    """Return (cumulative import seconds, heavy modules loaded) for a module"""
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=SRC_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if name == module:
+            cumulative_us = int(cumulative)
+    assert cumulative_us is not None, f"{module} not found in -X importtime output"
+
+    heavy = [m for m in result.stdout.strip().split(",") if m]
+    return cumulative_us / 1_000_000, heavy
+
+
+def check_budget(module):
+    seconds, heavy = import_profile(module)
+    budget = BUDGETS[module]
+    print(f"{module}: {seconds * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+    assert not heavy, f"{module} imports heavy dependencies at import time: {heavy}"
+    assert seconds <= budget, f"{module} took {seconds:.2f}s to import (budget {budget:.2f}s)"
+
+
+def test_cli_import_time():
+    check_budget("personal_doc_library.cli")
+
+
+def test_web_monitor_import_time():
+    check_budget("personal_doc_library.monitoring.monitor_web_enhanced")
+
+
+def test_mcp_server_import_time():
+    check_budget("personal_doc_library.servers.mcp_complete_server")
+
+
+if __name__ == "__main__":
+    for module in BUDGETS:
+        check_budget(module)
+    print("✅ Import time budgets met")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test memory-budget scheduling for the indexer.
+Checks that jobs are admitted while their estimates fit, wait once the
+budget is full, start again as reservations are released, and that an
+oversized document still runs, alone.
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.indexing.memory_budget import IndexJob, MemoryBudget, select_next_job
+
+
+def job(name, estimate_mb):
+    return IndexJob(f"/books/{name}", name, size_mb=1.0, estimate_mb=estimate_mb)
+
+
+def test_admit_wait_and_release():
+    budget = MemoryBudget(1000)
+    pending = [job("a.pdf", 600), job("b.pdf", 600), job("c.pdf", 300)]
+
+    first = select_next_job(pending, budget, nothing_running=True)
+    assert first.rel_path == "a.pdf" and first.reserved_mb == 600
+    # b.pdf does not fit next to a.pdf, but the smaller c.pdf does
+    second = select_next_job(pending, budget, nothing_running=False)
+    assert second.rel_path == "c.pdf" and budget.available_mb == 100
+    # Nothing else fits: wait
+    assert select_next_job(pending, budget, nothing_running=False) is None
+    assert [waiting.rel_path for waiting in pending] == ["b.pdf"]
+
+    budget.release(first.reserved_mb)
+    third = select_next_job(pending, budget, nothing_running=False)
+    assert third.rel_path == "b.pdf" and budget.available_mb == 100 and not pending
+
+
+def test_oversized_job_runs_alone():
+    budget = MemoryBudget(1000)
+    small = select_next_job([job("small.pdf", 200)], budget, nothing_running=True)
+    pending = [job("huge.pdf", 5000), job("tiny.pdf", 100)]
+
+    # The oversized estimate is clamped to the whole budget, so it waits for the running job
+    tiny = select_next_job(pending, budget, nothing_running=False)
+    assert tiny.rel_path == "tiny.pdf"
+    budget.release(small.reserved_mb)
+    budget.release(tiny.reserved_mb)
+
+    huge = select_next_job(pending, budget, nothing_running=True)
+    assert huge.rel_path == "huge.pdf" and huge.reserved_mb == 1000 and budget.available_mb == 0
+    assert select_next_job([job("other.pdf", 100)], budget, nothing_running=False) is None
+
+    # With nothing running the head of the queue is admitted even if the budget looks full
+    budget.release(huge.reserved_mb)
+    budget.try_reserve(950)
+    forced = select_next_job([job("late.pdf", 400)], budget, nothing_running=True)
+    assert forced.rel_path == "late.pdf" and forced.reserved_mb == 400
+
+
+if __name__ == "__main__":
+    test_admit_wait_and_release()
+    test_oversized_job_runs_alone()
+    print("✅ Memory budget tests passed")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Test the per-document page manifest.
+Checks the compressed round trip through book_index JSON and the page
+availability answers book_pages and extract_pages rely on.
+"""
+
+import json
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.page_manifest import PageManifest
+
+
+def test_manifest_round_trip_and_lookups():
+    # Pages 1-40 with 3 chunks, page 42 with 1, pages 43-300 with 2; page 41 produced no text
+    chunk_pages = [p for p in range(1, 41) for _ in range(3)] + [42] + [p for p in range(43, 301) for _ in range(2)]
+    manifest = PageManifest.from_chunk_pages(chunk_pages + ["0-9", None])
+    stored = json.loads(json.dumps(manifest.to_dict()))
+    assert stored == {"pages": "1-40,42-300", "chunks": [[3, 40], [1, 1], [2, 258]]}
+
+    loaded = PageManifest.from_dict(stored)
+    assert len(loaded) == 299 and loaded.total_chunks == len(chunk_pages)
+    assert loaded.pages() == list(range(1, 41)) + list(range(42, 301))
+    assert 1 in loaded and 300 in loaded and 41 not in loaded and 0 not in loaded and 301 not in loaded
+    assert (loaded.chunks_on(5), loaded.chunks_on(41), loaded.chunks_on(42), loaded.chunks_on(100)) == (3, 0, 1, 2)
+    assert loaded.split([39, 40, 41, 42, 500]) == ([39, 40, 42], [41, 500])
+
+    # Entries indexed before manifests, and documents without page numbers
+    assert PageManifest.from_dict(None) is None
+    assert not PageManifest.from_chunk_pages([None, "intro"])
+
+
+if __name__ == "__main__":
+    test_manifest_round_trip_and_lookups()
+    print("✅ Page manifest tests passed")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test single-flight coalescing of identical concurrent calls.
+Starts many callers for the same key at once and checks that they share one
+computation, its result and its errors, and that the counters record it.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.single_flight import SingleFlight
+
+
+def run_together(flight, key, function, callers):
+    """Call flight.do(key, function) from callers threads at once; results or exceptions"""
+    outcomes = [None] * callers
+    barrier = threading.Barrier(callers)
+
+    def call(position):
+        barrier.wait()
+        try:
+            outcomes[position] = flight.do(key, function)
+        except Exception as e:
+            outcomes[position] = e
+
+    threads = [threading.Thread(target=call, args=(position,)) for position in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_identical_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_search():
+        calls.append(1)
+        time.sleep(0.3)
+        return ["result"]
+
+    outcomes = run_together(flight, "meditation:10", slow_search, 8)
+    assert len(calls) == 1
+    assert all(outcome is outcomes[0] for outcome in outcomes)
+    assert flight.stats() == {"computed": 1, "coalesced": 7, "in_flight": 0}
+
+    # Finished flights are not reused, and different keys do not wait for each other
+    assert flight.do("meditation:10", lambda: "again") == "again"
+    assert flight.do("breath:10", lambda: "other") == "other"
+    assert flight.stats()["computed"] == 3
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    def failing():
+        time.sleep(0.2)
+        raise RuntimeError("vector store unavailable")
+
+    outcomes = run_together(flight, "key", failing, 4)
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_waiter_gives_up_at_its_timeout():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def slow_search():
+        started.set()
+        time.sleep(0.5)
+        return ["result"]
+
+    leader = threading.Thread(target=flight.do, args=("key", slow_search))
+    leader.start()
+    started.wait()
+    began = time.monotonic()
+    try:
+        flight.do("key", slow_search, timeout=0.1)
+        assert False, "waiter should have timed out"
+    except TimeoutError:
+        pass
+    assert time.monotonic() - began < 0.4
+    leader.join()
+    assert flight.stats() == {"computed": 1, "coalesced": 1, "in_flight": 0}
+
+
+if __name__ == "__main__":
+    test_identical_calls_share_one_computation()
+    test_errors_reach_every_caller()
+    test_waiter_gives_up_at_its_timeout()
+    print("✅ Single-flight tests passed")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test query-focused snippet selection.
+Checks that the snippet is the sentence window covering the query within the
+character budget, and that passages which fit are left alone.
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.snippets import allocate_budget, best_snippet, query_terms
+
+PASSAGE = (
+    "The teacher arrived at the ashram in the spring. "
+    "Breakfast was simple and the days were long. "
+    "Sit with the spine erect and observe the breath at the nostrils. "
+    "When the mind wanders, gently return to the breathing without judgement. "
+    "In the evenings the students walked along the river. "
+    "Nobody spoke of the war."
+)
+
+
+def test_best_window_covers_query():
+    snippet = best_snippet(PASSAGE, "breath observation meditation", 150)
+    assert snippet == ("...Sit with the spine erect and observe the breath at the nostrils. "
+                       "When the mind wanders, gently return to the breathing without judgement....")
+    assert len(snippet) <= 150 + 6
+
+    # A window with more distinct query words beats one repeating a single word
+    assert best_snippet(PASSAGE, "river students evenings", 80).startswith("...In the evenings")
+
+    # Fits: unchanged; no match: keep the start; one huge sentence: cut at a word boundary
+    assert best_snippet("Short passage.", "anything", 100) == "Short passage."
+    assert best_snippet(PASSAGE, "quantum chromodynamics", 100) == (
+        "The teacher arrived at the ashram in the spring. Breakfast was simple and the days were long....")
+    assert best_snippet("word " * 100, "word", 23) == "word word word word..."
+
+
+def test_terms_and_budget():
+    assert query_terms("What is the practice of breathing?") == {"practi", "breath"}
+    assert allocate_budget(10, 8000) == 800
+    assert allocate_budget(100, 8000) == 200
+    assert allocate_budget(0, 8000) == 8000
+    # An explicit caller budget may go below the default floor
+    assert allocate_budget(10, 500, minimum=1) == 50
+
+
+if __name__ == "__main__":
+    test_best_window_covers_query()
+    test_terms_and_budget()
+    print("✅ Snippet tests passed")
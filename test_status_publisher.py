@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test the coalescing status publisher.
+Holds a deferred "indexing" write in flight while a synchronous "idle" write
+arrives and checks that the status file ends on "idle", and checks that a
+failed document leaves the published list of active workers.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core import status_publisher
+from personal_doc_library.core.status_publisher import StatusPublisher
+
+
+def test_deferred_write_does_not_overwrite_newer_status():
+    with tempfile.TemporaryDirectory() as tmp:
+        status_file = os.path.join(tmp, "index_status.json")
+        publisher = StatusPublisher(status_file, os.path.join(tmp, "indexing_progress.json"),
+                                    interval=0)
+
+        entered = threading.Event()
+        release = threading.Event()
+        deferred_done = threading.Event()
+        original_write = status_publisher.write_json_atomic
+
+        def gated_write(path, data):
+            # Stall the writer thread after it has snapshotted "indexing"
+            if data.get("status") == "indexing":
+                entered.set()
+                release.wait(5)
+                original_write(path, data)
+                deferred_done.set()
+                return
+            original_write(path, data)
+
+        status_publisher.write_json_atomic = gated_write
+        try:
+            publisher.set_status("indexing")
+            assert entered.wait(5)
+
+            idle = threading.Thread(target=publisher.set_status, args=("idle",))
+            idle.start()
+            idle.join(0.2)
+            release.set()
+            idle.join(5)
+            assert not idle.is_alive()
+            assert deferred_done.wait(5)
+        finally:
+            status_publisher.write_json_atomic = original_write
+
+        with open(status_file) as f:
+            assert json.load(f)["status"] == "idle"
+
+
+def test_failed_document_leaves_workers():
+    with tempfile.TemporaryDirectory() as tmp:
+        progress_file = os.path.join(tmp, "indexing_progress.json")
+        publisher = StatusPublisher(os.path.join(tmp, "index_status.json"), progress_file, interval=0)
+
+        publisher.update_progress("a.pdf", {"stage": "embedding", "current_file": "a.pdf"})
+        publisher.update_progress("b.pdf", {"stage": "chunking", "current_file": "b.pdf"})
+        publisher.update_progress("b.pdf", {"stage": "failed", "current_file": "b.pdf"})
+        publisher.flush()
+
+        assert publisher.get_progress("b.pdf") is None
+        with open(progress_file) as f:
+            progress = json.load(f)
+        assert list(progress["workers"]) == ["a.pdf"]
+        assert progress["stage"] == "failed" and progress["current_file"] == "b.pdf"
+
+
+if __name__ == "__main__":
+    test_deferred_write_does_not_overwrite_newer_status()
+    test_failed_document_leaves_workers()
+    print("✅ Status publisher tests passed")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test the trigram title index behind find_book_by_fuzzy_match.
+Checks exact, extension-less, substring and misspelled lookups, and that
+in-place additions and removals are picked up incrementally.
+"""
+
+import os
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.title_index import TitleIndex
+
+
+def test_lookups_and_incremental_sync():
+    book_index = {
+        "Yoga/Light on Yoga.pdf": {},
+        "Yoga/Light on Pranayama.pdf": {},
+        "Science/A Brief History of Time.epub": {},
+        "Notes/Meditation Journal.docx": {},
+    }
+    index = TitleIndex()
+    index.sync(book_index)
+    assert len(index) == 4
+
+    assert index.find("light on yoga.pdf") == (["Yoga/Light on Yoga.pdf"], True, {"Yoga/Light on Yoga.pdf": 1.0})
+    assert index.find("Meditation Journal")[0] == ["Notes/Meditation Journal.docx"]
+    assert index.find("science/a brief")[:2] == (["Science/A Brief History of Time.epub"], True)
+
+    # Several substring matches come back in book_index order, none marked exact
+    matches, exact, scores = index.find("light on")
+    assert matches == ["Yoga/Light on Yoga.pdf", "Yoga/Light on Pranayama.pdf"] and not exact
+    assert set(scores.values()) == {0.9}
+
+    matches, exact, scores = index.find("Brief Histroy of Tme.epub")
+    assert matches[0] == "Science/A Brief History of Time.epub" and not exact and scores[matches[0]] > 0.6
+    assert index.find("completely unrelated words") == ([], False, {})
+
+    # In-place changes are picked up after mark_changed(), even when the size is unchanged
+    del book_index["Yoga/Light on Pranayama.pdf"]
+    book_index["Yoga/Tree of Yoga.pdf"] = {}
+    index.mark_changed()
+    index.sync(book_index)
+    assert index.find("light on")[0] == ["Yoga/Light on Yoga.pdf"]
+    assert index.find("tree of yoga")[0] == ["Yoga/Tree of Yoga.pdf"]
+
+    # A reloaded book_index (a new dict) is diffed without mark_changed()
+    reloaded = {path: {} for path in book_index if "Science" not in path}
+    index.sync(reloaded)
+    assert len(index) == 3 and index.find("brief history")[0] == []
+
+
+if __name__ == "__main__":
+    test_lookups_and_incremental_sync()
+    print("✅ Title index tests passed")
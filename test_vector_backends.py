@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test the vector store backends.
+Checks the NumPy flat store's add/query/filter/delete/compaction behaviour,
+that a second handle sees another handle's writes, and that it returns the
+same neighbours and distances as ChromaDB for the same vectors, and the
+per-book centroid index built from them, including concurrent writers.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.core.book_vectors import BookVectorIndex
+from personal_doc_library.core.vector_backends import ChromaBackend, NumpyFlatBackend, fit_projection
+
+DIM = 32
+
+
+def random_unit_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def sample_chunks(count):
+    texts = [f"chunk {i}" for i in range(count)]
+    metadatas = [{"book": f"book{i % 4}.pdf", "page": i % 10, "type": "general"} for i in range(count)]
+    return texts, metadatas, random_unit_vectors(count)
+
+
+def test_numpy_query_filter_and_delete():
+    texts, metadatas, vectors = sample_chunks(200)
+    store = NumpyFlatBackend(tempfile.mkdtemp(prefix='ragdex_vectors_'))
+    ids = store.add(texts, metadatas, vectors)
+    assert store.count() == 200
+
+    # A stored vector is its own nearest neighbour at distance 0
+    text, metadata, distance = store.query(vectors[7], k=3)[0]
+    assert text == "chunk 7" and abs(distance) < 1e-5
+
+    results = store.query(vectors[7], k=5, where={"$and": [{"book": "book1.pdf"}, {"page": {"$gte": 5}}]})
+    assert results and all(m["book"] == "book1.pdf" and m["page"] >= 5 for _, m, _ in results)
+
+    pages = store.get(where={"book": {"$eq": "book2.pdf"}}, include=["metadatas"])
+    assert len(pages["ids"]) == 50 and pages["documents"] is None
+
+    fetched = store.get(ids=[ids[3], ids[1]], include=["documents", "embeddings"])
+    assert fetched["documents"] == ["chunk 3", "chunk 1"]
+    assert np.allclose(fetched["embeddings"], vectors[[3, 1]])
+
+    store.delete(where={"book": "book0.pdf"})
+    assert store.count() == 150
+    assert all(m["book"] != "book0.pdf" for _, m, _ in store.query(vectors[0], k=200))
+
+
+def test_numpy_upsert_compaction_and_second_reader():
+    directory = tempfile.mkdtemp(prefix='ragdex_vectors_')
+    writer = NumpyFlatBackend(directory, dtype="float16")
+    reader = NumpyFlatBackend(directory)  # Opened before the store's dtype is fixed
+
+    texts, metadatas, vectors = sample_chunks(100)
+    ids = [f"id-{i}" for i in range(100)]
+    writer.add(texts, metadatas, vectors, ids=ids)
+    assert reader.count() == 100
+    assert reader.dtype == np.float16
+
+    # Re-adding the same ids replaces the old chunks instead of duplicating them
+    writer.add([t + " v2" for t in texts[:10]], metadatas[:10], vectors[:10], ids=ids[:10])
+    assert reader.count() == 100
+    assert reader.get(ids=["id-0"])["documents"] == ["chunk 0 v2"]
+
+    writer.COMPACT_MIN_ROWS = 1
+    writer.delete(where={"book": {"$in": ["book0.pdf", "book1.pdf"]}})
+    assert writer._layout != "0"  # Tombstones passed the ratio and were compacted away
+    assert len(writer._live) == writer.count() == 50
+    text, _, distance = reader.query(vectors[2], k=1)[0]
+    assert text == "chunk 2 v2" and distance < 1e-3  # float16 storage
+
+
+def test_compact_store_rescores_to_exact_results():
+    """float16 + PCA store shortlists approximately and ranks with the full vectors"""
+    rng = np.random.default_rng(2)
+    # Embeddings concentrate in a few directions, as real sentence embeddings do
+    vectors = (rng.normal(size=(400, 6)) @ rng.normal(size=(6, DIM))
+               + rng.normal(scale=0.05, size=(400, DIM))).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    texts = [f"chunk {i}" for i in range(400)]
+    metadatas = [{"book": f"book{i % 4}.pdf"} for i in range(400)]
+
+    exact = NumpyFlatBackend(tempfile.mkdtemp(prefix='ragdex_vectors_'))
+    exact.add(texts, metadatas, vectors)
+    projection, retained = fit_projection(vectors[:200], 8)
+    assert retained > 0.95
+    compact = NumpyFlatBackend(tempfile.mkdtemp(prefix='ragdex_vectors_'), dtype="float16")
+    compact.configure_compact(DIM, projection)
+    compact.add(texts, metadatas, vectors)
+    assert compact.count() == 400 and compact._vectors.shape == (400, 8)
+
+    for query in vectors[:20] + rng.normal(scale=0.05, size=(20, DIM)).astype(np.float32):
+        query /= np.linalg.norm(query)
+        expected = exact.query(query, k=5)
+        actual = compact.query(query, k=5)
+        assert [t for t, _, _ in actual] == [t for t, _, _ in expected]
+        assert np.allclose([d for _, _, d in actual], [d for _, _, d in expected], atol=1e-5)
+
+    # Full-precision vectors come back from get() and survive compaction
+    compact.COMPACT_MIN_ROWS = 1
+    compact.delete(where={"book": {"$in": ["book0.pdf", "book1.pdf"]}})
+    fetched = compact.get(where={"book": "book2.pdf"}, include=["embeddings"], limit=3)
+    assert np.allclose(fetched["embeddings"], vectors[[2, 6, 10]])
+
+
+def test_book_vectors_rank_books_and_restrict_search():
+    directory = tempfile.mkdtemp(prefix='ragdex_vectors_')
+    store = NumpyFlatBackend(directory)
+    # Four books whose chunks cluster around their own direction
+    centres = random_unit_vectors(4, seed=3)
+    noise = np.random.default_rng(4).normal(scale=0.05, size=(4, 25, DIM)).astype(np.float32)
+    for b in range(4):
+        chunks = centres[b] + noise[b]
+        store.add([f"book{b} chunk {i}" for i in range(25)],
+                  [{"book": f"book{b}.pdf", "page": i} for i in range(25)], chunks)
+
+    books = BookVectorIndex(directory)
+    book_index = {f"shelf/book{b}.pdf": {} for b in range(4)}
+    assert books.rebuild(store, book_index) == 4 and len(books) == 4
+    assert books.top_books(centres[2], 1)[0][:2] == ("shelf/book2.pdf", "book2.pdf")
+    assert [path for path, _, _ in books.similar("shelf/book1.pdf", 10)] == \
+        [path for path, _, _ in books.top_books(centres[1], 4)][1:]
+    assert books.similar("missing.pdf") is None
+
+    # The fine stage only returns chunks from the chosen books
+    names = [name for _, name, _ in books.top_books(centres[0], 2)]
+    hits = store.query(centres[0], k=30, where={"book": {"$in": names}})
+    assert len(hits) == 30 and {m["book"] for _, m, _ in hits} <= set(names)
+
+    books.remove("shelf/book0.pdf")
+    assert "shelf/book0.pdf" not in BookVectorIndex(directory) and len(books) == 3
+
+
+def test_book_vectors_concurrent_writers_keep_every_book():
+    directory = tempfile.mkdtemp(prefix='ragdex_vectors_')
+    centres = random_unit_vectors(40, seed=5)
+    # Separate handles stand in for the indexer and the MCP server
+    writers = [BookVectorIndex(directory) for _ in range(2)]
+    barrier = threading.Barrier(len(writers))
+
+    def write(handle, first):
+        barrier.wait()
+        for b in range(first, len(centres), len(writers)):
+            handle.update(f"shelf/book{b}.pdf", f"book{b}.pdf", centres[b], 10)
+
+    threads = [threading.Thread(target=write, args=(handle, i)) for i, handle in enumerate(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    books = BookVectorIndex(directory)
+    assert len(books) == len(centres)
+    assert books.top_books(centres[17], 1)[0][0] == "shelf/book17.pdf"
+    assert not [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+def test_numpy_matches_chroma():
+    texts, metadatas, vectors = sample_chunks(300)
+    ids = [f"id-{i}" for i in range(300)]
+    chroma = ChromaBackend(tempfile.mkdtemp(prefix='ragdex_chroma_'))
+    flat = NumpyFlatBackend(tempfile.mkdtemp(prefix='ragdex_vectors_'))
+    chroma.add(texts, metadatas, vectors, ids=ids)
+    flat.add(texts, metadatas, vectors, ids=ids)
+
+    for query in random_unit_vectors(5, seed=1):
+        for where in (None, {"type": "general"}, {"book": "book3.pdf"}):
+            expected = chroma.query(query, k=10, where=where)
+            actual = flat.query(query, k=10, where=where)
+            assert [t for t, _, _ in actual] == [t for t, _, _ in expected]
+            assert np.allclose([d for _, _, d in actual], [d for _, _, d in expected], atol=1e-4)
+
+    # Both hand back the hits' stored embeddings for re-ranking
+    for backend in (chroma, flat):
+        hits, embeddings = backend.query_with_embeddings(vectors[7], k=5)
+        assert hits[0][0] == texts[7] and embeddings.shape == (5, vectors.shape[1])
+        assert np.allclose(embeddings[0], vectors[7], atol=1e-5)
+
+
+if __name__ == "__main__":
+    test_numpy_query_filter_and_delete()
+    test_numpy_upsert_compaction_and_second_reader()
+    test_compact_store_rescores_to_exact_results()
+    test_book_vectors_rank_books_and_restrict_search()
+    test_book_vectors_concurrent_writers_keep_every_book()
+    test_numpy_matches_chroma()
+    print("✅ Vector backend tests passed")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test the adaptive (AIMD) indexing worker controller.
+Closes sampling windows by hand and checks additive increase while
+throughput improves, multiplicative decrease when it does not or under
+resource pressure, and that the worker count stays within its floor and
+ceiling.
+"""
+
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from personal_doc_library.indexing.worker_controller import AdaptiveWorkerController
+
+
+class Controller(AdaptiveWorkerController):
+    """Controller with resource pressure set by the test instead of sampled"""
+
+    pressure = None
+
+    def _pressure(self):
+        return self.pressure
+
+
+def close_window(controller, docs, chunks_per_doc):
+    """Record a window's completions as if it had lasted ten seconds, then adjust"""
+    for _ in range(docs):
+        controller.record(chunks_per_doc)
+    controller._window_start = time.monotonic() - 10
+    return controller.maybe_adjust()
+
+
+def test_additive_increase_and_multiplicative_decrease():
+    controller = Controller(min_workers=1, max_workers=8, initial_workers=4, window_seconds=1)
+    # Too few completions or too short a window: no decision yet
+    controller.record(10)
+    assert controller.maybe_adjust() == 4
+
+    assert close_window(controller, 5, 100) == 5   # Probe upwards
+    assert close_window(controller, 5, 200) == 6   # It paid off: keep adding one
+    assert close_window(controller, 5, 200) == 4   # Flat throughput after an increase: 6 * 0.75
+    assert close_window(controller, 5, 200) == 5   # Probe again
+
+    controller.pressure = "memory 95%"
+    assert close_window(controller, 5, 400) == 3   # Pressure cuts even while throughput grows
+
+
+def test_floor_and_ceiling():
+    controller = Controller(min_workers=2, max_workers=3, initial_workers=10, window_seconds=1)
+    assert controller.current == 3
+    assert close_window(controller, 5, 100) == 3   # Held at the ceiling
+    assert controller._last_action == "hold"
+
+    controller.pressure = "file descriptors 900/1024"
+    assert close_window(controller, 5, 100) == 2
+    assert close_window(controller, 5, 100) == 2   # Never below the floor
+
+    assert Controller(min_workers=0, max_workers=0, initial_workers=0).current == 1
+
+
+if __name__ == "__main__":
+    test_additive_increase_and_multiplicative_decrease()
+    test_floor_and_ceiling()
+    print("✅ Worker controller tests passed")